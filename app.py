@@ -1,32 +1,152 @@
 """LLM Trace Grading Viewer — Streamlit app."""
 
-import json
 from pathlib import Path
 
+import polars as pl
 import streamlit as st
 
-from src.state import get_progress, load_grades, save_grade
+from src.dedup import cluster_members, load_clusters, next_to_grade
+from src.features import FEATURES, parse_where, select, update_features
+from src.grading_queue import estimate_savings, pending, refresh_queue
+from src.similarity import SimilarityIndex, load_index
+from src.state import GradeFeed, save_grades
+from src.transcript import EXPAND_STEP, clip, window
+from src.validation import load_traces as load_valid_traces
 
 # ── Paths ────────────────────────────────────────────────────────────────
 ROOT = Path(__file__).parent
 TRACES_PATH = ROOT / "data" / "traces.json"
 GRADES_PATH = ROOT / "data" / "grades.csv"
+JUDGE_SCORES_PATH = ROOT / "data" / "judge_scores.csv"
+QUEUE_PATH = ROOT / "data" / "grading_queue.csv"
+CLUSTERS_PATH = ROOT / "data" / "clusters.csv"
+ERRORS_PATH = ROOT / "data" / "trace_errors.csv"
+FEATURES_PATH = ROOT / "data" / "features.parquet"
+SIMILARITY_DIR = ROOT / "data" / "similarity"
+
+SIMILAR_K = 5
+GRADE_POLL_SECONDS = 5  # how often a session checks for other graders' saves
+
+FILE_ORDER = "File order"
+QUEUE_ORDER = "Uncertainty queue"
 
 # ── Page config ──────────────────────────────────────────────────────────
 st.set_page_config(page_title="Trace Grader", page_icon="📝", layout="wide")
 
 
 # ── Helpers ──────────────────────────────────────────────────────────────
-@st.cache_data
+@st.cache_resource
+def ingest() -> tuple[list[dict], pl.DataFrame]:
+    """Valid traces plus the validation error report for the rest."""
+    return load_valid_traces(TRACES_PATH, ERRORS_PATH)
+
+
 def load_traces() -> list[dict]:
-    return json.loads(TRACES_PATH.read_text())
+    # Shared, not copied per rerun: nothing mutates traces, and copying
+    # every conversation would make each rerun cost the whole dataset.
+    return ingest()[0]
+
+
+@st.cache_resource
+def trace_index() -> dict[str, dict]:
+    return {t["trace_id"]: t for t in load_traces()}
+
+
+@st.cache_resource
+def trace_features() -> pl.DataFrame:
+    """Per-trace sort/filter keys, computed only for traces not yet stored."""
+    return update_features(load_traces(), FEATURES_PATH)
+
+
+@st.cache_resource
+def similarity_index() -> SimilarityIndex:
+    """Vector index over assistant turns, rebuilt when traces.json changes."""
+    return load_index(load_traces(), SIMILARITY_DIR, source=TRACES_PATH)
+
+
+@st.cache_data(max_entries=5000)
+def turn_markdown(trace_id: str, turn: int, full: bool = False) -> tuple[str, bool]:
+    """Markdown for one turn and whether it was clipped, cached by position
+    so long content is never rehashed."""
+    content = trace_index()[trace_id]["turns"][turn]["content"]
+    return (content, False) if full else clip(content)
+
+
+@st.cache_data
+def load_grading_queue(scores_mtime: float, trace_ids: tuple[str, ...]) -> pl.DataFrame:
+    """Precomputed queue; *scores_mtime* invalidates the cache on rescoring."""
+    return refresh_queue(QUEUE_PATH, JUDGE_SCORES_PATH, list(trace_ids))
+
+
+@st.cache_data
+def load_near_duplicates(clusters_mtime: float) -> pl.DataFrame:
+    """Near-duplicate clusters from ``src.dedup``; empty if never computed."""
+    return load_clusters(CLUSTERS_PATH)
+
+
+def near_duplicates() -> pl.DataFrame:
+    mtime = CLUSTERS_PATH.stat().st_mtime if CLUSTERS_PATH.exists() else 0.0
+    return load_near_duplicates(mtime)
+
+
+def grading_queue(traces: list[dict]) -> pl.DataFrame:
+    trace_ids = tuple(t["trace_id"] for t in traces)
+    mtime = JUDGE_SCORES_PATH.stat().st_mtime if JUDGE_SCORES_PATH.exists() else 0.0
+    return load_grading_queue(mtime, trace_ids)
+
+
+def navigation_order(
+    traces: list[dict],
+    mode: str,
+    hide_duplicates: bool = False,
+    where: str | None = None,
+    sort_by: str | None = None,
+) -> list[int]:
+    """Trace indices in navigation order: all traces in file order, or the
+    ungraded ones by judge uncertainty. Optionally only one trace per
+    near-duplicate cluster (the next one to grade), only traces whose
+    features match *where*, and sorted by a feature (largest first)."""
+    if mode == FILE_ORDER:
+        order = list(range(len(traces)))
+    else:
+        position = {t["trace_id"]: i for i, t in enumerate(traces)}
+        todo = pending(grading_queue(traces), st.session_state.grade_feed.grades)
+        order = [position[tid] for tid in todo["trace_id"]]
+    if hide_duplicates:
+        # One trace per cluster: the representative, then, once it's graded,
+        # the next member still ungraded
+        clusters = near_duplicates()
+        graded = [
+            tid for tid, info in st.session_state.grade_feed.index.items()
+            if info["grade"] in ("pass", "fail")
+        ]
+        hidden = set(clusters["trace_id"]) - set(next_to_grade(clusters, graded))
+        order = [i for i in order if traces[i]["trace_id"] not in hidden]
+    if where or sort_by:
+        position = {t["trace_id"]: i for i, t in enumerate(traces)}
+        selected = [position[tid] for tid in select(trace_features(), where, sort_by)]
+        if sort_by:
+            keep = set(order)
+            order = [i for i in selected if i in keep]
+        else:
+            keep = set(selected)
+            order = [i for i in order if i in keep]
+    return order
 
 
 def init_state():
     if "current_index" not in st.session_state:
         st.session_state.current_index = 0
-    if "grades_df" not in st.session_state:
-        st.session_state.grades_df = load_grades(GRADES_PATH)
+    if "grade_feed" not in st.session_state:
+        st.session_state.grade_feed = GradeFeed(GRADES_PATH)
+    if "order_mode" not in st.session_state:
+        st.session_state.order_mode = FILE_ORDER
+    if "hide_duplicates" not in st.session_state:
+        st.session_state.hide_duplicates = False
+    if "sort_feature" not in st.session_state:
+        st.session_state.sort_feature = None
+    if "feature_filter" not in st.session_state:
+        st.session_state.feature_filter = ""
 
 
 def grade_color(grade: str | None) -> str:
@@ -39,19 +159,95 @@ def grade_color(grade: str | None) -> str:
 
 def get_trace_grade(trace_id: str) -> dict:
     """Return {'grade': ..., 'comment': ...} for a trace, or empty strings."""
-    df = st.session_state.grades_df
-    row = df.filter(df["trace_id"] == trace_id)
-    if row.height == 0:
-        return {"grade": "", "comment": ""}
-    return {
-        "grade": row["grade"][0] or "",
-        "comment": row["comment"][0] or "",
-    }
+    return st.session_state.grade_feed.index.get(trace_id, {"grade": "", "comment": ""})
+
+
+@st.fragment(run_every=GRADE_POLL_SECONDS)
+def follow_grades() -> None:
+    """Pick up grades saved by other sessions; rerun the page when there
+    are any so the sidebar and progress reflect them."""
+    if st.session_state.grade_feed.poll().height:
+        st.rerun()
+
+
+def render_turn(trace_id: str, turn: int):
+    role = trace_index()[trace_id]["turns"][turn]["role"]
+    full_key = f"full_{trace_id}_{turn}"
+    text, clipped = turn_markdown(trace_id, turn, st.session_state.get(full_key, False))
+    with st.chat_message(role):
+        st.markdown(text)
+        if clipped:
+            st.button(
+                "Show full message",
+                key=f"show_{full_key}",
+                on_click=st.session_state.__setitem__,
+                args=(full_key, True),
+            )
+
+
+@st.fragment
+def chat_pane(trace_id: str):
+    """First and last turns, with the middle revealed a window at a time.
+    A fragment, so expanding reruns only the chat pane."""
+    n_turns = len(trace_index()[trace_id]["turns"])
+    expanded_key = f"expanded_{trace_id}"
+    expanded = st.session_state.get(expanded_key, 0)
+    first, last, hidden = window(n_turns, expanded)
+
+    for turn in first:
+        render_turn(trace_id, turn)
+    if hidden:
+        step = min(EXPAND_STEP, hidden)
+        cols = st.columns([2, 1, 3])
+        cols[0].button(
+            f"Show {step} more turns ({hidden} hidden)",
+            key=f"more_{trace_id}",
+            on_click=st.session_state.__setitem__,
+            args=(expanded_key, expanded + step),
+        )
+        cols[1].button(
+            "Show all",
+            key=f"all_{trace_id}",
+            on_click=st.session_state.__setitem__,
+            args=(expanded_key, n_turns),
+        )
+    for turn in last:
+        render_turn(trace_id, turn)
 
 
 # ── Main ─────────────────────────────────────────────────────────────────
+def go_to(index: int) -> None:
+    st.session_state.current_index = index
+
+
+def similar_pane(trace_id: str, grade_lookup: dict[str, str]) -> None:
+    """Nearest neighbours of this conversation's assistant turns, shown on
+    request, each a link to that trace."""
+    key = f"similar_{trace_id}"
+    if not st.session_state.get(key):
+        st.button(
+            "🔎 Find similar traces",
+            key=f"find_{key}",
+            on_click=lambda: st.session_state.update({key: True}),
+        )
+        return
+    st.caption("Most similar conversations (assistant turns)")
+    position = {t["trace_id"]: i for i, t in enumerate(load_traces())}
+    for row in similarity_index().similar(trace_id, SIMILAR_K).iter_rows(named=True):
+        other = row["trace_id"]
+        scenario = trace_index()[other]["scenario"]
+        st.button(
+            f"{grade_color(grade_lookup.get(other))} {other} · {scenario} · "
+            f"{row['similarity']:.2f}",
+            key=f"{key}_{other}",
+            on_click=go_to,
+            args=(position[other],),
+        )
+
+
 def main():
     init_state()
+    follow_grades()
     traces = load_traces()
     n = len(traces)
     idx = st.session_state.current_index
@@ -65,6 +261,12 @@ def main():
     # ── Sidebar ──────────────────────────────────────────────────────────
     with st.sidebar:
         st.title("📝 Trace Grader")
+        errors = ingest()[1]
+        if skipped := errors["index"].n_unique():
+            st.warning(
+                f"Skipped {skipped} malformed trace{'s' if skipped > 1 else ''} — "
+                f"see `{ERRORS_PATH.relative_to(ROOT)}`."
+            )
         st.divider()
 
         # Progress
@@ -83,25 +285,87 @@ def main():
 
         # Trace list
         st.subheader("Traces")
-        for i, t in enumerate(traces):
+        st.radio(
+            "Order",
+            [FILE_ORDER, QUEUE_ORDER],
+            key="order_mode",
+            horizontal=True,
+            label_visibility="collapsed",
+        )
+        clusters = near_duplicates()
+        if clusters.height:
+            st.checkbox(
+                "Hide near-duplicates (grade one per cluster)",
+                key="hide_duplicates",
+            )
+        hide_duplicates = st.session_state.hide_duplicates and clusters.height > 0
+        cluster_size = dict(clusters.select("trace_id", "cluster_size").iter_rows())
+        sort_by = st.session_state.sort_feature
+        where = st.session_state.feature_filter.strip()
+        with st.expander("Sort and filter", expanded=bool(sort_by or where)):
+            st.selectbox(
+                "Sort by (largest first)",
+                [None, *FEATURES],
+                key="sort_feature",
+                format_func=lambda f: "—" if f is None else f.replace("_", " "),
+            )
+            st.text_input(
+                "Filter", key="feature_filter", placeholder="n_turns>=6, emoji_count>0"
+            )
+            try:
+                parse_where(where)
+            except ValueError as e:
+                st.error(str(e))
+                where = ""
+        sort_value = (
+            dict(trace_features().select("trace_id", sort_by).iter_rows()) if sort_by else {}
+        )
+        order = navigation_order(
+            traces, st.session_state.order_mode, hide_duplicates, where, sort_by
+        )
+        if st.session_state.order_mode == QUEUE_ORDER:
+            if not order:
+                st.success("Queue empty — every trace is graded.")
+            else:
+                savings = estimate_savings(
+                    grading_queue(traces),
+                    st.session_state.grade_feed.grades,
+                    [t["trace_id"] for t in traces],
+                    target=10,
+                )
+                st.caption(
+                    f"{savings['queue_order']} traces to {savings['target']} "
+                    f"uncertain labels (vs {savings['file_order']} in file "
+                    f"order, ~{savings['seconds_saved'] / 60:.0f} min saved)"
+                )
+        for i in order:
+            t = traces[i]
             tid = t["trace_id"]
             icon = grade_color(grade_lookup.get(tid))
             label = f"{icon} {tid}"
+            if hide_duplicates and cluster_size.get(tid, 1) > 1:
+                label += f" ×{cluster_size[tid]}"
+            value = sort_value.get(tid)
+            if value is not None:
+                label += f" · {value:,}" if isinstance(value, int) else f" · {value:.2f}"
             if st.button(label, key=f"nav_{tid}", use_container_width=True):
                 st.session_state.current_index = i
                 st.rerun()
 
         st.divider()
 
-        # Prev / Next
+        # Prev / Next (within the current order)
+        pos = order.index(idx) if idx in order else -1
         nav_cols = st.columns(2)
         with nav_cols[0]:
-            if st.button("← Prev", use_container_width=True, disabled=idx == 0):
-                st.session_state.current_index -= 1
+            if st.button("← Prev", use_container_width=True, disabled=pos <= 0):
+                st.session_state.current_index = order[pos - 1]
                 st.rerun()
         with nav_cols[1]:
-            if st.button("Next →", use_container_width=True, disabled=idx >= n - 1):
-                st.session_state.current_index += 1
+            if st.button(
+                "Next →", use_container_width=True, disabled=pos >= len(order) - 1
+            ):
+                st.session_state.current_index = order[pos + 1]
                 st.rerun()
 
     # ── Main area ────────────────────────────────────────────────────────
@@ -125,9 +389,9 @@ def main():
     st.divider()
 
     # Chat display
-    for turn in trace["turns"]:
-        with st.chat_message(turn["role"]):
-            st.markdown(turn["content"])
+    chat_pane(tid)
+
+    similar_pane(tid, grade_lookup)
 
     st.divider()
 
@@ -163,10 +427,25 @@ def main():
             if not grade_value:
                 st.warning("Please select Pass or Fail before saving.")
             else:
-                st.session_state.grades_df = save_grade(
-                    GRADES_PATH, tid, grade_value, comment
+                # Grading a cluster's trace also grades its still-ungraded
+                # near-duplicates, tagged as copies of this grade.
+                targets = [tid]
+                if hide_duplicates:
+                    targets += [
+                        m for m in cluster_members(clusters, tid)
+                        if m != tid and not grade_lookup.get(m)
+                    ]
+                save_grades(
+                    GRADES_PATH, targets, grade_value, comment,
+                    propagated_from=tid if len(targets) > 1 else None,
                 )
-                st.success(f"Saved **{grade_value.upper()}** for {tid}")
+                st.session_state.grade_feed.poll()
+                st.success(f"Saved **{grade_value.upper()}** for {', '.join(targets)}")
+                if st.session_state.order_mode == QUEUE_ORDER:
+                    # Jump straight to the most uncertain trace still ungraded
+                    remaining = navigation_order(traces, QUEUE_ORDER, hide_duplicates)
+                    if remaining:
+                        st.session_state.current_index = remaining[0]
                 st.rerun()
 
     # Current status indicator
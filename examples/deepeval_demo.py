@@ -10,6 +10,8 @@ sys.path.insert(0, str(Path(__file__).parent.parent))
 from deepeval.metrics import GEval
 from deepeval.test_case import LLMTestCase, LLMTestCaseParams
 
+from src.judge import get_judge
+
 # Load a sample trace
 traces_path = Path(__file__).parent / "data" / "traces.json"
 traces = json.loads(traces_path.read_text())
@@ -23,6 +25,7 @@ kindness_metric = GEval(
     name="Kindness",
     criteria="Determine if the assistant's response is kind, polite, and empathetic.",
     evaluation_params=[LLMTestCaseParams.ACTUAL_OUTPUT],
+    model=get_judge(),
     threshold=0.5,
 )
 
@@ -0,0 +1,81 @@
+"""Judge-versus-human agreement — Streamlit page."""
+
+import json
+from pathlib import Path
+
+import polars as pl
+import streamlit as st
+
+from src.agreement import (
+    FACETS,
+    best_thresholds,
+    collect,
+    confusion,
+    joined,
+    over_time,
+    scan_grades,
+    scan_judge_scores,
+    threshold_sweep,
+)
+from src.sampling import strata_frame
+
+# ── Paths ────────────────────────────────────────────────────────────────
+ROOT = Path(__file__).parent.parent
+TRACES_PATH = ROOT / "data" / "traces.json"
+GRADES_PATH = ROOT / "data" / "grades.csv"
+JUDGE_SCORES_PATH = ROOT / "data" / "judge_scores.csv"
+
+st.set_page_config(page_title="Judge Agreement", page_icon="📊", layout="wide")
+
+
+# ── Helpers ──────────────────────────────────────────────────────────────
+def mtime(path: Path) -> float:
+    return path.stat().st_mtime if path.exists() else 0.0
+
+
+@st.cache_data
+def agreement(
+    grades_mtime: float, scores_mtime: float, by: tuple[str, ...], every: str
+) -> tuple[pl.DataFrame, pl.DataFrame, pl.DataFrame]:
+    """Confusion table, agreement over time and threshold sweep; the mtimes
+    invalidate the cache when grades or judge scores change."""
+    facets = strata_frame(json.loads(TRACES_PATH.read_text())).drop("stratum").lazy()
+    pairs = joined(scan_grades(GRADES_PATH), scan_judge_scores(JUDGE_SCORES_PATH), facets)
+    return (
+        collect(confusion(pairs, list(by))),
+        collect(over_time(pairs, every)),
+        collect(threshold_sweep(pairs)),
+    )
+
+
+# ── Page ─────────────────────────────────────────────────────────────────
+st.title("📊 Judge vs human agreement")
+
+with st.sidebar:
+    by = st.multiselect("Break down by", FACETS)
+    every = st.selectbox("Period", ["1d", "1w", "1mo"], index=1)
+
+table, timeline, sweep = agreement(
+    mtime(GRADES_PATH), mtime(JUDGE_SCORES_PATH), tuple(by), every
+)
+
+if table.height == 0:
+    st.info(
+        "No traces have both a human grade and a judge score yet. Grade some "
+        "traces and run `uv run python -m src.grading_queue score`."
+    )
+    st.stop()
+
+st.subheader("Per metric")
+st.dataframe(table, use_container_width=True, hide_index=True)
+
+st.subheader("Cohen's kappa over time")
+st.line_chart(
+    timeline.pivot(on="metric", index="period", values="kappa").sort("period"),
+    x="period",
+)
+
+st.subheader("Threshold sweep")
+st.line_chart(sweep.pivot(on="metric", index="threshold", values="kappa"), x="threshold")
+st.caption("Best threshold per metric (highest kappa)")
+st.dataframe(best_thresholds(sweep), hide_index=True)
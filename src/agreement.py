@@ -0,0 +1,180 @@
+"""Judge-versus-human agreement analytics — lazy Polars over CSV.
+
+Human pass/fail grades and judge scores are scanned lazily, joined on
+``trace_id`` and reduced to per-metric confusion counts, from which
+precision, recall, accuracy and Cohen's kappa follow. Every query is a
+LazyFrame collected with the streaming engine, so the grade store and judge
+results can be larger than memory. "Positive" means pass throughout.
+
+    uv run python -m src.agreement --by scenario --sweep
+"""
+
+import argparse
+import json
+from pathlib import Path
+
+import polars as pl
+
+from src.grading_queue import JUDGE_SCORES_SCHEMA
+from src.sampling import strata_frame
+from src.state import scan_grades as scan_grade_store
+
+FACETS = ["scenario", "has_discount", "product_category"]
+SWEEP_THRESHOLDS = [round(0.05 * i, 2) for i in range(1, 20)]
+
+
+# ── Scans ────────────────────────────────────────────────────────────────
+def scan_grades(path: str | Path, include_propagated: bool = False) -> pl.LazyFrame:
+    """Human pass/fail grades; skipped or missing files yield no rows.
+    Grades copied to near-duplicates are left out unless
+    *include_propagated*: they'd count one judgment many times."""
+    grades = scan_grade_store(path).filter(pl.col("grade").is_in(["pass", "fail"]))
+    if not include_propagated:
+        grades = grades.filter(pl.col("propagated_from").is_null())
+    return grades
+
+
+def scan_judge_scores(path: str | Path) -> pl.LazyFrame:
+    path = Path(path)
+    if not path.exists() or path.stat().st_size == 0:
+        return pl.LazyFrame(schema=JUDGE_SCORES_SCHEMA)
+    return pl.scan_csv(path, schema=JUDGE_SCORES_SCHEMA)
+
+
+def joined(
+    grades: pl.LazyFrame,
+    scores: pl.LazyFrame,
+    facets: pl.LazyFrame | None = None,
+) -> pl.LazyFrame:
+    """One row per (trace, metric) graded by both: ``human`` and ``judge``
+    pass booleans, the judge ``score``/``threshold``, ``graded_at`` and any
+    facet columns."""
+    pairs = scores.join(
+        grades.select(
+            "trace_id",
+            (pl.col("grade") == "pass").alias("human"),
+            pl.col("graded_at").str.to_datetime(time_zone="UTC", strict=False),
+        ),
+        on="trace_id",
+    ).with_columns((pl.col("score") >= pl.col("threshold")).alias("judge"))
+    if facets is not None:
+        pairs = pairs.join(facets, on="trace_id", how="left")
+    return pairs
+
+
+# ── Statistics ───────────────────────────────────────────────────────────
+def _counts(judge: pl.Expr, human: pl.Expr) -> list[pl.Expr]:
+    return [
+        (judge & human).sum().alias("tp"),
+        (judge & ~human).sum().alias("fp"),
+        (~judge & human).sum().alias("fn"),
+        (~judge & ~human).sum().alias("tn"),
+    ]
+
+
+def _rates() -> list[pl.Expr]:
+    tp, fp, fn, tn = (pl.col(c).cast(pl.Float64) for c in ["tp", "fp", "fn", "tn"])
+    n = tp + fp + fn + tn
+    observed = (tp + tn) / n
+    # Agreement expected by chance from each rater's pass rate
+    expected = ((tp + fp) * (tp + fn) + (fn + tn) * (fp + tn)) / (n * n)
+    return [
+        n.cast(pl.UInt32).alias("n"),
+        (tp / (tp + fp)).alias("precision"),
+        (tp / (tp + fn)).alias("recall"),
+        observed.alias("accuracy"),
+        pl.when(expected < 1)
+        .then((observed - expected) / (1 - expected))
+        .otherwise(pl.lit(1.0))  # both raters constant and in agreement
+        .alias("kappa"),
+    ]
+
+
+def confusion(pairs: pl.LazyFrame, by: list[str] | None = None) -> pl.LazyFrame:
+    """Confusion counts and agreement statistics per metric (and facet)."""
+    keys = ["metric", *(by or [])]
+    return (
+        pairs.group_by(keys)
+        .agg(_counts(pl.col("judge"), pl.col("human")))
+        .with_columns(_rates())
+        .sort(keys)
+    )
+
+
+def threshold_sweep(
+    pairs: pl.LazyFrame,
+    thresholds: list[float] = SWEEP_THRESHOLDS,
+    by: list[str] | None = None,
+) -> pl.LazyFrame:
+    """Agreement per metric had the judge used each of *thresholds*."""
+    keys = ["metric", *(by or []), "sweep"]
+    grid = pl.LazyFrame({"sweep": thresholds}, schema={"sweep": pl.Float64})
+    return (
+        pairs.join(grid, how="cross")
+        .group_by(keys)
+        .agg(_counts(pl.col("score") >= pl.col("sweep"), pl.col("human")))
+        .with_columns(_rates())
+        .rename({"sweep": "threshold"})
+        .sort(["metric", *(by or []), "threshold"])
+    )
+
+
+def over_time(pairs: pl.LazyFrame, every: str = "1w") -> pl.LazyFrame:
+    """Agreement per metric for each *every*-long period of ``graded_at``."""
+    return confusion(
+        pairs.drop_nulls("graded_at").with_columns(
+            pl.col("graded_at").dt.truncate(every).alias("period")
+        ),
+        by=["period"],
+    )
+
+
+def best_thresholds(sweep: pl.DataFrame) -> pl.DataFrame:
+    """The threshold with the highest kappa per metric."""
+    return (
+        sweep.drop_nans("kappa")
+        .sort("kappa", descending=True, maintain_order=True)
+        .group_by("metric", maintain_order=True)
+        .first()
+        .select("metric", "threshold", "kappa")
+        .sort("metric")
+    )
+
+
+def collect(query: pl.LazyFrame) -> pl.DataFrame:
+    return query.collect(engine="streaming")
+
+
+# ── CLI ──────────────────────────────────────────────────────────────────
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--traces", default=Path("data/traces.json"), type=Path)
+    parser.add_argument("--grades", default=Path("data/grades.csv"), type=Path)
+    parser.add_argument("--scores", default=Path("data/judge_scores.csv"), type=Path)
+    parser.add_argument("--by", action="append", choices=FACETS, default=[])
+    parser.add_argument("--every", help="also report agreement per period, e.g. 1d, 1w")
+    parser.add_argument("--sweep", action="store_true", help="sweep judge thresholds")
+    args = parser.parse_args(argv)
+
+    facets = strata_frame(json.loads(args.traces.read_text())).drop("stratum").lazy()
+    pairs = joined(scan_grades(args.grades), scan_judge_scores(args.scores), facets)
+
+    with pl.Config(tbl_rows=-1, tbl_cols=-1, tbl_hide_dataframe_shape=True, float_precision=3):
+        table = collect(confusion(pairs, args.by))
+        if table.height == 0:
+            print("No traces have both a human grade and a judge score.")
+            return
+        print(table)
+        if args.every:
+            print(collect(over_time(pairs, args.every)))
+        if args.sweep:
+            sweep = collect(threshold_sweep(pairs, by=args.by))
+            print(sweep)
+            if args.by:
+                sweep = collect(threshold_sweep(pairs))
+            print("Best threshold per metric (by kappa):")
+            print(best_thresholds(sweep))
+
+
+if __name__ == "__main__":
+    main()
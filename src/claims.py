@@ -0,0 +1,345 @@
+"""Deterministic price, discount and spec claim verifier — Polars + JSON catalog.
+
+Numeric claims (prices, discount percentages, PPI, weights, battery life) are
+pulled out of every assistant turn with compiled patterns and checked against
+an indexed product catalog and each trace's ``metadata.has_discount``. All
+traces go through the same handful of vectorized passes, so a whole dataset
+is verified in milliseconds. A claim is ``ok``, a ``violation``, or
+``unresolved`` when the catalog can't settle it; only traces with unresolved
+(or no) claims need the LLM judge.
+
+    uv run python -m src.claims
+"""
+
+import argparse
+import json
+from pathlib import Path
+
+import polars as pl
+
+CATALOG_PATH = Path(__file__).parent.parent / "data" / "catalog.json"
+
+CLAIM_SCHEMA = {
+    "trace_id": pl.Utf8,
+    "turn": pl.UInt32,
+    "claim_type": pl.Utf8,
+    "text": pl.Utf8,
+    "value": pl.Float64,
+    "product": pl.Utf8,
+}
+
+VERDICT_SCHEMA = {
+    **CLAIM_SCHEMA,
+    "verdict": pl.Utf8,
+    "message": pl.Utf8,
+}
+
+# Catalog attribute checked for each spec claim type
+SPEC_ATTRIBUTES = {"ppi": "ppi", "weight": "weight_g", "battery": "battery_weeks"}
+
+# Claim types behind each GEval accuracy metric; withheld discounts are
+# reported as "discount" claims
+PRODUCT_CLAIMS = ["price", *SPEC_ATTRIBUTES]
+DISCOUNT_CLAIMS = ["discount"]
+
+# ── Patterns ─────────────────────────────────────────────────────────────
+# Sentences end at punctuation followed by whitespace, so "$119.99" stays whole.
+_SENTENCE = r"(?:[^.!?]|[.!?][^\s.!?])+[.!?]*"
+_PRODUCT = r"\b(?:PaperLight\s+)?(Classic|Pro|Mini|Aqua|Max)\b"
+_CLAIMS = {
+    "price": r"\$\d[\d,]*(?:\.\d{2})?",
+    "discount": r"\d+(?:\.\d+)?% off|\d+(?:\.\d+)?% discount|discount of \d+(?:\.\d+)?%",
+    "ppi": r"\d+ ?PPI",
+    "weight": r"\d+ ?(?:grams|g)\b",
+    "battery": r"\d+[- ]weeks?\b",
+}
+_TOKEN = "|".join([_PRODUCT, *_CLAIMS.values()])
+_NUMBER = r"(\d[\d,]*(?:\.\d+)?)"
+
+_ASKS_DISCOUNT = r"(?i)\b(?:sales?|deals?|discounts?|promos?|promotions?|coupons?)\b"
+_MENTIONS_DISCOUNT = r"(?i)\d+% off|\b(?:discount|sale|promotion|deal)s?\b"
+
+
+# ── Catalog index ────────────────────────────────────────────────────────
+def load_catalog(path: str | Path = CATALOG_PATH) -> dict:
+    return json.loads(Path(path).read_text())
+
+
+def spec_index(catalog: dict) -> pl.DataFrame:
+    """One row per (product, attribute) with its catalog value."""
+    return pl.DataFrame(
+        [
+            {"product": product, "attribute": attribute, "expected": float(value)}
+            for product, specs in catalog["products"].items()
+            for attribute, value in specs.items()
+        ],
+        schema={"product": pl.Utf8, "attribute": pl.Utf8, "expected": pl.Float64},
+    )
+
+
+def price_index(catalog: dict) -> pl.DataFrame:
+    """Every price the catalog can justify, keyed by amount.
+
+    ``needs_discount`` marks discounted prices, which are only valid in
+    traces where a discount is available.
+    """
+    rows = [
+        {"value": float(specs["price"]), "source": product, "needs_discount": False}
+        for product, specs in catalog["products"].items()
+        if "price" in specs
+    ]
+    rows += [
+        {"value": float(price), "source": name, "needs_discount": False}
+        for name, price in catalog.get("other_prices", {}).items()
+    ]
+    rows += [
+        {
+            "value": round(catalog["products"][product]["price"] * (100 - d["percent"]) / 100, 2),
+            "source": f"{product} ({d['name']})",
+            "needs_discount": True,
+        }
+        for d in catalog.get("discounts", [])
+        for product in d["products"]
+    ]
+    # A list price that happens to equal a discounted one never needs a discount
+    return (
+        pl.DataFrame(rows, schema={"value": pl.Float64, "source": pl.Utf8, "needs_discount": pl.Boolean})
+        .group_by("value")
+        .agg(pl.col("source").first(), pl.col("needs_discount").all())
+    )
+
+
+def discount_rates(catalog: dict) -> list[float]:
+    return sorted({float(d["percent"]) for d in catalog.get("discounts", [])})
+
+
+# ── Extraction ───────────────────────────────────────────────────────────
+def turns_frame(traces: list[dict]) -> pl.DataFrame:
+    """One row per turn: ``trace_id``, ``turn``, ``role``, ``content``, ``has_discount``."""
+    return pl.DataFrame(
+        [
+            {
+                "trace_id": t["trace_id"],
+                "turn": i,
+                "role": turn["role"],
+                "content": turn["content"],
+                "has_discount": bool(t.get("metadata", {}).get("has_discount", False)),
+            }
+            for t in traces
+            for i, turn in enumerate(t["turns"])
+        ],
+        schema={
+            "trace_id": pl.Utf8,
+            "turn": pl.UInt32,
+            "role": pl.Utf8,
+            "content": pl.Utf8,
+            "has_discount": pl.Boolean,
+        },
+    )
+
+
+def extract_claims(turns: pl.DataFrame) -> pl.DataFrame:
+    """Numeric claims in assistant turns, each attributed to a product.
+
+    A claim belongs to the nearest product named earlier in its sentence,
+    else later in its sentence, else the last product named anywhere earlier
+    in the conversation (user turns included).
+    """
+    tokens = (
+        turns.lazy()
+        .with_columns(pl.col("content").str.extract_all(_SENTENCE).alias("sentence"))
+        .explode("sentence")
+        .with_columns(pl.int_range(pl.len()).over("trace_id", "turn").alias("sentence_idx"))
+        .with_columns(pl.col("sentence").str.extract_all(_TOKEN).alias("text"))
+        .explode("text")
+        .drop_nulls("text")
+        .with_columns(
+            pl.col("text").str.extract(_PRODUCT, 1).alias("mention"),
+            pl.coalesce(
+                pl.when(pl.col("text").str.contains(f"^(?:{pattern})$")).then(pl.lit(kind))
+                for kind, pattern in _CLAIMS.items()
+            ).alias("claim_type"),
+        )
+    )
+    sentence = ["trace_id", "turn", "sentence_idx"]
+    return (
+        tokens.with_columns(
+            pl.coalesce(
+                pl.col("mention").forward_fill().over(sentence),
+                pl.col("mention").backward_fill().over(sentence),
+                pl.col("mention").forward_fill().over("trace_id"),
+            ).alias("product")
+        )
+        .filter(pl.col("claim_type").is_not_null() & (pl.col("role") == "assistant"))
+        .select(
+            "trace_id",
+            "turn",
+            "claim_type",
+            "text",
+            pl.col("text").str.extract(_NUMBER).str.replace_all(",", "").cast(pl.Float64).alias("value"),
+            "product",
+        )
+        .collect()
+    )
+
+
+# ── Verification ─────────────────────────────────────────────────────────
+def verify_claims(traces: list[dict], catalog: dict | None = None) -> pl.DataFrame:
+    """Every assistant claim with a ``verdict`` (ok / violation / unresolved)
+    and a human-readable ``message``, plus one row per trace that withholds
+    an available discount the customer asked about."""
+    catalog = catalog if catalog is not None else load_catalog()
+    turns = turns_frame(traces)
+    discounts = turns.group_by("trace_id").agg(pl.col("has_discount").first())
+    claims = extract_claims(turns).join(discounts, on="trace_id", how="left")
+
+    prices = claims.join(price_index(catalog), on="value", how="left")
+    specs = claims.with_columns(
+        pl.col("claim_type").replace_strict(SPEC_ATTRIBUTES, default=None).alias("attribute")
+    ).join(spec_index(catalog), on=["product", "attribute"], how="left")
+    rates = discount_rates(catalog)
+
+    price_verdict = (
+        pl.when(pl.col("source").is_null())
+        .then(pl.lit("unresolved"))
+        .when(pl.col("needs_discount") & ~pl.col("has_discount"))
+        .then(pl.lit("violation"))
+        .otherwise(pl.lit("ok"))
+    )
+    price_message = (
+        pl.when(pl.col("source").is_null())
+        .then(pl.format("{} is not a catalog price", "text"))
+        .when(pl.col("needs_discount") & ~pl.col("has_discount"))
+        .then(pl.format("{} is the {} price but no discount is available", "text", "source"))
+        .otherwise(pl.format("{} matches {}", "text", "source"))
+    )
+    checked_prices = prices.filter(pl.col("claim_type") == "price").select(
+        *CLAIM_SCHEMA, price_verdict.alias("verdict"), price_message.alias("message")
+    )
+
+    discount_claims = claims.filter(pl.col("claim_type") == "discount").select(
+        *CLAIM_SCHEMA,
+        pl.when(~pl.col("has_discount") | ~pl.col("value").is_in(rates))
+        .then(pl.lit("violation"))
+        .otherwise(pl.lit("ok"))
+        .alias("verdict"),
+        pl.when(~pl.col("has_discount"))
+        .then(pl.format("claims {} but no discount is available", "text"))
+        .when(~pl.col("value").is_in(rates))
+        .then(pl.format("{} is not a catalog discount rate", "text"))
+        .otherwise(pl.format("{} is a catalog discount rate", "text"))
+        .alias("message"),
+    )
+
+    spec_claims = specs.filter(pl.col("attribute").is_not_null()).select(
+        *CLAIM_SCHEMA,
+        pl.when(pl.col("expected").is_null())
+        .then(pl.lit("unresolved"))
+        .when(pl.col("value") != pl.col("expected"))
+        .then(pl.lit("violation"))
+        .otherwise(pl.lit("ok"))
+        .alias("verdict"),
+        pl.when(pl.col("expected").is_null())
+        .then(pl.format("no catalog {} for {}", "attribute", pl.col("product").fill_null("an unnamed product")))
+        .when(pl.col("value") != pl.col("expected"))
+        .then(pl.format("{} for {}, catalog says {}", "text", "product", "expected"))
+        .otherwise(pl.format("{} matches {}", "text", "product"))
+        .alias("message"),
+    )
+
+    # An available discount the customer asked about must be mentioned
+    withheld = (
+        turns.group_by("trace_id", maintain_order=True)
+        .agg(
+            pl.col("has_discount").first(),
+            pl.col("content").filter(pl.col("role") == "user").str.contains(_ASKS_DISCOUNT).any().alias("asked"),
+            pl.col("content").filter(pl.col("role") == "assistant").str.contains(_MENTIONS_DISCOUNT).any().alias("mentioned"),
+        )
+        .filter(pl.col("has_discount") & pl.col("asked") & ~pl.col("mentioned"))
+        .select(
+            "trace_id",
+            pl.lit(None, pl.UInt32).alias("turn"),
+            pl.lit("discount").alias("claim_type"),
+            pl.lit("").alias("text"),
+            pl.lit(None, pl.Float64).alias("value"),
+            pl.lit(None, pl.Utf8).alias("product"),
+            pl.lit("violation").alias("verdict"),
+            pl.lit("a discount is available but the customer was not told").alias("message"),
+        )
+    )
+
+    return pl.concat(
+        [checked_prices, discount_claims, spec_claims, withheld], how="vertical"
+    ).cast(VERDICT_SCHEMA).sort("trace_id", "turn", nulls_last=True)
+
+
+def trace_verdicts(
+    traces: list[dict],
+    catalog: dict | None = None,
+    claim_types: list[str] | None = None,
+) -> pl.DataFrame:
+    """One row per trace with its claim counts and overall ``status``, over
+    every claim or only those of *claim_types*:
+
+    - ``violation``: at least one claim contradicts the catalog
+    - ``unresolved``: some claims can't be checked — ask the judge
+    - ``verified``: every claim checks out
+    - ``no_claims``: nothing to check — ask the judge
+    """
+    checked = verify_claims(traces, catalog)
+    if claim_types is not None:
+        checked = checked.filter(pl.col("claim_type").is_in(claim_types))
+    per_trace = checked.group_by("trace_id").agg(
+        pl.len().alias("claims"),
+        (pl.col("verdict") == "violation").sum().alias("violations"),
+        (pl.col("verdict") == "unresolved").sum().alias("unresolved"),
+        pl.col("message").filter(pl.col("verdict") == "violation").alias("messages"),
+    )
+    return (
+        pl.DataFrame({"trace_id": [t["trace_id"] for t in traces]}, schema={"trace_id": pl.Utf8})
+        .join(per_trace, on="trace_id", how="left", maintain_order="left")
+        .with_columns(
+            pl.col("claims", "violations", "unresolved").fill_null(0),
+            pl.col("messages").fill_null([]),
+        )
+        .with_columns(
+            pl.when(pl.col("violations") > 0)
+            .then(pl.lit("violation"))
+            .when(pl.col("unresolved") > 0)
+            .then(pl.lit("unresolved"))
+            .when(pl.col("claims") > 0)
+            .then(pl.lit("verified"))
+            .otherwise(pl.lit("no_claims"))
+            .alias("status")
+        )
+    )
+
+
+def needs_judge(verdicts: pl.DataFrame) -> list[str]:
+    """Trace ids the claim verifier could not settle on its own."""
+    return verdicts.filter(pl.col("status").is_in(["unresolved", "no_claims"]))["trace_id"].to_list()
+
+
+# ── CLI ──────────────────────────────────────────────────────────────────
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--traces", default=Path("data/traces.json"), type=Path)
+    parser.add_argument("--catalog", default=CATALOG_PATH, type=Path)
+    args = parser.parse_args(argv)
+
+    traces = json.loads(args.traces.read_text())
+    verdicts = trace_verdicts(traces, load_catalog(args.catalog))
+    for trace_id, messages in verdicts.filter(pl.col("status") == "violation").select(
+        "trace_id", "messages"
+    ).iter_rows():
+        for message in messages:
+            print(f"{trace_id}: {message}")
+    counts = dict(verdicts.group_by("status").len().iter_rows())
+    print(
+        ", ".join(f"{counts.get(s, 0)} {s}" for s in ["verified", "violation", "unresolved", "no_claims"])
+        + f" — {len(needs_judge(verdicts))} traces left for the judge"
+    )
+
+
+if __name__ == "__main__":
+    main()
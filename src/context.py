@@ -0,0 +1,167 @@
+"""Token-budgeted conversation context for LLM judges."""
+
+import hashlib
+import json
+import math
+import re
+
+# Rough local approximation of a BPE pre-tokenizer: contractions, words,
+# numbers and runs of punctuation each count as (at least) one token, and long
+# words are charged one token per ~4 characters.
+_TOKEN_RE = re.compile(r"'(?:s|t|re|ve|m|ll|d)|\w+|[^\w\s]+", re.IGNORECASE)
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+")
+
+DEFAULT_BUDGET = 2000
+SUMMARY_TURN_TOKENS = 30
+
+
+def count_tokens(text: str) -> int:
+    """Estimate the number of tokens in *text* without calling a tokenizer."""
+    return sum(max(1, math.ceil(len(piece) / 4)) for piece in _TOKEN_RE.findall(text))
+
+
+def trace_hash(trace: dict) -> str:
+    """Return a stable content hash for *trace*."""
+    payload = json.dumps(trace, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha1(payload.encode()).hexdigest()
+
+
+def format_turn(turn: dict) -> str:
+    return f"{turn['role'].upper()}: {turn['content']}"
+
+
+def summarize_turn(turn: dict, max_tokens: int = SUMMARY_TURN_TOKENS) -> str:
+    """Cheap extractive summary: the first sentence of a turn, clipped."""
+    first = _SENTENCE_RE.split(turn["content"].strip(), maxsplit=1)[0]
+    return f"{turn['role'].upper()} (summary): {truncate_tokens(first, max_tokens)}"
+
+
+def truncate_tokens(text: str, max_tokens: int) -> str:
+    """Clip *text* to roughly *max_tokens* tokens, marking the cut with '…'."""
+    if count_tokens(text) <= max_tokens:
+        return text
+    used = 0
+    for match in _TOKEN_RE.finditer(text):
+        used += max(1, math.ceil(len(match.group()) / 4))
+        if used >= max_tokens:  # leave room for the '…' marker
+            return text[: match.start()].rstrip() + " …"
+    return text
+
+
+def metadata_lines(trace: dict) -> list[str]:
+    """Header lines for the judge. Metadata keys other than product category
+    and discount eligibility are irrelevant to the metrics and are dropped."""
+    metadata = trace.get("metadata", {})
+    return [
+        f"Scenario: {trace['scenario']}",
+        f"Product: {metadata.get('product_category', 'e-ink reader')}",
+        f"Discount available: {'Yes' if metadata.get('has_discount') else 'No'}",
+    ]
+
+
+class ContextBuilder:
+    """Build judge context strings that fit within a token budget.
+
+    Conversations that already fit are rendered verbatim. Longer ones keep the
+    first *head_turns* and last *tail_turns* turns, summarize the middle, and
+    finally clip the head if that is still not enough. Results are memoized
+    per ``(trace hash, budget)`` and token savings are tracked in ``stats``.
+    """
+
+    def __init__(
+        self,
+        budget: int = DEFAULT_BUDGET,
+        head_turns: int = 2,
+        tail_turns: int = 4,
+    ):
+        self.budget = budget
+        self.head_turns = head_turns
+        self.tail_turns = tail_turns
+        self._cache: dict[tuple[str, int], tuple[str, int, int]] = {}
+        self.stats = {
+            "calls": 0,
+            "cache_hits": 0,
+            "tokens_full": 0,
+            "tokens_built": 0,
+            "tokens_saved": 0,
+            "truncated": 0,
+        }
+
+    def build(self, trace: dict, budget: int | None = None) -> str:
+        budget = self.budget if budget is None else budget
+        key = (trace_hash(trace), budget)
+        self.stats["calls"] += 1
+
+        if key in self._cache:
+            self.stats["cache_hits"] += 1
+            context, full_tokens, built_tokens = self._cache[key]
+        else:
+            full = self._render(trace, trace["turns"])
+            full_tokens = count_tokens(full)
+            context = full if full_tokens <= budget else self._fit(trace, budget)
+            built_tokens = count_tokens(context)
+            self._cache[key] = (context, full_tokens, built_tokens)
+
+        self.stats["tokens_full"] += full_tokens
+        self.stats["tokens_built"] += built_tokens
+        self.stats["tokens_saved"] += full_tokens - built_tokens
+        if built_tokens < full_tokens:
+            self.stats["truncated"] += 1
+        return context
+
+    def summary(self) -> str:
+        s = self.stats
+        pct = 100 * s["tokens_saved"] / s["tokens_full"] if s["tokens_full"] else 0.0
+        return (
+            f"Context builder: {s['calls']} contexts ({s['cache_hits']} cached), "
+            f"{s['truncated']} over budget, {s['tokens_saved']} tokens saved "
+            f"({pct:.1f}% of {s['tokens_full']})"
+        )
+
+    # ── Internals ────────────────────────────────────────────────────────
+    def _render(self, trace: dict, conversation_lines: list) -> str:
+        lines = [
+            line if isinstance(line, str) else format_turn(line)
+            for line in conversation_lines
+        ]
+        return "\n".join(
+            [*metadata_lines(trace), "", "Full conversation:", *lines]
+        )
+
+    def _fit(self, trace: dict, budget: int) -> str:
+        turns = trace["turns"]
+        n_head = min(self.head_turns, len(turns))
+        n_tail = min(self.tail_turns, len(turns) - n_head)
+        head = turns[:n_head]
+        middle = turns[n_head : len(turns) - n_tail]
+        tail = turns[len(turns) - n_tail :]
+
+        # 1. Summarize the middle turns; 2. drop summaries, oldest first, until
+        # the rest fits. Lines are newline-joined, so token counts add up.
+        if middle:
+            summaries = [summarize_turn(t) for t in middle]
+            marker = f"[… {len(middle)} middle turns summarized …]"
+            remaining = budget - count_tokens(self._render(trace, [*head, marker, *tail]))
+            costs = [count_tokens(s) for s in summaries]
+            total = sum(costs)
+            start = 0
+            while start < len(summaries) and total > remaining:
+                total -= costs[start]
+                start += 1
+            if total <= remaining and start < len(summaries):
+                return self._render(trace, [*head, marker, *summaries[start:], *tail])
+            lines = [*head, f"[… {len(middle)} middle turns omitted …]", *tail]
+        else:
+            lines = [*head, *tail]
+
+        # 3. Clip the head turns, then everything, to the remaining budget.
+        overflow = count_tokens(self._render(trace, lines)) - budget
+        clipped_head = []
+        for turn in head:
+            text = format_turn(turn)
+            keep = max(SUMMARY_TURN_TOKENS, count_tokens(text) - overflow)
+            clipped = truncate_tokens(text, keep)
+            overflow -= count_tokens(text) - count_tokens(clipped)
+            clipped_head.append(clipped)
+        lines = [*clipped_head, *lines[len(head) :]]
+        return truncate_tokens(self._render(trace, lines), budget)
@@ -0,0 +1,288 @@
+"""Near-duplicate trace detection with MinHash + LSH — Polars + CSV.
+
+Each trace's turns are normalized (lowercased, punctuation and emoji dropped)
+and split into word shingles. MinHash signatures estimate Jaccard similarity
+between shingle sets; LSH banding only compares traces that share a bucket,
+so the whole pipeline is a handful of vectorized passes (near-linear in the
+number of traces). Verified pairs above the threshold are merged into
+clusters, each represented by its first trace in file order, so graders and
+judges can handle one trace per cluster and propagate the result.
+
+    uv run python -m src.dedup --threshold 0.8
+"""
+
+import argparse
+import json
+import random
+from collections.abc import Callable, Iterable
+from pathlib import Path
+
+import polars as pl
+
+CLUSTER_SCHEMA = {
+    "trace_id": pl.Utf8,
+    "cluster_id": pl.Utf8,
+    "cluster_size": pl.UInt32,
+}
+
+NUM_PERM = 128
+SHINGLE_SIZE = 3
+_MERSENNE_61 = (1 << 61) - 1
+
+
+def _permutations(num_perm: int, seed: int) -> list[tuple[int, int]]:
+    # a < 2**29 and 32-bit shingle hashes keep a * x + b inside uint64.
+    rng = random.Random(seed)
+    return [
+        (rng.randrange(1, 1 << 29), rng.randrange(0, _MERSENNE_61))
+        for _ in range(num_perm)
+    ]
+
+
+def trace_texts(traces: list[dict]) -> pl.DataFrame:
+    """One row per trace: ``trace_id``, ``file_order`` and joined turn text."""
+    return pl.DataFrame(
+        {
+            "trace_id": [t["trace_id"] for t in traces],
+            "text": ["\n".join(turn["content"] for turn in t["turns"]) for t in traces],
+        },
+        schema={"trace_id": pl.Utf8, "text": pl.Utf8},
+    ).with_row_index("file_order")
+
+
+def minhash_signatures(
+    texts: pl.DataFrame,
+    num_perm: int = NUM_PERM,
+    shingle_size: int = SHINGLE_SIZE,
+    seed: int = 0,
+) -> pl.DataFrame:
+    """MinHash signature columns ``m0 … m{num_perm-1}`` per ``trace_id``."""
+    words = (
+        texts.lazy()
+        .select(
+            "trace_id",
+            pl.col("text").str.to_lowercase().str.extract_all(r"\w+").alias("word"),
+        )
+        .explode("word")
+        .drop_nulls("word")
+    )
+    shingles = (
+        words.with_columns(
+            pl.concat_str(
+                [pl.col("word").shift(-i).over("trace_id") for i in range(shingle_size)],
+                separator=" ",
+            ).alias("shingle")
+        )
+        # Texts shorter than one shingle fall back to their individual words.
+        .filter(
+            pl.col("shingle").is_not_null()
+            | (pl.col("word").count().over("trace_id") < shingle_size)
+        )
+        .select(
+            "trace_id",
+            (pl.coalesce("shingle", "word").hash(seed) & 0xFFFFFFFF).alias("h"),
+        )
+        .unique()
+    )
+    signatures = shingles.group_by("trace_id").agg(
+        ((pl.col("h") * a + b) % _MERSENNE_61).min().alias(f"m{i}")
+        for i, (a, b) in enumerate(_permutations(num_perm, seed))
+    )
+    # Traces with no words at all get a signature matching nothing else.
+    return (
+        texts.lazy()
+        .select("trace_id")
+        .join(signatures, on="trace_id", how="left")
+        .collect()
+    )
+
+
+def lsh_params(threshold: float, num_perm: int = NUM_PERM) -> tuple[int, int]:
+    """Choose (bands, rows) whose S-curve midpoint ``(1/b)**(1/r)`` sits just
+    below *threshold*, favouring recall; exact verification removes the
+    extra candidates."""
+    best = (num_perm, 1)
+    best_point = -1.0
+    for rows in range(1, num_perm + 1):
+        bands = num_perm // rows
+        point = (1 / bands) ** (1 / rows)
+        if best_point < point <= threshold:
+            best, best_point = (bands, rows), point
+    return best
+
+
+def candidate_pairs(signatures: pl.DataFrame, bands: int, rows: int) -> pl.DataFrame:
+    """Pairs of traces sharing at least one LSH bucket. Each bucket links its
+    members to its first member only, keeping candidates linear in size."""
+    buckets = signatures.lazy().select(
+        "trace_id",
+        *(
+            pl.concat_list([f"m{band * rows + r}" for r in range(rows)])
+            .hash()
+            .alias(f"b{band}")
+            for band in range(bands)
+        ),
+    )
+    return (
+        buckets.unpivot(index="trace_id", variable_name="band", value_name="bucket")
+        .drop_nulls("bucket")
+        .group_by("band", "bucket")
+        .agg(pl.col("trace_id").sort())
+        .filter(pl.col("trace_id").list.len() > 1)
+        .select(
+            pl.col("trace_id").list.first().alias("left"),
+            pl.col("trace_id").list.slice(1).alias("right"),
+        )
+        .explode("right")
+        .unique()
+        .collect()
+    )
+
+
+def similar_pairs(
+    signatures: pl.DataFrame,
+    threshold: float,
+    num_perm: int = NUM_PERM,
+) -> pl.DataFrame:
+    """Candidate pairs whose estimated Jaccard similarity is >= *threshold*."""
+    bands, rows = lsh_params(threshold, num_perm)
+    pairs = candidate_pairs(signatures, bands, rows)
+    sig_cols = [f"m{i}" for i in range(num_perm)]
+    right = signatures.rename({c: f"{c}_r" for c in sig_cols})
+    return (
+        pairs.join(signatures, left_on="left", right_on="trace_id")
+        .join(right, left_on="right", right_on="trace_id")
+        .select(
+            "left",
+            "right",
+            (pl.sum_horizontal(pl.col(c) == pl.col(f"{c}_r") for c in sig_cols) / num_perm)
+            .alias("similarity"),
+        )
+        .filter(pl.col("similarity") >= threshold)
+    )
+
+
+def cluster_traces(
+    traces: list[dict],
+    threshold: float = 0.8,
+    num_perm: int = NUM_PERM,
+    seed: int = 0,
+) -> pl.DataFrame:
+    """Group near-duplicate traces. Every trace gets a ``cluster_id``: the
+    trace_id of the cluster's first trace in file order."""
+    texts = trace_texts(traces)
+    signatures = minhash_signatures(texts, num_perm=num_perm, seed=seed)
+    pairs = similar_pairs(signatures, threshold, num_perm)
+
+    order = dict(zip(texts["trace_id"], texts["file_order"]))
+    parent = {tid: tid for tid in order}
+
+    def find(tid: str) -> str:
+        while parent[tid] != tid:
+            parent[tid] = parent[parent[tid]]
+            tid = parent[tid]
+        return tid
+
+    for left, right in pairs.select("left", "right").iter_rows():
+        a, b = find(left), find(right)
+        if a != b:
+            # The earlier trace becomes the root, i.e. the representative.
+            if order[b] < order[a]:
+                a, b = b, a
+            parent[b] = a
+
+    return (
+        pl.DataFrame(
+            {"trace_id": list(order), "cluster_id": [find(t) for t in order]},
+            schema={"trace_id": pl.Utf8, "cluster_id": pl.Utf8},
+        )
+        .with_columns(pl.len().over("cluster_id").cast(pl.UInt32).alias("cluster_size"))
+    )
+
+
+# ── Using clusters ───────────────────────────────────────────────────────
+def load_clusters(path: str | Path) -> pl.DataFrame:
+    """Load clusters CSV, returning an empty DataFrame if it doesn't exist."""
+    path = Path(path)
+    if path.exists() and path.stat().st_size > 0:
+        return pl.read_csv(path, schema=CLUSTER_SCHEMA)
+    return pl.DataFrame(schema=CLUSTER_SCHEMA)
+
+
+def representatives(clusters: pl.DataFrame) -> list[str]:
+    """One trace_id per cluster, in input order."""
+    return clusters.filter(pl.col("trace_id") == pl.col("cluster_id"))["trace_id"].to_list()
+
+
+def next_to_grade(clusters: pl.DataFrame, graded: Iterable[str]) -> list[str]:
+    """One trace_id per cluster, in input order: its first member not yet in
+    *graded* (the representative while it's ungraded), or the representative
+    once every member is graded."""
+    done = pl.Series(list(graded), dtype=pl.Utf8).implode()
+    return (
+        clusters.group_by("cluster_id", maintain_order=True)
+        .agg(pl.col("trace_id").filter(~pl.col("trace_id").is_in(done)).first())
+        .select(pl.coalesce("trace_id", "cluster_id"))
+        .to_series()
+        .to_list()
+    )
+
+
+def cluster_members(clusters: pl.DataFrame, trace_id: str) -> list[str]:
+    """All traces in *trace_id*'s cluster, including itself."""
+    cluster = clusters.filter(pl.col("trace_id") == trace_id)["cluster_id"]
+    if cluster.len() == 0:
+        return [trace_id]
+    return clusters.filter(pl.col("cluster_id") == cluster[0])["trace_id"].to_list()
+
+
+def propagate(results: pl.DataFrame, clusters: pl.DataFrame) -> pl.DataFrame:
+    """Copy per-trace rows (grades, judge scores, …) from each cluster's
+    representative to every member that has no row of its own."""
+    reps = results.join(clusters, on="trace_id").filter(
+        pl.col("trace_id") == pl.col("cluster_id")
+    )
+    copied = (
+        reps.drop("trace_id", "cluster_size")
+        .join(clusters.select("trace_id", "cluster_id"), on="cluster_id")
+        .join(results.select("trace_id").unique(), on="trace_id", how="anti")
+        .select(results.columns)
+    )
+    return pl.concat([results, copied])
+
+
+def dedup_judge(judge: Callable[[dict], dict], clusters: pl.DataFrame) -> Callable:
+    """Wrap a per-trace judge so each cluster is judged at most once."""
+    cluster_of = dict(clusters.select("trace_id", "cluster_id").iter_rows())
+    verdicts: dict[str, dict] = {}
+
+    def judge_once(trace: dict) -> dict:
+        key = cluster_of.get(trace["trace_id"], trace["trace_id"])
+        if key not in verdicts:
+            verdicts[key] = judge(trace)
+        return verdicts[key]
+
+    return judge_once
+
+
+# ── CLI ──────────────────────────────────────────────────────────────────
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--traces", default=Path("data/traces.json"), type=Path)
+    parser.add_argument("--out", default=Path("data/clusters.csv"), type=Path)
+    parser.add_argument("--threshold", type=float, default=0.8)
+    parser.add_argument("--num-perm", type=int, default=NUM_PERM)
+    args = parser.parse_args(argv)
+
+    traces = json.loads(args.traces.read_text())
+    clusters = cluster_traces(traces, args.threshold, args.num_perm)
+    clusters.write_csv(args.out)
+    n_clusters = clusters["cluster_id"].n_unique()
+    print(
+        f"{clusters.height} traces → {n_clusters} clusters "
+        f"({clusters.height - n_clusters} near-duplicates) → {args.out}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,265 @@
+"""Streaming export of traces joined with grades — Parquet or JSONL.
+
+Traces are read from ``traces.json`` (or a ``.jsonl`` file) one object at a
+time, grouped into batches, joined with the grade store on ``trace_id`` and
+streamed into one file per batch, optionally partitioned by a column. The
+grade store is scanned lazily rather than loaded, so memory stays constant
+however large the trace file or the store is. An incremental mode
+exports only traces graded since the previous export, keyed on
+``graded_at``.
+
+    uv run python -m src.export --graded-only --format jsonl
+    uv run python -m src.export --since-last --partition-by grade
+"""
+
+import argparse
+import json
+from collections.abc import Iterable, Iterator
+from datetime import UTC, datetime
+from itertools import islice
+from pathlib import Path
+
+import polars as pl
+
+from src.state import scan_grades
+
+EXPORT_DIR = Path(__file__).parent.parent / "data" / "exports"
+STATE_FILE = "_export_state.json"
+PARTITION_COLUMNS = ["scenario", "grade", "has_discount", "product_category"]
+
+TRACE_SCHEMA = {
+    "trace_id": pl.Utf8,
+    "scenario": pl.Utf8,
+    "has_discount": pl.Boolean,
+    "product_category": pl.Utf8,
+    "turns": pl.List(pl.Struct({"role": pl.Utf8, "content": pl.Utf8})),
+}
+
+EXPORT_SCHEMA = {
+    **TRACE_SCHEMA,
+    "grade": pl.Utf8,
+    "comment": pl.Utf8,
+    "graded_at": pl.Datetime("us", "UTC"),
+    "propagated_from": pl.Utf8,
+}
+
+
+# ── Reading ──────────────────────────────────────────────────────────────
+def iter_traces(path: str | Path, chunk_size: int = 1 << 20) -> Iterator[dict]:
+    """Yield traces one at a time from a JSON array or JSONL file, holding at
+    most one chunk plus one trace in memory."""
+    path = Path(path)
+    with path.open(encoding="utf-8") as f:
+        if path.suffix == ".jsonl":
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+            return
+
+        decoder = json.JSONDecoder()
+        buf, pos = f.read(chunk_size), 0
+        pos = buf.index("[") + 1
+        while True:
+            # Skip separators, refilling the buffer when it runs dry.
+            while True:
+                while pos < len(buf) and buf[pos] in " \t\r\n,":
+                    pos += 1
+                if pos < len(buf):
+                    break
+                buf, pos = f.read(chunk_size), 0
+                if not buf:
+                    raise ValueError(f"{path}: unterminated JSON array")
+            if buf[pos] == "]":
+                return
+            try:
+                trace, end = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                more = f.read(chunk_size)
+                if not more:
+                    raise
+                buf, pos = buf[pos:] + more, 0
+                continue
+            yield trace
+            pos = end
+            if pos > chunk_size:
+                buf, pos = buf[pos:], 0
+
+
+def batches(items: Iterable, size: int) -> Iterator[list]:
+    items = iter(items)
+    while batch := list(islice(items, size)):
+        yield batch
+
+
+def trace_frame(traces: list[dict]) -> pl.DataFrame:
+    """Flatten a batch of traces to the export columns (grades still empty)."""
+    return pl.DataFrame(
+        {
+            "trace_id": [t["trace_id"] for t in traces],
+            "scenario": [t.get("scenario") for t in traces],
+            "has_discount": [t.get("metadata", {}).get("has_discount") for t in traces],
+            "product_category": [t.get("metadata", {}).get("product_category") for t in traces],
+            "turns": [
+                [{"role": turn["role"], "content": turn["content"]} for turn in t["turns"]]
+                for t in traces
+            ],
+        },
+        schema=TRACE_SCHEMA,
+    )
+
+
+def load_grade_store(
+    path: str | Path,
+    graded_only: bool = False,
+    fail_only: bool = False,
+    since: datetime | None = None,
+) -> pl.LazyFrame:
+    """Grades to join, already filtered: one row per graded trace. Lazy, so
+    each join streams the store instead of holding it in memory."""
+    grades = scan_grades(path).with_columns(
+        pl.col("graded_at").str.to_datetime(time_zone="UTC", strict=False)
+    )
+    if graded_only:
+        grades = grades.filter(pl.col("grade").is_in(["pass", "fail"]))
+    if fail_only:
+        grades = grades.filter(pl.col("grade") == "fail")
+    if since is not None:
+        grades = grades.filter(pl.col("graded_at") > since)
+    return grades
+
+
+# ── Export state ─────────────────────────────────────────────────────────
+def last_export(out_dir: str | Path) -> datetime | None:
+    """``graded_at`` high-water mark of the previous incremental export."""
+    path = Path(out_dir) / STATE_FILE
+    if not path.exists():
+        return None
+    return datetime.fromisoformat(json.loads(path.read_text())["last_graded_at"])
+
+
+def save_export_state(out_dir: str | Path, last_graded_at: datetime) -> None:
+    path = Path(out_dir) / STATE_FILE
+    path.write_text(json.dumps({"last_graded_at": last_graded_at.isoformat()}))
+
+
+# ── Export ───────────────────────────────────────────────────────────────
+def _sink(frame: pl.LazyFrame, path: Path, fmt: str) -> pl.LazyFrame:
+    """A query that streams *frame* into *path* when collected."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if fmt == "parquet":
+        return frame.sink_parquet(path, lazy=True)
+    return frame.sink_ndjson(path, lazy=True)
+
+
+def export(
+    traces_path: str | Path,
+    grades_path: str | Path,
+    out_dir: str | Path = EXPORT_DIR,
+    fmt: str = "parquet",
+    batch_size: int = 1000,
+    graded_only: bool = False,
+    fail_only: bool = False,
+    scenarios: list[str] | None = None,
+    since_last: bool = False,
+    partition_by: str | None = None,
+) -> dict:
+    """Stream *traces_path* through the grade join into *out_dir*.
+
+    Files are named ``part-<export id>-<batch>`` so incremental exports add
+    to the directory instead of overwriting earlier ones. Returns counts of
+    traces read and rows and files written.
+    """
+    out_dir = Path(out_dir)
+    since = last_export(out_dir) if since_last else None
+    # Incremental exports only make sense for graded traces.
+    graded_only = graded_only or fail_only or since_last
+    grades = load_grade_store(grades_path, graded_only, fail_only, since)
+    export_id = datetime.now(UTC).strftime("%Y%m%dT%H%M%S%fZ")
+    suffix = "parquet" if fmt == "parquet" else "jsonl"
+
+    stats = {"traces": 0, "rows": 0, "files": 0, "last_graded_at": None}
+    if graded_only and grades.select(pl.len()).collect().item() == 0:
+        return stats
+
+    key = pl.col(partition_by) if partition_by is not None else pl.lit(None)
+    for batch_no, batch in enumerate(batches(iter_traces(traces_path), batch_size)):
+        stats["traces"] += len(batch)
+        rows = trace_frame(batch).lazy()
+        if scenarios:
+            rows = rows.filter(pl.col("scenario").is_in(scenarios))
+        rows = rows.join(
+            grades, on="trace_id", how="inner" if graded_only else "left", maintain_order="left"
+        ).select(EXPORT_SCHEMA.keys())
+        # Rows and latest grade per output file, so only non-empty files are written
+        parts = (
+            rows.group_by(key.alias("key"))
+            .agg(pl.len().alias("rows"), pl.col("graded_at").max())
+            .collect()
+        )
+        if parts.height == 0:
+            continue
+        name = f"part-{export_id}-{batch_no:05d}.{suffix}"
+        if partition_by is None:
+            sinks = [_sink(rows, out_dir / name, fmt)]
+        else:
+            sinks = [
+                _sink(
+                    rows.filter(key.is_null() if value is None else key == value),
+                    out_dir / f"{partition_by}={'null' if value is None else value}" / name,
+                    fmt,
+                )
+                for value in parts["key"]
+            ]
+        pl.collect_all(sinks)
+        stats["files"] += len(sinks)
+        stats["rows"] += parts["rows"].sum()
+        batch_max = parts["graded_at"].max()
+        if batch_max is not None and (
+            stats["last_graded_at"] is None or batch_max > stats["last_graded_at"]
+        ):
+            stats["last_graded_at"] = batch_max
+
+    if since_last and stats["last_graded_at"] is not None:
+        save_export_state(out_dir, stats["last_graded_at"])
+    return stats
+
+
+# ── CLI ──────────────────────────────────────────────────────────────────
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--traces", default=Path("data/traces.json"), type=Path)
+    parser.add_argument("--grades", default=Path("data/grades.csv"), type=Path)
+    parser.add_argument("--out", default=EXPORT_DIR, type=Path)
+    parser.add_argument("--format", choices=["parquet", "jsonl"], default="parquet")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--graded-only", action="store_true", help="only pass/fail traces")
+    parser.add_argument("--fail-only", action="store_true", help="only failed traces")
+    parser.add_argument("--scenario", action="append", help="only these scenarios")
+    parser.add_argument(
+        "--since-last",
+        action="store_true",
+        help="only traces graded since the previous --since-last export",
+    )
+    parser.add_argument("--partition-by", choices=PARTITION_COLUMNS)
+    args = parser.parse_args(argv)
+
+    stats = export(
+        args.traces,
+        args.grades,
+        args.out,
+        fmt=args.format,
+        batch_size=args.batch_size,
+        graded_only=args.graded_only,
+        fail_only=args.fail_only,
+        scenarios=args.scenario,
+        since_last=args.since_last,
+        partition_by=args.partition_by,
+    )
+    print(
+        f"Read {stats['traces']} traces → wrote {stats['rows']} rows "
+        f"in {stats['files']} files to {args.out}"
+    )
+
+
+if __name__ == "__main__":
+    main()
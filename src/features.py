@@ -0,0 +1,178 @@
+"""Per-trace feature table for sorting and triage — Polars + Parquet.
+
+Cheap properties graders and evaluators sort and filter by — turn count,
+assistant reply length, emoji, question marks, price mentions and how long
+replies are relative to the user's messages — computed in one vectorized
+pass over the turns table and stored next to the traces. Updating the table
+only computes features for traces it hasn't seen.
+
+    uv run python -m src.features
+    uv run python -m src.features --where "emoji_count>0" --sort reply_ratio
+"""
+
+import argparse
+import json
+import operator
+import re
+from pathlib import Path
+
+import polars as pl
+
+from src.claims import turns_frame
+
+FEATURES_PATH = Path(__file__).parent.parent / "data" / "features.parquet"
+
+FEATURE_SCHEMA = {
+    "trace_id": pl.Utf8,
+    "n_turns": pl.UInt32,
+    "assistant_chars": pl.UInt32,
+    "mean_reply_chars": pl.Float64,
+    "emoji_count": pl.UInt32,
+    "question_marks": pl.UInt32,
+    "price_mentions": pl.UInt32,
+    "reply_ratio": pl.Float64,
+}
+FEATURES = [c for c in FEATURE_SCHEMA if c != "trace_id"]
+
+_EMOJI = r"\p{Extended_Pictographic}"
+_PRICE = r"\$\d[\d,]*(?:\.\d{2})?"
+
+_OPERATORS = {
+    ">=": operator.ge,
+    "<=": operator.le,
+    "==": operator.eq,
+    "!=": operator.ne,
+    ">": operator.gt,
+    "<": operator.lt,
+}
+_CONDITION = re.compile(r"^\s*(\w+)\s*(>=|<=|==|!=|>|<)\s*(-?[\d.]+)\s*$")
+
+
+# ── Extraction ───────────────────────────────────────────────────────────
+def compute_features(traces: list[dict]) -> pl.DataFrame:
+    """One row per trace with every feature in ``FEATURES``, in trace order.
+
+    Counts (emoji, question marks, prices) are over assistant replies;
+    ``reply_ratio`` is assistant characters per user character.
+    """
+    turns = turns_frame(traces)
+    assistant = pl.col("role") == "assistant"
+    chars = pl.col("content").str.len_chars()
+    features = (
+        turns.with_columns(
+            chars=chars,
+            emoji=pl.col("content").str.count_matches(_EMOJI),
+            questions=pl.col("content").str.count_matches("?", literal=True),
+            prices=pl.col("content").str.count_matches(_PRICE),
+        )
+        .group_by("trace_id", maintain_order=True)
+        .agg(
+            n_turns=pl.len(),
+            assistant_chars=pl.col("chars").filter(assistant).sum(),
+            mean_reply_chars=pl.col("chars").filter(assistant).mean(),
+            emoji_count=pl.col("emoji").filter(assistant).sum(),
+            question_marks=pl.col("questions").filter(assistant).sum(),
+            price_mentions=pl.col("prices").filter(assistant).sum(),
+            user_chars=pl.col("chars").filter(~assistant).sum(),
+        )
+        .with_columns(
+            reply_ratio=pl.when(pl.col("user_chars") > 0).then(
+                pl.col("assistant_chars") / pl.col("user_chars")
+            ),
+            mean_reply_chars=pl.col("mean_reply_chars").fill_null(0.0),
+        )
+    )
+    return features.select(FEATURE_SCHEMA.keys()).cast(FEATURE_SCHEMA)
+
+
+# ── Store ────────────────────────────────────────────────────────────────
+def load_features(path: str | Path = FEATURES_PATH) -> pl.DataFrame:
+    path = Path(path)
+    if not path.exists():
+        return pl.DataFrame(schema=FEATURE_SCHEMA)
+    features = pl.read_parquet(path)
+    if features.schema != pl.Schema(FEATURE_SCHEMA):
+        # Written by an older feature set: recompute everything
+        return pl.DataFrame(schema=FEATURE_SCHEMA)
+    return features
+
+
+def update_features(traces: list[dict], path: str | Path = FEATURES_PATH) -> pl.DataFrame:
+    """Features for *traces*, computing only those missing from the stored
+    table and saving it back when anything changed. Rows for traces no
+    longer present are dropped."""
+    path = Path(path)
+    stored = load_features(path)
+    trace_ids = pl.Series("trace_id", [t["trace_id"] for t in traces], pl.Utf8)
+    known = set(stored["trace_id"].to_list())
+    new = [t for t in traces if t["trace_id"] not in known]
+    kept = stored.filter(pl.col("trace_id").is_in(trace_ids.implode()))
+    if not new and kept.height == stored.height and path.exists():
+        return _in_order(kept, trace_ids)
+
+    features = _in_order(pl.concat([kept, compute_features(new)]), trace_ids)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    features.write_parquet(tmp)
+    tmp.replace(path)
+    return features
+
+
+def _in_order(features: pl.DataFrame, trace_ids: pl.Series) -> pl.DataFrame:
+    return trace_ids.to_frame().join(features, on="trace_id", how="inner", maintain_order="left")
+
+
+# ── Sort and filter keys ─────────────────────────────────────────────────
+def parse_where(text: str) -> pl.Expr:
+    """Parse comma-separated conditions like ``"n_turns>=6, emoji_count>0"``
+    into one filter expression. Raises ValueError on unknown features or
+    malformed conditions."""
+    expr = pl.lit(True)
+    for condition in filter(str.strip, text.split(",")):
+        match = _CONDITION.match(condition)
+        if match is None:
+            raise ValueError(f"Can't parse condition {condition.strip()!r}")
+        feature, op, value = match.groups()
+        if feature not in FEATURES:
+            raise ValueError(f"Unknown feature {feature!r}; choose from {', '.join(FEATURES)}")
+        expr = expr & _OPERATORS[op](pl.col(feature), float(value))
+    return expr
+
+
+def select(
+    features: pl.DataFrame,
+    where: str | None = None,
+    sort_by: str | None = None,
+    descending: bool = True,
+) -> list[str]:
+    """Trace ids matching *where*, sorted by *sort_by* (stable, so ties keep
+    their original order)."""
+    if where:
+        features = features.filter(parse_where(where))
+    if sort_by:
+        if sort_by not in FEATURES:
+            raise ValueError(f"Unknown feature {sort_by!r}; choose from {', '.join(FEATURES)}")
+        features = features.sort(sort_by, descending=descending, nulls_last=True, maintain_order=True)
+    return features["trace_id"].to_list()
+
+
+# ── CLI ──────────────────────────────────────────────────────────────────
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--traces", default=Path("data/traces.json"), type=Path)
+    parser.add_argument("--out", default=FEATURES_PATH, type=Path)
+    parser.add_argument("--where", help='e.g. "n_turns>=6, emoji_count>0"')
+    parser.add_argument("--sort", choices=FEATURES)
+    parser.add_argument("--ascending", action="store_true")
+    args = parser.parse_args(argv)
+
+    features = update_features(json.loads(args.traces.read_text()), args.out)
+    order = select(features, args.where, args.sort, descending=not args.ascending)
+    shown = _in_order(features, pl.Series("trace_id", order, pl.Utf8))
+    with pl.Config(tbl_rows=-1, tbl_cols=-1, tbl_width_chars=200):
+        print(shown)
+    print(f"Features for {features.height} traces → {args.out}")
+
+
+if __name__ == "__main__":
+    main()
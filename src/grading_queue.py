@@ -0,0 +1,260 @@
+"""Uncertainty-ordered grading queue — Polars + CSV.
+
+Ungraded traces are ordered so graders see first the ones the LLM judge is
+least sure about: scores close to a metric's threshold, or metrics that
+disagree with each other. The ordering is precomputed into a queue CSV so the
+app loads it instantly; grades are applied to it incrementally by filtering,
+never by recomputing.
+
+    uv run python -m src.grading_queue score   # judge traces, rebuild queue
+    uv run python -m src.grading_queue build   # rebuild queue from scores
+"""
+
+import argparse
+import json
+from pathlib import Path
+
+import polars as pl
+
+from src.dedup import load_clusters, propagate
+from src.state import load_grades
+from src.telemetry import scope
+
+JUDGE_SCORES_SCHEMA = {
+    "trace_id": pl.Utf8,
+    "metric": pl.Utf8,
+    "score": pl.Float64,
+    "threshold": pl.Float64,
+}
+
+QUEUE_SCHEMA = {
+    "trace_id": pl.Utf8,
+    "uncertainty": pl.Float64,
+    "judged": pl.Boolean,
+}
+
+DEFAULT_SECONDS_PER_TRACE = 60.0
+
+
+def load_judge_scores(path: str | Path) -> pl.DataFrame:
+    """Load judge scores CSV, returning an empty DataFrame if it doesn't exist."""
+    path = Path(path)
+    if path.exists() and path.stat().st_size > 0:
+        return pl.read_csv(path, schema=JUDGE_SCORES_SCHEMA)
+    return pl.DataFrame(schema=JUDGE_SCORES_SCHEMA)
+
+
+def build_queue(trace_ids: list[str], scores: pl.DataFrame) -> pl.DataFrame:
+    """Order *trace_ids* by judge uncertainty, most uncertain first.
+
+    Per metric, closeness is ``1 - |score - threshold| / max distance``, so a
+    score right at the threshold is 1 and a confident score is near 0. A trace's
+    uncertainty is its highest closeness plus half the disagreement between
+    metrics (1 when they split evenly between pass and fail). Traces the judge
+    has not scored are treated as maximally uncertain. Ties keep file order.
+    """
+    per_trace = (
+        scores.with_columns(
+            closeness=1
+            - (pl.col("score") - pl.col("threshold")).abs()
+            / pl.max_horizontal(pl.col("threshold"), 1 - pl.col("threshold")),
+            passed=(pl.col("score") >= pl.col("threshold")).cast(pl.Float64),
+        )
+        .group_by("trace_id")
+        .agg(
+            pl.col("closeness").max(),
+            pl.col("passed").mean().alias("pass_share"),
+        )
+        .with_columns(
+            uncertainty=pl.col("closeness")
+            + 0.5 * (2 * pl.min_horizontal("pass_share", 1 - pl.col("pass_share"))),
+        )
+    )
+    return (
+        pl.DataFrame({"trace_id": trace_ids}, schema={"trace_id": pl.Utf8})
+        .with_row_index("file_order")
+        .join(per_trace, on="trace_id", how="left")
+        .with_columns(
+            judged=pl.col("uncertainty").is_not_null(),
+            uncertainty=pl.col("uncertainty").fill_null(1.5),  # the maximum
+        )
+        .sort(["uncertainty", "file_order"], descending=[True, False])
+        .select(QUEUE_SCHEMA.keys())
+    )
+
+
+def save_queue(queue: pl.DataFrame, path: str | Path) -> None:
+    queue.write_csv(path)
+
+
+def load_queue(path: str | Path) -> pl.DataFrame:
+    path = Path(path)
+    if path.exists() and path.stat().st_size > 0:
+        return pl.read_csv(path, schema=QUEUE_SCHEMA)
+    return pl.DataFrame(schema=QUEUE_SCHEMA)
+
+
+def refresh_queue(
+    queue_path: str | Path,
+    scores_path: str | Path,
+    trace_ids: list[str],
+) -> pl.DataFrame:
+    """Load the stored queue, rebuilding it only if the judge scores are newer
+    or the set of traces changed."""
+    queue_path, scores_path = Path(queue_path), Path(scores_path)
+    queue = load_queue(queue_path)
+    stale = (
+        not queue_path.exists()
+        or queue.height != len(trace_ids)
+        or set(queue["trace_id"].to_list()) != set(trace_ids)
+        or (
+            scores_path.exists()
+            and scores_path.stat().st_mtime > queue_path.stat().st_mtime
+        )
+    )
+    if stale:
+        queue = build_queue(trace_ids, load_judge_scores(scores_path))
+        save_queue(queue, queue_path)
+    return queue
+
+
+def pending(queue: pl.DataFrame, grades: pl.DataFrame) -> pl.DataFrame:
+    """Queue entries that still need a human grade, in queue order."""
+    graded = grades.filter(pl.col("grade").is_in(["pass", "fail"]))
+    return queue.join(graded.select("trace_id"), on="trace_id", how="anti")
+
+
+def seconds_per_trace(grades: pl.DataFrame) -> float:
+    """Median time between consecutive grades given by hand, ignoring long
+    breaks (grades propagated to near-duplicates take no time)."""
+    gaps = (
+        grades.filter(pl.col("propagated_from").is_null())
+        .select(pl.col("graded_at").str.to_datetime(time_zone="UTC"))
+        .drop_nulls()
+        .sort("graded_at")
+        .select(pl.col("graded_at").diff().dt.total_seconds().alias("gap"))
+        .filter(pl.col("gap").is_between(1, 30 * 60))
+    )
+    if gaps.height == 0:
+        return DEFAULT_SECONDS_PER_TRACE
+    return float(gaps["gap"].median())
+
+
+def estimate_savings(
+    queue: pl.DataFrame,
+    grades: pl.DataFrame,
+    trace_ids: list[str],
+    target: int,
+    cutoff: float = 0.5,
+) -> dict:
+    """Compare file order and queue order for reaching *target* new labels on
+    traces the judge could not settle (uncertainty >= *cutoff*).
+
+    Returns how many traces a grader must open under each order and the
+    grader time saved, using the observed seconds per grade.
+    """
+    todo = pending(queue, grades)
+    useful = set(todo.filter(pl.col("uncertainty") >= cutoff)["trace_id"].to_list())
+    target = min(target, len(useful))
+    pending_ids = set(todo["trace_id"].to_list())
+
+    def traces_needed(order: list[str]) -> int:
+        found = 0
+        for opened, trace_id in enumerate(order, start=1):
+            found += trace_id in useful
+            if found >= target:
+                return opened
+        return 0
+
+    file_order = [t for t in trace_ids if t in pending_ids]
+    in_file = traces_needed(file_order)
+    in_queue = traces_needed(todo["trace_id"].to_list())
+    per_trace = seconds_per_trace(grades)
+    return {
+        "target": target,
+        "file_order": in_file,
+        "queue_order": in_queue,
+        "seconds_per_trace": per_trace,
+        "seconds_saved": (in_file - in_queue) * per_trace,
+    }
+
+
+# ── CLI ──────────────────────────────────────────────────────────────────
+def score_traces(traces: list[dict]) -> pl.DataFrame:
+    """Score *traces* with every shared GEval metric."""
+    from src.metrics import METRICS, trace_to_test_case
+
+    rows = []
+    for trace in traces:
+        test_case = trace_to_test_case(trace)
+        for metric in METRICS.values():
+            with scope(metric.name, trace["trace_id"]):
+                metric.measure(test_case)
+            rows.append({
+                "trace_id": trace["trace_id"],
+                "metric": metric.name,
+                "score": metric.score,
+                "threshold": metric.threshold,
+            })
+    return pl.DataFrame(rows, schema=JUDGE_SCORES_SCHEMA)
+
+
+def merge_scores(scores_path: Path, new: pl.DataFrame) -> pl.DataFrame:
+    """Replace the stored scores of re-scored traces and write the CSV."""
+    scores = load_judge_scores(scores_path)
+    scores = pl.concat([
+        scores.join(new.select("trace_id").unique(), on="trace_id", how="anti"),
+        new,
+    ])
+    scores.write_csv(scores_path)
+    return scores
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("command", choices=["score", "build"])
+    parser.add_argument("--traces", default=Path("data/traces.json"), type=Path)
+    parser.add_argument("--scores", default=Path("data/judge_scores.csv"), type=Path)
+    parser.add_argument("--queue", default=Path("data/grading_queue.csv"), type=Path)
+    parser.add_argument("--grades", default=Path("data/grades.csv"), type=Path)
+    parser.add_argument("--target", type=int, default=10)
+    parser.add_argument(
+        "--clusters",
+        type=Path,
+        help="near-duplicate clusters from src.dedup: judge one trace per cluster",
+    )
+    args = parser.parse_args(argv)
+
+    traces = json.loads(args.traces.read_text())
+    trace_ids = [t["trace_id"] for t in traces]
+    grades = load_grades(args.grades)
+
+    if args.command == "score":
+        to_score = set(pending(pl.DataFrame({"trace_id": trace_ids}), grades)["trace_id"])
+        clusters = load_clusters(args.clusters) if args.clusters else None
+        if clusters is not None:
+            # Judge the representative of every cluster with ungraded members
+            to_score = set(
+                clusters.filter(pl.col("trace_id").is_in(to_score))["cluster_id"]
+            ) | (to_score - set(clusters["trace_id"]))
+        new = score_traces([t for t in traces if t["trace_id"] in to_score])
+        if clusters is not None:
+            new = propagate(new, clusters)
+        scores = merge_scores(args.scores, new)
+    else:
+        scores = load_judge_scores(args.scores)
+
+    queue = build_queue(trace_ids, scores)
+    save_queue(queue, args.queue)
+    savings = estimate_savings(queue, grades, trace_ids, args.target)
+    print(f"Queue of {pending(queue, grades).height} ungraded traces → {args.queue}")
+    print(
+        f"To label {savings['target']} uncertain traces: "
+        f"{savings['queue_order']} opened in queue order vs "
+        f"{savings['file_order']} in file order "
+        f"(~{savings['seconds_saved'] / 60:.0f} grader-minutes saved)"
+    )
+
+
+if __name__ == "__main__":
+    main()
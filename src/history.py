@@ -0,0 +1,181 @@
+"""Grade history and time-travel queries — Polars + Parquet.
+
+Every grade ever saved is an event in the store's append-only change log
+(``grades.changes.jsonl``, see ``src.state``), numbered in save order by
+``seq``. Queries fold the log into ``grades.history.parquet``, sorted by
+(trace_id, seq) so one trace's changes sit together and a per-trace lookup
+reads only the row groups that can hold it; changes saved since the last
+fold are read from the log's tail. The history records which log it was
+folded from (a hash of the log's first record), so a log that is reset and
+grows back past the old cursor isn't mistaken for the one folded. Reading
+the current grades (``state.load_grades``) is untouched: ``grades.csv``
+stays the snapshot.
+
+    uv run python -m src.history                               # current grades
+    uv run python -m src.history --as-of 2026-10-01T12:00:00   # grades back then
+    uv run python -m src.history --trace trace_001             # one trace's changes
+"""
+
+import argparse
+import hashlib
+import os
+import tempfile
+from datetime import UTC, datetime
+from pathlib import Path
+
+import polars as pl
+
+from src.state import changes_path, read_changes, version
+
+GRADES_PATH = Path(__file__).parent.parent / "data" / "grades.csv"
+HISTORY_SUFFIX = ".history.parquet"
+
+COMPACT_BYTES = 8 * 1024 * 1024  # fold the log's tail in once it's this long
+ROW_GROUP_SIZE = 64 * 1024
+
+HISTORY_SCHEMA = {
+    "seq": pl.UInt64,
+    "trace_id": pl.Utf8,
+    "grade": pl.Utf8,
+    "comment": pl.Utf8,
+    "graded_at": pl.Datetime("us", "UTC"),
+}
+_ISO = "%Y-%m-%dT%H:%M:%S%.f%:z"
+
+
+def history_path(path: str | Path) -> Path:
+    """``grades.csv`` → ``grades.history.parquet``."""
+    path = Path(path)
+    return path.with_name(path.stem + HISTORY_SUFFIX)
+
+
+# ── Folding the change log ───────────────────────────────────────────────
+def _events(changes: pl.DataFrame, first_seq: int) -> pl.DataFrame:
+    return (
+        changes.with_row_index("seq", offset=first_seq)
+        .with_columns(pl.col("graded_at").str.to_datetime(_ISO, time_zone="UTC"))
+        .select(HISTORY_SCHEMA.keys())
+        .cast(HISTORY_SCHEMA)
+    )
+
+
+def _log_id(path: Path) -> str:
+    """Which change log this is: a hash of its first record, which stays put
+    while the log only grows."""
+    log = changes_path(path)
+    if not log.exists():
+        return ""
+    with open(log, "rb") as f:
+        return hashlib.sha256(f.readline()).hexdigest()
+
+
+def _folded(path: Path) -> tuple[int, int]:
+    """(log cursor, event count) the Parquet history was folded up to."""
+    history = history_path(path)
+    if not history.exists():
+        return 0, 0
+    meta = pl.read_parquet_metadata(history)
+    cursor, events = int(meta["cursor"]), int(meta["events"])
+    if version(path) < cursor or meta.get("log") != _log_id(path):
+        return 0, 0  # the log was reset or replaced; so is its history
+    return cursor, events
+
+
+def compact(path: str | Path = GRADES_PATH) -> int:
+    """Fold changes saved since the last fold into the Parquet history and
+    return the number of events it holds."""
+    path = Path(path)
+    cursor, events = _folded(path)
+    changes, new_cursor = read_changes(path, cursor)
+    history = history_path(path)
+    if changes.height == 0 and (cursor or not history.exists()):
+        return events
+    frames = [pl.read_parquet(history)] if cursor else []
+    folded = pl.concat([*frames, _events(changes, events)]).sort("trace_id", "seq")
+    fd, tmp = tempfile.mkstemp(suffix=".tmp", dir=history.parent)
+    os.close(fd)
+    folded.write_parquet(
+        tmp,
+        row_group_size=ROW_GROUP_SIZE,
+        metadata={
+            "cursor": str(new_cursor),
+            "events": str(folded.height),
+            "log": _log_id(path),
+        },
+    )
+    os.replace(tmp, history)
+    return folded.height
+
+
+def scan_history(
+    path: str | Path = GRADES_PATH, compact_after: int = COMPACT_BYTES
+) -> pl.LazyFrame:
+    """Every grade change, folded history first and then the log's tail.
+    The tail is folded in first once it's longer than *compact_after* bytes."""
+    path = Path(path)
+    cursor, events = _folded(path)
+    if version(path) - cursor > compact_after:
+        compact(path)
+        cursor, events = _folded(path)
+    changes, _ = read_changes(path, cursor)
+    frames = [pl.scan_parquet(history_path(path))] if cursor else []
+    return pl.concat([*frames, _events(changes, events).lazy()])
+
+
+# ── Queries ──────────────────────────────────────────────────────────────
+def _timestamp(when: datetime | str) -> datetime:
+    if isinstance(when, str):
+        when = datetime.fromisoformat(when)
+    return when if when.tzinfo else when.replace(tzinfo=UTC)
+
+
+def as_of(when: datetime | str | None = None, path: str | Path = GRADES_PATH) -> pl.DataFrame:
+    """Each trace's grade as it stood at *when* (naive times are UTC;
+    default: now), sorted by trace id. Traces first graded later are absent.
+    One pass over the history: each trace keeps its latest change."""
+    history = scan_history(path)
+    if when is not None:
+        history = history.filter(pl.col("graded_at") <= _timestamp(when))
+    return (
+        history.filter(pl.col("seq") == pl.col("seq").max().over("trace_id"))
+        .sort("trace_id")
+        .drop("seq")
+        .collect()
+    )
+
+
+def trace_history(trace_id: str, path: str | Path = GRADES_PATH) -> pl.DataFrame:
+    """Every change to *trace_id*'s grade, oldest first."""
+    return (
+        scan_history(path)
+        .filter(pl.col("trace_id") == trace_id)
+        .sort("seq")
+        .drop("seq")
+        .collect()
+    )
+
+
+# ── CLI ──────────────────────────────────────────────────────────────────
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--grades", default=GRADES_PATH, type=Path)
+    query = parser.add_mutually_exclusive_group()
+    query.add_argument("--as-of", metavar="TIME", help="ISO timestamp (UTC if no offset)")
+    query.add_argument("--trace", metavar="TRACE_ID", help="one trace's changes")
+    query.add_argument("--compact", action="store_true", help="fold the change log into Parquet")
+    args = parser.parse_args(argv)
+
+    if args.compact:
+        events = compact(args.grades)
+        print(f"{events} grade changes → {history_path(args.grades)}")
+        return
+    if args.trace:
+        grades = trace_history(args.trace, args.grades)
+    else:
+        grades = as_of(args.as_of, args.grades)
+    with pl.Config(tbl_rows=-1, fmt_str_lengths=60):
+        print(grades)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,359 @@
+"""Shared LLM judge client — rate limiting, retries and pooled connections.
+
+Every GEval metric should use the model returned by ``get_judge()`` so that all
+judge calls go through one keep-alive HTTP connection pool and one rate
+limiter, instead of deepeval's default of one new client per call. Parallel
+test workers can additionally share one rate limit and one completion cache
+on disk (``SharedRateLimiter``, ``JudgeCache``). ``MetricJudge`` gives each
+metric its own handle on the shared judge, so its calls are attributed to it.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+import httpx
+import openai
+from deepeval.models import DeepEvalBaseLLM
+from openai.types.chat import ChatCompletion
+
+from src.context import count_tokens
+from src.telemetry import TELEMETRY, metric_scope
+
+DEFAULT_MODEL = "gpt-4.1"  # deepeval's default judge
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+
+class RateLimiter:
+    """Token-bucket limiter over requests per minute and tokens per minute.
+
+    Both buckets start full and refill continuously. ``acquire`` blocks until
+    both have capacity and returns the number of seconds spent waiting.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: float,
+        tokens_per_minute: float,
+        clock=time.monotonic,
+        sleep=time.sleep,
+    ):
+        self.rpm = requests_per_minute
+        self.tpm = tokens_per_minute
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self._requests = float(requests_per_minute)
+        self._tokens = float(tokens_per_minute)
+        self._updated = clock()
+
+    def _refill(self) -> None:
+        now = self._clock()
+        elapsed = now - self._updated
+        self._updated = now
+        self._requests = min(self.rpm, self._requests + elapsed * self.rpm / 60)
+        self._tokens = min(self.tpm, self._tokens + elapsed * self.tpm / 60)
+
+    def _take(self, tokens: int) -> float:
+        """Take capacity if available; otherwise return seconds to wait.
+        The caller holds the lock."""
+        # A single oversized request may use the whole bucket, never more.
+        tokens = min(tokens, self.tpm)
+        self._refill()
+        if self._requests >= 1 and self._tokens >= tokens:
+            self._requests -= 1
+            self._tokens -= tokens
+            return 0.0
+        wait_requests = max(0.0, (1 - self._requests) * 60 / self.rpm)
+        wait_tokens = max(0.0, (tokens - self._tokens) * 60 / self.tpm)
+        return max(wait_requests, wait_tokens)
+
+    def _reserve(self, tokens: int) -> float:
+        with self._lock:
+            return self._take(tokens)
+
+    def acquire(self, tokens: int = 0) -> float:
+        waited = 0.0
+        while (delay := self._reserve(tokens)) > 0:
+            self._sleep(delay)
+            waited += delay
+        return waited
+
+
+class SharedRateLimiter(RateLimiter):
+    """:class:`RateLimiter` whose buckets live in a file, so every process
+    using the same *path* stays under one provider limit together.
+
+    Each reservation reads, updates and writes the bucket state under an
+    exclusive ``flock`` on the file (POSIX only). The clock is wall time,
+    which all processes agree on.
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        requests_per_minute: float,
+        tokens_per_minute: float,
+        clock=time.time,
+        sleep=time.sleep,
+    ):
+        super().__init__(requests_per_minute, tokens_per_minute, clock, sleep)
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.path.touch(exist_ok=True)
+
+    def _reserve(self, tokens: int) -> float:
+        import fcntl
+
+        with self._lock, self.path.open("r+") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            state = f.read().split()
+            if len(state) == 3:
+                self._requests, self._tokens, self._updated = map(float, state)
+            delay = self._take(tokens)
+            f.seek(0)
+            f.truncate()
+            f.write(f"{self._requests} {self._tokens} {self._updated}")
+            return delay
+
+
+class JudgeCache:
+    """On-disk cache of judge completions keyed by model, prompt and JSON
+    mode. The judge runs at temperature 0, so a repeated prompt is answered
+    from the cache instead of the provider. SQLite (in WAL mode) makes the
+    cache safe to share between concurrent processes.
+    """
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(
+            self.path, timeout=30, check_same_thread=False, isolation_level=None
+        )
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS completions "
+            "(key TEXT PRIMARY KEY, completion TEXT NOT NULL, created_at REAL NOT NULL)"
+        )
+
+    @staticmethod
+    def key(model: str, prompt: str, json_mode: bool) -> str:
+        return hashlib.sha256(json.dumps([model, prompt, json_mode]).encode()).hexdigest()
+
+    def get(self, key: str) -> str | None:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT completion FROM completions WHERE key = ?", (key,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def put(self, key: str, completion: str) -> None:
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO completions VALUES (?, ?, ?)",
+                (key, completion, time.time()),
+            )
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM completions").fetchone()[0]
+
+    def close(self) -> None:
+        self._db.close()
+
+
+def backoff_delay(
+    attempt: int,
+    base: float = 0.5,
+    cap: float = 30.0,
+    retry_after: float | None = None,
+) -> float:
+    """Full-jitter exponential backoff, never shorter than a server's
+    ``Retry-After`` hint."""
+    delay = random.uniform(0, min(cap, base * 2**attempt))
+    if retry_after is not None:
+        delay = max(delay, min(cap, retry_after))
+    return delay
+
+
+def _retry_after(error: openai.APIStatusError) -> float | None:
+    value = error.response.headers.get("retry-after")
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+class JudgeModel(DeepEvalBaseLLM):
+    """deepeval model backed by a pooled OpenAI-compatible client.
+
+    Requests are throttled by *limiter* and retried with jittered exponential
+    backoff on 429/5xx responses and connection errors. With a *cache*,
+    repeated prompts are answered from it. Every successful call, cached or
+    not, is logged to ``src.telemetry.TELEMETRY``.
+    """
+
+    def __init__(
+        self,
+        model: str = DEFAULT_MODEL,
+        api_key: str | None = None,
+        base_url: str | None = None,
+        limiter: RateLimiter | None = None,
+        cache: JudgeCache | None = None,
+        max_retries: int = 5,
+        timeout: float = 60.0,
+        max_connections: int = 20,
+        expected_completion_tokens: int = 300,
+        sleep=time.sleep,
+    ):
+        self.limiter = limiter or RateLimiter(500, 200_000)
+        self.cache = cache
+        self.max_retries = max_retries
+        self.expected_completion_tokens = expected_completion_tokens
+        self._sleep = sleep
+        self.http_client = httpx.Client(
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections,
+            ),
+            timeout=timeout,
+        )
+        self._client = openai.OpenAI(
+            api_key=api_key or os.environ.get("OPENAI_API_KEY") or "missing",
+            base_url=base_url,
+            http_client=self.http_client,
+            max_retries=0,  # retries are handled here, with backoff
+        )
+        super().__init__(model)
+
+    def load_model(self):
+        return self._client
+
+    def get_model_name(self) -> str:
+        return self.name
+
+    def complete(self, prompt: str, json_mode: bool = False):
+        """Send one chat completion, retrying transient failures."""
+        kwargs = {"response_format": {"type": "json_object"}} if json_mode else {}
+        started = time.perf_counter()
+        if self.cache is not None:
+            key = JudgeCache.key(self.name, prompt, json_mode)
+            cached = self.cache.get(key)
+            if cached is not None:
+                completion = ChatCompletion.model_validate_json(cached)
+                self._report(
+                    prompt, completion, time.perf_counter() - started, 0, 0.0, cache_hit=True
+                )
+                return completion
+        estimate = count_tokens(prompt) + self.expected_completion_tokens
+        throttled = 0.0
+        for attempt in range(self.max_retries + 1):
+            throttled += self.limiter.acquire(estimate)
+            try:
+                completion = self._client.chat.completions.create(
+                    model=self.name,
+                    messages=[{"role": "user", "content": prompt}],
+                    temperature=0,
+                    **kwargs,
+                )
+                self._report(prompt, completion, time.perf_counter() - started, attempt, throttled)
+                if self.cache is not None:
+                    self.cache.put(key, completion.model_dump_json())
+                return completion
+            except openai.APIStatusError as e:
+                if e.status_code not in RETRYABLE_STATUS or attempt == self.max_retries:
+                    raise
+                self._sleep(backoff_delay(attempt, retry_after=_retry_after(e)))
+            except openai.APIConnectionError:
+                if attempt == self.max_retries:
+                    raise
+                self._sleep(backoff_delay(attempt))
+
+    def _report(self, prompt, completion, latency, retries, throttled, cache_hit=False) -> None:
+        usage = completion.usage
+        if usage is not None:
+            prompt_tokens, completion_tokens = usage.prompt_tokens, usage.completion_tokens
+        else:
+            prompt_tokens = count_tokens(prompt)
+            completion_tokens = count_tokens(completion.choices[0].message.content or "")
+        TELEMETRY.record(
+            self.name, prompt_tokens, completion_tokens, latency, retries, throttled, cache_hit
+        )
+
+    def generate(self, prompt: str, schema=None) -> str:
+        # The raw JSON string is returned; deepeval parses it into *schema*.
+        completion = self.complete(prompt, json_mode=schema is not None)
+        return completion.choices[0].message.content
+
+    async def a_generate(self, prompt: str, schema=None) -> str:
+        # deepeval runs each metric on its own event loop, so share the
+        # thread-safe sync pool instead of binding an async one to a loop.
+        return await asyncio.to_thread(self.generate, prompt, schema)
+
+    def close(self) -> None:
+        self.http_client.close()
+        if self.cache is not None:
+            self.cache.close()
+
+
+class MetricJudge(DeepEvalBaseLLM):
+    """*judge* as used by one metric: calls are attributed to *metric* in
+    ``src.telemetry``, within whatever trace the caller has scoped. Lets one
+    deepeval call measure several metrics and still tell their calls apart."""
+
+    def __init__(self, judge: JudgeModel, metric: str):
+        self.judge = judge
+        self.metric = metric
+        super().__init__(judge.name)
+
+    def load_model(self):
+        return self.judge.load_model()
+
+    def get_model_name(self) -> str:
+        return self.judge.get_model_name()
+
+    def generate(self, prompt: str, schema=None) -> str:
+        with metric_scope(self.metric):
+            return self.judge.generate(prompt, schema)
+
+    async def a_generate(self, prompt: str, schema=None) -> str:
+        with metric_scope(self.metric):
+            return await self.judge.a_generate(prompt, schema)
+
+
+_judge: JudgeModel | None = None
+_judge_lock = threading.Lock()
+
+
+def get_judge() -> JudgeModel:
+    """Return the process-wide judge, configured from the environment.
+
+    ``JUDGE_MODEL``, ``JUDGE_BASE_URL`` (or ``OPENAI_BASE_URL``),
+    ``JUDGE_RPM`` and ``JUDGE_TPM`` override the defaults. ``JUDGE_RATE_FILE``
+    shares the rate limit with other processes through that file, and
+    ``JUDGE_CACHE`` turns on the on-disk completion cache at that path.
+    """
+    global _judge
+    with _judge_lock:
+        if _judge is None:
+            rpm = float(os.environ.get("JUDGE_RPM", 500))
+            tpm = float(os.environ.get("JUDGE_TPM", 200_000))
+            rate_file = os.environ.get("JUDGE_RATE_FILE")
+            cache = os.environ.get("JUDGE_CACHE")
+            _judge = JudgeModel(
+                model=os.environ.get("JUDGE_MODEL", DEFAULT_MODEL),
+                base_url=os.environ.get("JUDGE_BASE_URL")
+                or os.environ.get("OPENAI_BASE_URL"),
+                limiter=SharedRateLimiter(rate_file, rpm, tpm)
+                if rate_file
+                else RateLimiter(rpm, tpm),
+                cache=JudgeCache(cache) if cache else None,
+            )
+        return _judge
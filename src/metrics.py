@@ -0,0 +1,104 @@
+"""GEval metrics and trace conversion shared by the deepeval suite and runners."""
+
+from deepeval.metrics import GEval
+from deepeval.test_case import LLMTestCase, LLMTestCaseParams
+
+from src.context import ContextBuilder
+from src.judge import MetricJudge, get_judge
+
+# Shared so memoized contexts and token savings are tracked across the run
+CONTEXT_BUILDER = ContextBuilder(budget=2000)
+
+# One rate-limited, connection-pooled judge shared by every metric; each
+# metric's handle on it attributes its calls to the metric
+JUDGE = get_judge()
+
+
+def trace_to_conversation(trace: dict) -> tuple[str, str, str]:
+    """Convert a trace to input/actual_output/context format for GEval.
+
+    Returns:
+        tuple: (input, actual_output, context)
+            - input: The last user message
+            - actual_output: The last assistant message
+            - context: Conversation history, fitted to CONTEXT_BUILDER's budget
+    """
+    turns = trace["turns"]
+
+    # Get last user and assistant messages
+    user_messages = [t["content"] for t in turns if t["role"] == "user"]
+    assistant_messages = [t["content"] for t in turns if t["role"] == "assistant"]
+
+    input_text = user_messages[-1] if user_messages else ""
+    output_text = assistant_messages[-1] if assistant_messages else ""
+
+    return input_text, output_text, CONTEXT_BUILDER.build(trace)
+
+
+# Define GEval metrics
+kindness_metric = GEval(
+    name="Kindness",
+    criteria="Determine if the assistant's response is kind, polite, and empathetic towards the customer. A kind response shows understanding, uses friendly language, and makes the customer feel valued.",
+    evaluation_params=[
+        LLMTestCaseParams.INPUT,
+        LLMTestCaseParams.ACTUAL_OUTPUT,
+    ],
+    model=MetricJudge(JUDGE, "Kindness"),
+    threshold=0.5,
+)
+
+product_accuracy_metric = GEval(
+    name="Product Accuracy",
+    criteria="Determine if the assistant provides accurate product information. Check if the features, prices, and specifications mentioned are realistic and internally consistent. Penalize hallucinated features or impossible claims.",
+    evaluation_params=[
+        LLMTestCaseParams.INPUT,
+        LLMTestCaseParams.ACTUAL_OUTPUT,
+        LLMTestCaseParams.CONTEXT,
+    ],
+    model=MetricJudge(JUDGE, "Product Accuracy"),
+    threshold=0.5,
+)
+
+professionalism_metric = GEval(
+    name="Professionalism",
+    criteria="Determine if the assistant maintains professional standards. This includes avoiding rudeness, dismissiveness, pressure tactics, and misinformation about competitors. Professional responses respect customer autonomy and provide honest information.",
+    evaluation_params=[
+        LLMTestCaseParams.INPUT,
+        LLMTestCaseParams.ACTUAL_OUTPUT,
+    ],
+    model=MetricJudge(JUDGE, "Professionalism"),
+    threshold=0.5,
+)
+
+discount_accuracy_metric = GEval(
+    name="Discount Accuracy",
+    criteria="Determine if the assistant correctly handles discount information. If a discount is available (mentioned in context), the assistant should mention it when relevant. If no discount is available, the assistant should not claim there is one.",
+    evaluation_params=[
+        LLMTestCaseParams.INPUT,
+        LLMTestCaseParams.ACTUAL_OUTPUT,
+        LLMTestCaseParams.CONTEXT,
+    ],
+    model=MetricJudge(JUDGE, "Discount Accuracy"),
+    threshold=0.5,
+)
+
+
+METRICS = {
+    m.name: m
+    for m in (
+        kindness_metric,
+        product_accuracy_metric,
+        professionalism_metric,
+        discount_accuracy_metric,
+    )
+}
+
+
+def trace_to_test_case(trace: dict) -> LLMTestCase:
+    input_text, output_text, context = trace_to_conversation(trace)
+    return LLMTestCase(
+        input=input_text,
+        actual_output=output_text,
+        context=[context],
+        name=trace["trace_id"],
+    )
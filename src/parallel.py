@@ -0,0 +1,215 @@
+"""Parallel deepeval suite across worker processes — sharded by judge latency.
+
+The suite is collected once, then split into one shard per worker so every
+shard expects about the same total judge time: tests are placed longest
+first on the least-loaded worker, using each test's judge latency from
+earlier runs (``data/telemetry/test_latency.json``; tests never timed count
+as the median). Each worker is a separate ``pytest`` process; they share
+
+* a judge completion cache on disk (``JUDGE_CACHE``), so a prompt any
+  worker already sent is never sent again, and
+* one rate limit (``JUDGE_RATE_FILE``), so together they stay under the
+  provider's ``JUDGE_RPM``/``JUDGE_TPM`` rather than each using all of it.
+
+Wall time drops roughly linearly with the number of workers until that
+shared limit is what holds the suite back. Each worker writes its shard of
+the run and telemetry logs, and they're merged into one run at the end.
+``--fake-judge`` runs the whole suite offline against the local judge stub
+in ``tests/fake_judge.py``.
+
+    uv run python -m src.parallel -n 4
+    uv run python -m src.parallel -n 4 --record-run -- -k kindness
+    uv run python -m src.parallel -n 4 --fake-judge 0.5      # offline
+"""
+
+import argparse
+import heapq
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import ExitStack
+from pathlib import Path
+
+import polars as pl
+
+from src import runs, telemetry
+
+ROOT = Path(__file__).parent.parent
+LATENCY_FILE = telemetry.TELEMETRY_DIR / "test_latency.json"
+JUDGE_CACHE = ROOT / "data" / "judge_cache.sqlite"
+DEFAULT_TESTS = ["tests/test_deepeval.py"]
+
+
+# ── Test latencies ───────────────────────────────────────────────────────
+def load_latencies(path: str | Path = LATENCY_FILE) -> dict[str, float]:
+    """Test node id → seconds spent waiting on the judge when last run."""
+    path = Path(path)
+    return json.loads(path.read_text()) if path.exists() else {}
+
+
+def save_latencies(latencies: dict[str, float], path: str | Path = LATENCY_FILE) -> None:
+    """Merge *latencies* into the file. Workers finish concurrently, so the
+    read-modify-write happens under an exclusive lock."""
+    import fcntl
+
+    if not latencies:
+        return
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path.with_suffix(".lock"), "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        merged = {**load_latencies(path), **latencies}
+        tmp = path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(dict(sorted(merged.items())), indent=1))
+        tmp.replace(path)
+
+
+# ── Sharding ─────────────────────────────────────────────────────────────
+def balance(
+    node_ids: list[str], latencies: dict[str, float], workers: int
+) -> list[tuple[list[str], float]]:
+    """Split *node_ids* into at most *workers* ``(tests, expected seconds)``
+    shards with the longest-processing-time-first heuristic, which keeps the
+    slowest shard within 4/3 of the best possible split."""
+    known = [latencies[n] for n in node_ids if n in latencies]
+    default = statistics.median(known) if known else 1.0
+    n = max(1, min(workers, len(node_ids)))
+    shards: list[tuple[list[str], float]] = [([], 0.0) for _ in range(n)]
+    heap = [(0.0, i) for i in range(len(shards))]
+    for node in sorted(node_ids, key=lambda n: -latencies.get(n, default)):
+        load, i = heapq.heappop(heap)
+        load += latencies.get(node, default)
+        shards[i] = (shards[i][0] + [node], load)
+        heapq.heappush(heap, (load, i))
+    return shards
+
+
+# ── Running ──────────────────────────────────────────────────────────────
+def collect(pytest_args: list[str], env: dict | None = None) -> list[str]:
+    """Node ids pytest would run for *pytest_args*."""
+    result = subprocess.run(
+        [sys.executable, "-m", "pytest", "--collect-only", "-q", "-p", "no:cacheprovider", *pytest_args],
+        cwd=ROOT, env=env, capture_output=True, text=True,
+    )
+    if result.returncode not in (0, 5):  # 5: nothing collected
+        raise RuntimeError(f"Test collection failed:\n{result.stdout}{result.stderr}")
+    return [line for line in result.stdout.splitlines() if "::" in line]
+
+
+def run_shards(
+    shards: list[list[str]],
+    pytest_args: list[str],
+    env: dict,
+    log_dir: Path,
+) -> list[dict]:
+    """Run every shard in its own pytest process at once and wait for all;
+    returns each worker's exit code, wall time and log path."""
+    workers = []
+    for i, tests in enumerate(shards):
+        log = log_dir / f"worker-{i}.log"
+        with open(log, "w") as out:
+            process = subprocess.Popen(
+                [sys.executable, "-m", "pytest", "-q", "-p", "no:cacheprovider", *pytest_args, *tests],
+                cwd=ROOT, env={**env, "EVAL_WORKER": str(i)}, stdout=out, stderr=subprocess.STDOUT,
+            )
+        workers.append({"worker": i, "process": process, "log": log, "started": time.perf_counter()})
+    running = list(workers)
+    while running:
+        time.sleep(0.05)
+        for w in [w for w in running if w["process"].poll() is not None]:
+            w["returncode"] = w.pop("process").returncode
+            w["seconds"] = time.perf_counter() - w.pop("started")
+            running.remove(w)
+    return workers
+
+
+def _summary_line(log: Path) -> str:
+    lines = [line for line in log.read_text().splitlines() if line.strip()]
+    return lines[-1].strip("= ") if lines else "no output"
+
+
+# ── CLI ──────────────────────────────────────────────────────────────────
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__.splitlines()[0],
+        epilog="Arguments after -- are passed to every pytest worker.",
+    )
+    parser.add_argument("-n", "--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument(
+        "--record-run", nargs="?", const="", default=None, metavar="RUN_ID",
+        help="record results as one run in data/runs (default id: UTC timestamp)",
+    )
+    parser.add_argument("--cache", default=JUDGE_CACHE, type=Path, help="shared judge cache")
+    parser.add_argument("--no-cache", action="store_true", help="always call the judge")
+    parser.add_argument(
+        "--fake-judge", nargs="?", const=0.0, type=float, metavar="LATENCY",
+        help="run offline against the local judge stub, with this latency per call",
+    )
+    args, pytest_args = parser.parse_known_args(argv)
+    pytest_args = [a for a in pytest_args if a != "--"]
+    paths = [a for a in pytest_args if not a.startswith("-") and (ROOT / a.split("::")[0]).exists()]
+    if not paths:
+        pytest_args = [*DEFAULT_TESTS, *pytest_args]
+
+    run_id = args.record_run or runs.new_run_id()
+    with ExitStack() as stack:
+        log_dir = Path(stack.enter_context(tempfile.TemporaryDirectory(prefix="evals-")))
+        env = {
+            **os.environ,
+            "EVAL_RUN_ID": run_id,
+            "JUDGE_RATE_FILE": os.environ.get("JUDGE_RATE_FILE", str(log_dir / "rate")),
+        }
+        if not args.no_cache:
+            env["JUDGE_CACHE"] = str(args.cache)
+        if args.fake_judge is not None:
+            sys.path.insert(0, str(ROOT / "tests"))
+            from fake_judge import FakeJudgeServer, bad_responses
+
+            server = stack.enter_context(FakeJudgeServer(
+                latency=args.fake_judge,
+                failing=bad_responses(ROOT / "data" / "traces.json"),
+            ))
+            env |= {"JUDGE_BASE_URL": server.base_url, "OPENAI_API_KEY": "fake-judge"}
+
+        node_ids = collect(pytest_args, env)
+        if not node_ids:
+            print("No tests collected")
+            return
+        shards = balance(node_ids, load_latencies(), args.workers)
+        # Workers get node ids instead of the paths they were collected from
+        worker_args = [a for a in pytest_args if a not in (paths or DEFAULT_TESTS)]
+        if args.record_run is not None:
+            worker_args += ["--record-run", run_id]
+        print(f"{len(node_ids)} tests on {len(shards)} workers")
+
+        start = time.perf_counter()
+        workers = run_shards([tests for tests, _ in shards], worker_args, env, log_dir)
+        elapsed = time.perf_counter() - start
+        for w, (tests, expected) in zip(workers, shards):
+            print(
+                f"worker {w['worker']}: {len(tests)} tests, expected {expected:.1f}s, "
+                f"took {w['seconds']:.1f}s — {_summary_line(w['log'])}"
+            )
+            if w["returncode"] not in (0, 5):
+                failed = [
+                    line for line in w["log"].read_text().splitlines()
+                    if line.startswith(("FAILED", "ERROR"))
+                ]
+                print("\n".join(f"  {line}" for line in failed))
+
+    files = telemetry.merge_shards(run_id)
+    if files is not None:
+        print(telemetry.format_summary(telemetry.summarize(pl.read_parquet(files[0]))))
+        print(f"→ {files[0]}")
+    if args.record_run is not None and (path := runs.merge_shards(run_id)) is not None:
+        print(f"Recorded run → {path}")
+    print(f"Finished in {elapsed:.1f}s")
+    sys.exit(max(w["returncode"] for w in workers))
+
+
+if __name__ == "__main__":
+    main()
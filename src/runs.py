@@ -0,0 +1,311 @@
+"""Evaluation run history and run-to-run diffs — Polars + Parquet.
+
+Every recorded evaluation run is one Parquet partition,
+``data/runs/run_id=<id>/results.parquet``, with one row per (metric, trace):
+score, success, reason and the judge model that produced it. Run ids are UTC
+timestamps to the microsecond, so they sort chronologically and runs
+started in the same second don't collide; rows are sorted by (metric,
+trace_id). Diffing two runs reads just their two partitions; runs over the
+same traces line up row for row, so millions of rows diff in well under a
+second, and anything else falls back to a full join. Parallel test workers
+(``src.parallel``) each record a shard, ``results-<worker>.parquet``, which
+:func:`merge_shards` combines into the run's partition.
+
+    uv run pytest tests/test_deepeval.py --record-run      # record a run
+    uv run python -m src.runs list
+    uv run python -m src.runs diff --max-regressions 0     # previous → latest
+"""
+
+import argparse
+import os
+import sys
+from datetime import UTC, datetime, timedelta
+from pathlib import Path
+
+import polars as pl
+
+from src.telemetry import scope, shard_file
+
+RUNS_DIR = Path(__file__).parent.parent / "data" / "runs"
+RESULTS_FILE = "results.parquet"
+
+CHANGES = ["regressed", "fixed", "unchanged", "added", "removed"]
+
+RESULT_SCHEMA = {
+    "metric": pl.Utf8,
+    "trace_id": pl.Utf8,
+    "score": pl.Float64,
+    "success": pl.Boolean,
+    "reason": pl.Utf8,
+    "judge_model": pl.Utf8,
+    "recorded_at": pl.Datetime("us", "UTC"),
+}
+
+
+_last_run_start = datetime.min.replace(tzinfo=UTC)
+
+
+def new_run_id() -> str:
+    # Strictly increasing within a process, even if the clock doesn't tick
+    global _last_run_start
+    _last_run_start = max(datetime.now(UTC), _last_run_start + timedelta(microseconds=1))
+    return f"{_last_run_start:%Y%m%dT%H%M%S%fZ}"
+
+
+# ── Recording ────────────────────────────────────────────────────────────
+class RunRecorder:
+    """Collects metric results during a run and writes them as one partition,
+    or as one *worker*'s shard of it."""
+
+    def __init__(
+        self,
+        run_id: str | None = None,
+        runs_dir: str | Path = RUNS_DIR,
+        worker: str | None = None,
+    ):
+        self.run_id = run_id or new_run_id()
+        self.runs_dir = Path(runs_dir)
+        self.worker = worker
+        self.rows: list[dict] = []
+
+    def record(
+        self,
+        trace_id: str,
+        metric: str,
+        score: float | None,
+        success: bool,
+        reason: str | None = None,
+        judge_model: str | None = None,
+    ) -> None:
+        self.rows.append({
+            "metric": metric,
+            "trace_id": trace_id,
+            "score": score,
+            "success": success,
+            "reason": reason,
+            "judge_model": judge_model,
+            "recorded_at": datetime.now(UTC),
+        })
+
+    def write(self) -> Path | None:
+        """Write the partition (replacing a same-named one); the last result
+        recorded for a (metric, trace) wins. Returns None if nothing was recorded."""
+        if not self.rows:
+            return None
+        partition = self.runs_dir / f"run_id={self.run_id}"
+        partition.mkdir(parents=True, exist_ok=True)
+        return _write_results(
+            pl.DataFrame(self.rows, schema=RESULT_SCHEMA),
+            partition / shard_file(RESULTS_FILE, self.worker),
+        )
+
+
+def _write_results(results: pl.DataFrame, path: Path) -> Path:
+    tmp = path.with_suffix(".tmp")
+    (
+        results.unique(subset=["metric", "trace_id"], keep="last", maintain_order=True)
+        .sort("metric", "trace_id")
+        .write_parquet(tmp)
+    )
+    os.replace(tmp, path)
+    return path
+
+
+def merge_shards(run_id: str, runs_dir: str | Path = RUNS_DIR) -> Path | None:
+    """Combine the workers' result shards for *run_id* into the run's
+    partition, or None if no worker recorded anything."""
+    partition = Path(runs_dir) / f"run_id={run_id}"
+    shards = sorted(partition.glob(shard_file(RESULTS_FILE, "*")))
+    if not shards:
+        return None
+    path = _write_results(pl.concat([pl.read_parquet(p) for p in shards]), partition / RESULTS_FILE)
+    for shard in shards:
+        shard.unlink()
+    return path
+
+
+_recorder: RunRecorder | None = None
+
+
+def start_run(
+    run_id: str | None = None, runs_dir: str | Path = RUNS_DIR, worker: str | None = None
+) -> RunRecorder:
+    """Make results from :func:`assert_test` go to a new run (or *worker*'s
+    shard of it)."""
+    global _recorder
+    _recorder = RunRecorder(run_id, runs_dir, worker)
+    return _recorder
+
+
+def finish_run() -> Path | None:
+    """Write the current run, if any, and stop recording."""
+    global _recorder
+    recorder, _recorder = _recorder, None
+    return recorder.write() if recorder is not None else None
+
+
+def current_run() -> RunRecorder | None:
+    return _recorder
+
+
+def _results(test_case) -> list:
+    """deepeval's results so far for test cases named like *test_case*."""
+    from deepeval.test_run import global_test_run_manager
+
+    test_run = global_test_run_manager.get_test_run()
+    return [c for c in test_run.test_cases if c.name == test_case.name] if test_run else []
+
+
+def assert_test(test_case, metrics: list) -> None:
+    """deepeval's ``assert_test``, recording every metric's result in the
+    current run, from one deepeval call. ``test_case.name`` must be the
+    trace id; judge calls are attributed to it, and each metric's calls to
+    the metric by its ``src.judge.MetricJudge``."""
+    from deepeval import assert_test as deepeval_assert_test
+
+    before = len(_results(test_case)) if _recorder is not None else 0
+    try:
+        with scope(None, test_case.name):
+            deepeval_assert_test(test_case, metrics)
+    finally:
+        # deepeval measures copies of the metrics; their results are in its test run
+        if _recorder is not None and len(cases := _results(test_case)) > before:
+            results = {data.name: data for data in cases[-1].metrics_data or []}
+            for metric in metrics:
+                data = results.get(metric.__name__)
+                if data is not None:
+                    _recorder.record(
+                        test_case.name,
+                        metric.name,
+                        data.score,
+                        bool(data.success),
+                        data.reason,
+                        data.evaluation_model,
+                    )
+
+
+# ── Reading and diffing ──────────────────────────────────────────────────
+def list_runs(runs_dir: str | Path = RUNS_DIR) -> list[str]:
+    """Recorded run ids, oldest first."""
+    runs_dir = Path(runs_dir)
+    if not runs_dir.exists():
+        return []
+    return sorted(
+        p.name.removeprefix("run_id=")
+        for p in runs_dir.glob("run_id=*")
+        if (p / RESULTS_FILE).exists()
+    )
+
+
+def scan_run(run_id: str, runs_dir: str | Path = RUNS_DIR) -> pl.LazyFrame:
+    path = Path(runs_dir) / f"run_id={run_id}" / RESULTS_FILE
+    if not path.exists():
+        raise FileNotFoundError(f"No recorded run {run_id!r} in {runs_dir}")
+    return pl.scan_parquet(path)
+
+
+def scan_runs(runs_dir: str | Path = RUNS_DIR) -> pl.LazyFrame:
+    """Every run as one LazyFrame, with ``run_id`` from the partition path."""
+    return pl.scan_parquet(
+        Path(runs_dir) / "run_id=*" / RESULTS_FILE, hive_partitioning=True
+    )
+
+
+def _classify(diff: pl.DataFrame) -> pl.DataFrame:
+    return diff.with_columns(
+        (pl.col("score_head") - pl.col("score_base")).alias("delta"),
+        pl.when(pl.col("success_base").is_null())
+        .then(pl.lit("added"))
+        .when(pl.col("success_head").is_null())
+        .then(pl.lit("removed"))
+        .when(pl.col("success_base") & ~pl.col("success_head"))
+        .then(pl.lit("regressed"))
+        .when(~pl.col("success_base") & pl.col("success_head"))
+        .then(pl.lit("fixed"))
+        .otherwise(pl.lit("unchanged"))
+        .alias("change"),
+    )
+
+
+def diff_runs(base: str, head: str, runs_dir: str | Path = RUNS_DIR) -> pl.DataFrame:
+    """Per (metric, trace_id): both runs' scores and outcomes, the score
+    ``delta`` and a ``change`` of regressed / fixed / unchanged / added / removed."""
+    cols = ["metric", "trace_id", "score", "success"]
+    before = scan_run(base, runs_dir).select(cols).collect()
+    after = scan_run(head, runs_dir).select(cols).collect()
+    head_cols = [pl.col("score").alias("score_head"), pl.col("success").alias("success_head")]
+    before = before.rename({"score": "score_base", "success": "success_base"})
+
+    # Partitions are sorted by (metric, trace_id): re-runs over the same
+    # traces line up row for row and need no join at all.
+    aligned = (
+        before.height == after.height
+        and before["metric"].equals(after["metric"])
+        and before["trace_id"].equals(after["trace_id"])
+    )
+    if aligned:
+        return _classify(before.hstack(after.select(head_cols)))
+    return _classify(
+        before.join(
+            after.select("metric", "trace_id", *head_cols),
+            on=["metric", "trace_id"],
+            how="full",
+            coalesce=True,
+        )
+    )
+
+
+def summarize_diff(diff: pl.DataFrame) -> pl.DataFrame:
+    """Per metric: count of each change and the mean score delta."""
+    return (
+        diff.group_by("metric")
+        .agg(
+            *((pl.col("change") == c).sum().alias(c) for c in CHANGES),
+            pl.col("delta").mean().alias("mean_delta"),
+        )
+        .sort("metric")
+    )
+
+
+# ── CLI ──────────────────────────────────────────────────────────────────
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs-dir", default=RUNS_DIR, type=Path)
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("list", help="list recorded runs")
+    diff = commands.add_parser("diff", help="compare two runs (default: previous → latest)")
+    diff.add_argument("base", nargs="?")
+    diff.add_argument("head", nargs="?")
+    diff.add_argument(
+        "--max-regressions",
+        type=int,
+        help="exit non-zero when more pass → fail flips than this",
+    )
+    args = parser.parse_args(argv)
+
+    runs = list_runs(args.runs_dir)
+    if args.command == "list":
+        for run_id in runs:
+            print(run_id)
+        return
+
+    head = args.head or (runs[-1] if runs else None)
+    base = args.base or (runs[-2] if len(runs) > 1 else None)
+    if base is None or head is None:
+        sys.exit("Need two recorded runs to diff.")
+
+    result = diff_runs(base, head, args.runs_dir)
+    regressed = result.filter(pl.col("change") == "regressed")
+    with pl.Config(tbl_rows=-1, tbl_cols=-1, tbl_hide_dataframe_shape=True, float_precision=3):
+        print(f"{base} → {head}")
+        print(summarize_diff(result))
+        if regressed.height:
+            print("Regressed:")
+            print(regressed.select("metric", "trace_id", "score_base", "score_head"))
+
+    if args.max_regressions is not None and regressed.height > args.max_regressions:
+        sys.exit(f"{regressed.height} regressions (limit {args.max_regressions})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,342 @@
+"""Stratified sampling evaluation — judge a sample, report pass rates with CIs.
+
+Traces are stratified by scenario, discount eligibility and product category.
+An initial allocation judges a few traces per stratum; further traces are then
+added, batch by batch, to whichever stratum has the widest confidence
+interval until every interval is narrow enough or the judge budget runs out.
+Cost therefore scales with the precision asked for, not with dataset size.
+
+    uv run python -m src.sampling --budget 200 --half-width 0.1
+"""
+
+import argparse
+import json
+import math
+import random
+from collections.abc import Callable
+from pathlib import Path
+
+import polars as pl
+
+from src.dedup import load_clusters
+from src.features import select, update_features
+from src.telemetry import scope
+
+STRATA_KEYS = ["scenario", "has_discount", "product_category"]
+Z_95 = 1.959964
+
+Judge = Callable[[dict], dict[str, bool]]
+
+
+def strata_frame(traces: list[dict]) -> pl.DataFrame:
+    """One row per trace with its strata keys and a combined ``stratum`` id."""
+    return pl.DataFrame(
+        {
+            "trace_id": [t["trace_id"] for t in traces],
+            "scenario": [t["scenario"] for t in traces],
+            "has_discount": [
+                bool(t.get("metadata", {}).get("has_discount")) for t in traces
+            ],
+            "product_category": [
+                t.get("metadata", {}).get("product_category", "") for t in traces
+            ],
+        },
+        schema={
+            "trace_id": pl.Utf8,
+            "scenario": pl.Utf8,
+            "has_discount": pl.Boolean,
+            "product_category": pl.Utf8,
+        },
+    ).with_columns(
+        pl.concat_str(
+            [pl.col(k).cast(pl.Utf8) for k in STRATA_KEYS], separator=" | "
+        ).alias("stratum")
+    )
+
+
+def wilson_interval(
+    passed: int,
+    n: int,
+    population: int | None = None,
+    z: float = Z_95,
+) -> tuple[float, float]:
+    """Wilson score interval for a pass rate, with a finite-population
+    correction when the stratum size is known."""
+    if n == 0:
+        return 0.0, 1.0
+    p = passed / n
+    if population is not None and n >= population:
+        return p, p  # the whole stratum was judged
+    denom = 1 + z**2 / n
+    center = (p + z**2 / (2 * n)) / denom
+    half = z * math.sqrt(p * (1 - p) / n + z**2 / (4 * n**2)) / denom
+    if population is not None and population > 1:
+        half *= math.sqrt((population - n) / (population - 1))
+    return max(0.0, center - half), min(1.0, center + half)
+
+
+def allocate(sizes: dict[str, int], budget: int, minimum: int = 1) -> dict[str, int]:
+    """Split *budget* across strata proportionally to size (largest remainder),
+    giving each stratum at least *minimum* and never more than its size."""
+    floor = {s: min(size, minimum) for s, size in sizes.items()}
+    remaining = budget - sum(floor.values())
+    if remaining <= 0:
+        # Not enough budget for the minimum: favour the largest strata.
+        alloc = {s: 0 for s in sizes}
+        for s in sorted(sizes, key=sizes.get, reverse=True)[: max(budget, 0)]:
+            alloc[s] = 1
+        return alloc
+
+    spare = {s: sizes[s] - floor[s] for s in sizes}
+    total_spare = sum(spare.values())
+    if total_spare == 0:
+        return floor
+    remaining = min(remaining, total_spare)
+    quotas = {s: remaining * spare[s] / total_spare for s in sizes}
+    alloc = {s: floor[s] + int(quotas[s]) for s in sizes}
+    leftover = remaining - sum(int(q) for q in quotas.values())
+    by_remainder = sorted(sizes, key=lambda s: quotas[s] - int(quotas[s]), reverse=True)
+    for s in by_remainder:
+        if leftover == 0:
+            break
+        if alloc[s] < sizes[s]:
+            alloc[s] += 1
+            leftover -= 1
+    return alloc
+
+
+def _stratum_widths(
+    results: list[dict], sizes: dict[str, int], z: float
+) -> dict[str, float]:
+    """Widest CI half-width over metrics, per stratum (0.5 if unjudged)."""
+    counts: dict[tuple[str, str], list[int]] = {}
+    for r in results:
+        c = counts.setdefault((r["stratum"], r["metric"]), [0, 0])
+        c[0] += r["success"]
+        c[1] += 1
+    halves: dict[str, list[float]] = {}
+    for (stratum, _), (passed, n) in counts.items():
+        low, high = wilson_interval(passed, n, sizes[stratum], z)
+        halves.setdefault(stratum, []).append((high - low) / 2)
+    return {s: max(halves[s]) if s in halves else 0.5 for s in sizes}
+
+
+def stratified_evaluate(
+    traces: list[dict],
+    judge: Judge,
+    budget: int,
+    target_half_width: float = 0.1,
+    min_per_stratum: int = 3,
+    batch_size: int = 5,
+    z: float = Z_95,
+    seed: int = 0,
+    clusters: pl.DataFrame | None = None,
+) -> pl.DataFrame:
+    """Judge an adaptive stratified sample of *traces*.
+
+    *judge* maps a trace to ``{metric_name: success}``. At most *budget*
+    judge calls are made. With near-duplicate *clusters* (``src.dedup``), a
+    sampled trace whose cluster was already judged reuses that verdict
+    without using any budget. Returns one row per (trace, metric) with the
+    strata columns.
+    """
+    strata = strata_frame(traces)
+    by_id = {t["trace_id"]: t for t in traces}
+    rng = random.Random(seed)
+
+    pools: dict[str, list[str]] = {}
+    for stratum, trace_id in strata.select("stratum", "trace_id").iter_rows():
+        pools.setdefault(stratum, []).append(trace_id)
+    for pool in pools.values():
+        rng.shuffle(pool)
+    sizes = {s: len(p) for s, p in pools.items()}
+
+    cluster_of = (
+        {} if clusters is None else dict(clusters.select("trace_id", "cluster_id").iter_rows())
+    )
+    verdicts: dict[str, dict[str, bool]] = {}
+    results: list[dict] = []
+    spent = 0
+
+    def judge_from(stratum: str, k: int) -> None:
+        nonlocal spent
+        for _ in range(k):
+            trace_id = pools[stratum].pop()
+            key = cluster_of.get(trace_id, trace_id)
+            if key not in verdicts:
+                verdicts[key] = judge(by_id[trace_id])
+                spent += 1
+            for metric, success in verdicts[key].items():
+                results.append({
+                    "trace_id": trace_id,
+                    "stratum": stratum,
+                    "metric": metric,
+                    "success": bool(success),
+                })
+
+    initial = {s: min(size, min_per_stratum) for s, size in sizes.items()}
+    if sum(initial.values()) > budget:
+        initial = allocate(sizes, budget)
+    for stratum, k in initial.items():
+        judge_from(stratum, k)
+
+    while spent < budget:
+        widths = _stratum_widths(results, sizes, z)
+        open_strata = [
+            s for s in pools if pools[s] and widths[s] > target_half_width
+        ]
+        if not open_strata:
+            break
+        # Largest strata first among equally wide ones: they weigh more in
+        # every aggregate the report computes.
+        widest = max(open_strata, key=lambda s: (widths[s], sizes[s]))
+        judge_from(widest, min(batch_size, len(pools[widest]), budget - spent))
+
+    schema = {"trace_id": pl.Utf8, "stratum": pl.Utf8, "metric": pl.Utf8, "success": pl.Boolean}
+    return pl.DataFrame(results, schema=schema).join(
+        strata.select("stratum", *STRATA_KEYS).unique("stratum"), on="stratum"
+    )
+
+
+def pass_rates(
+    results: pl.DataFrame,
+    traces: list[dict],
+    by: list[str] | None = None,
+    z: float = Z_95,
+) -> pl.DataFrame:
+    """Per-metric pass rates with confidence intervals, grouped by *by*.
+
+    Groups are any subset of ``STRATA_KEYS`` (``[]`` for the overall rate).
+    Single-stratum groups use the Wilson interval; groups spanning several
+    strata combine stratum rates weighted by population size. Strata with no
+    judged traces can't inform ``pass_rate``, but still count towards the
+    interval, which allows any pass rate for them; ``unjudged_share`` is the
+    share of the group's traces in such strata.
+    """
+    by = STRATA_KEYS if by is None else by
+    population = strata_frame(traces).group_by("stratum", *STRATA_KEYS).len("N")
+    group_cols = [*by, "metric"]
+    schema = {
+        **{c: population.schema[c] for c in by},
+        "metric": pl.Utf8,
+        "judged": pl.Int64,
+        "passed": pl.Int64,
+        "pass_rate": pl.Float64,
+        "ci_low": pl.Float64,
+        "ci_high": pl.Float64,
+        "unjudged_share": pl.Float64,
+    }
+    if results.height == 0:
+        return pl.DataFrame(schema=schema)
+    # Every stratum for every metric, judged or not
+    stats = (
+        population.join(results.select(pl.col("metric").unique()), how="cross")
+        .join(
+            results.group_by("stratum", "metric").agg(
+                pl.col("success").sum().alias("passed"), pl.len().alias("n")
+            ),
+            on=["stratum", "metric"],
+            how="left",
+        )
+        .with_columns(pl.col("passed", "n").fill_null(0))
+    )
+
+    rows = []
+    for key, group in stats.group_by(group_cols, maintain_order=True):
+        group = group.to_dicts()
+        judged = [g for g in group if g["n"]]
+        total = sum(g["N"] for g in group)
+        unjudged = sum(g["N"] for g in group if not g["n"]) / total
+        if not judged:
+            rate, low, high = None, 0.0, 1.0
+        elif len(group) == 1:
+            g = group[0]
+            rate = g["passed"] / g["n"]
+            low, high = wilson_interval(g["passed"], g["n"], g["N"], z)
+        else:
+            # Weight judged stratum rates by population; each stratum's
+            # variance is taken from its Wilson interval so all-pass/all-fail
+            # strata still contribute uncertainty.
+            judged_total = sum(g["N"] for g in judged)
+            rate, variance = 0.0, 0.0
+            for g in judged:
+                w = g["N"] / judged_total
+                g_low, g_high = wilson_interval(g["passed"], g["n"], g["N"], z)
+                rate += w * g["passed"] / g["n"]
+                variance += (w * (g_high - g_low) / (2 * z)) ** 2
+            half = z * math.sqrt(variance)
+            low, high = max(0.0, rate - half), min(1.0, rate + half)
+            # Unjudged strata could pass at any rate from 0 to 1
+            low, high = (1 - unjudged) * low, (1 - unjudged) * high + unjudged
+        rows.append({
+            **dict(zip(group_cols, key)),
+            "judged": sum(g["n"] for g in group),
+            "passed": sum(g["passed"] for g in group),
+            "pass_rate": rate,
+            "ci_low": low,
+            "ci_high": high,
+            "unjudged_share": unjudged,
+        })
+    return pl.DataFrame(rows, schema=schema).sort(group_cols)
+
+
+# ── CLI ──────────────────────────────────────────────────────────────────
+def geval_judge(metric_names: list[str] | None = None) -> Judge:
+    """Judge traces with the shared GEval metrics from ``src.metrics``."""
+    from src.metrics import METRICS, trace_to_test_case
+
+    metrics = [METRICS[m] for m in metric_names] if metric_names else list(METRICS.values())
+
+    def judge(trace: dict) -> dict[str, bool]:
+        test_case = trace_to_test_case(trace)
+        outcome = {}
+        for metric in metrics:
+            with scope(metric.name, trace["trace_id"]):
+                metric.measure(test_case)
+            outcome[metric.name] = metric.is_successful()
+        return outcome
+
+    return judge
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--traces", default=Path("data/traces.json"), type=Path)
+    parser.add_argument("--budget", type=int, default=100, help="max judge calls")
+    parser.add_argument("--half-width", type=float, default=0.1)
+    parser.add_argument("--min-per-stratum", type=int, default=3)
+    parser.add_argument("--metric", action="append", help="metric name (repeatable)")
+    parser.add_argument("--by", action="append", choices=STRATA_KEYS)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--clusters",
+        type=Path,
+        help="near-duplicate clusters from src.dedup: judge one trace per cluster",
+    )
+    parser.add_argument(
+        "--where", help='only traces whose src.features match, e.g. "n_turns>=6"'
+    )
+    args = parser.parse_args(argv)
+
+    traces = json.loads(args.traces.read_text())
+    if args.where:
+        keep = set(select(update_features(traces), args.where))
+        traces = [t for t in traces if t["trace_id"] in keep]
+    results = stratified_evaluate(
+        traces,
+        geval_judge(args.metric),
+        budget=args.budget,
+        target_half_width=args.half_width,
+        min_per_stratum=args.min_per_stratum,
+        seed=args.seed,
+        clusters=load_clusters(args.clusters) if args.clusters else None,
+    )
+    judged = results["trace_id"].n_unique()
+    print(f"Judged {judged} of {len(traces)} traces")
+    with pl.Config(tbl_rows=-1, tbl_width_chars=200):
+        print(pass_rates(results, traces, by=[]))
+        print(pass_rates(results, traces, by=args.by))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,297 @@
+"""Offline semantic similarity search over traces — Polars + NumPy memmap.
+
+Each trace's assistant turns become a TF-IDF bag of words, projected to a
+small dense vector with a signed sparse random projection (every word adds
+its weight to a few hashed dimensions with hashed signs), then normalized so
+a dot product is cosine similarity. Nothing leaves the machine.
+
+Vectors are stored in a memory-mapped ``.npy`` file grouped by an inverted
+file (IVF) index: spherical k-means centroids split the traces into about
+√n lists stored contiguously, and a query only scans the lists whose
+centroids are closest. With the default settings a top-k query over millions
+of traces reads a few thousand vectors and takes milliseconds.
+
+    uv run python -m src.similarity build
+    uv run python -m src.similarity query trace_019 -k 5
+"""
+
+import argparse
+import json
+import math
+import time
+from datetime import UTC, datetime
+from pathlib import Path
+
+import numpy as np
+import polars as pl
+
+from src.claims import turns_frame
+
+INDEX_DIR = Path(__file__).parent.parent / "data" / "similarity"
+
+DIM = 256
+PROJECTIONS = 4  # hashed dimensions per word
+N_PROBE = 8  # lists scanned per query
+BATCH_SIZE = 50_000
+_WORD = r"[a-z0-9']+"
+
+
+# ── Embedding ────────────────────────────────────────────────────────────
+def _term_counts(traces: list[dict], offset: int = 0) -> pl.DataFrame:
+    """``row``, ``token`` (hashed word) and ``tf`` over assistant turns;
+    *offset* is the row number of ``traces[0]``."""
+    rows = pl.DataFrame(
+        {"trace_id": [t["trace_id"] for t in traces]}, schema={"trace_id": pl.Utf8}
+    ).with_row_index("row", offset=offset)
+    return (
+        turns_frame(traces)
+        .filter(pl.col("role") == "assistant")
+        .select("trace_id", word=pl.col("content").str.to_lowercase().str.extract_all(_WORD))
+        .explode("word")
+        .drop_nulls("word")
+        .join(rows, on="trace_id")
+        .group_by("row", token=pl.col("word").hash(seed=0))
+        .agg(tf=pl.len())
+    )
+
+
+def document_frequencies(traces: list[dict], batch_size: int = BATCH_SIZE) -> pl.DataFrame:
+    """``token`` → number of traces using it, counted a batch at a time."""
+    counts = [
+        _term_counts(traces[start : start + batch_size]).group_by("token").agg(df=pl.len())
+        for start in range(0, len(traces), batch_size)
+    ]
+    if not counts:
+        return pl.DataFrame(schema={"token": pl.UInt64, "df": pl.UInt32})
+    return pl.concat(counts).group_by("token").agg(pl.col("df").sum())
+
+
+def embed(
+    traces: list[dict],
+    idf: pl.DataFrame,
+    dim: int = DIM,
+    offset: int = 0,
+) -> np.ndarray:
+    """Unit-length float32 vectors (one row per trace) from sublinear TF-IDF
+    weights; *idf* has ``token`` and ``idf`` columns. Traces with no known
+    words get a zero vector."""
+    weights = (
+        _term_counts(traces, offset)
+        .join(idf, on="token")
+        .select(
+            "token",
+            row=pl.col("row") - offset,
+            weight=(1 + pl.col("tf").log()) * pl.col("idf"),
+        )
+    )
+    rows = weights["row"].cast(pl.Int64).to_numpy() * dim
+    flat = np.zeros(len(traces) * dim, dtype=np.float64)
+    for p in range(PROJECTIONS):
+        hashed = weights.select(
+            dim=pl.col("token").hash(seed=p + 1) % dim,
+            sign=pl.col("token").hash(seed=p + 1 + PROJECTIONS) % 2,
+        )
+        signs = 1.0 - 2.0 * hashed["sign"].to_numpy()
+        flat += np.bincount(
+            rows + hashed["dim"].cast(pl.Int64).to_numpy(),
+            weights=weights["weight"].to_numpy() * signs,
+            minlength=flat.size,
+        )
+    vectors = flat.reshape(len(traces), dim).astype(np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    np.divide(vectors, norms, out=vectors, where=norms > 0)
+    return vectors
+
+
+def inverse_document_frequency(df: pl.DataFrame, n: int) -> pl.DataFrame:
+    return df.select("token", idf=((1 + n) / (1 + pl.col("df"))).log() + 1)
+
+
+# ── IVF index ────────────────────────────────────────────────────────────
+def spherical_kmeans(
+    vectors: np.ndarray, k: int, iterations: int = 10, seed: int = 0
+) -> np.ndarray:
+    """*k* unit-length centroids maximizing cosine similarity to *vectors*."""
+    if not 0 < k <= len(vectors):
+        raise ValueError(f"Can't pick {k} centroids from {len(vectors)} vectors")
+    rng = np.random.default_rng(seed)
+    centroids = vectors[rng.choice(len(vectors), size=k, replace=False)].copy()
+    for _ in range(iterations):
+        labels = np.argmax(vectors @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, labels, vectors)
+        norms = np.linalg.norm(sums, axis=1, keepdims=True)
+        empty = norms[:, 0] == 0
+        # Re-seed lists that lost all their vectors
+        sums[empty] = vectors[rng.choice(len(vectors), size=int(empty.sum()))]
+        norms[empty] = 1.0
+        centroids = (sums / norms).astype(np.float32)
+    return centroids
+
+
+def build_index(
+    traces: list[dict],
+    out_dir: str | Path = INDEX_DIR,
+    dim: int = DIM,
+    n_lists: int | None = None,
+    batch_size: int = BATCH_SIZE,
+    seed: int = 0,
+) -> dict:
+    """Embed *traces* and write the IVF index to *out_dir*. Vectors are
+    written a batch at a time to a memory-mapped file, so memory is bounded
+    by the batch size (plus the k-means training sample). With no traces
+    the index is empty, and every search finds nothing."""
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    n = len(traces)
+    n_lists = n_lists or max(1, round(math.sqrt(n)))
+    n_lists = min(n_lists, max(n, 1))
+
+    idf = inverse_document_frequency(document_frequencies(traces, batch_size), n)
+    unsorted_path = out_dir / "vectors.unsorted.npy"
+    unsorted = np.lib.format.open_memmap(unsorted_path, "w+", np.float32, (n, dim))
+    for start in range(0, n, batch_size):
+        batch = traces[start : start + batch_size]
+        unsorted[start : start + len(batch)] = embed(batch, idf, dim, offset=start)
+    unsorted.flush()
+
+    # Train on a sample, then assign every vector to its nearest list
+    rng = np.random.default_rng(seed)
+    sample = np.sort(rng.choice(n, size=min(n, max(n_lists * 50, 10_000)), replace=False))
+    centroids = (
+        spherical_kmeans(np.asarray(unsorted[sample]), n_lists, seed=seed)
+        if n
+        else np.zeros((n_lists, dim), dtype=np.float32)
+    )
+    labels = np.zeros(n, dtype=np.int64)
+    for start in range(0, n, batch_size):
+        labels[start : start + batch_size] = np.argmax(
+            unsorted[start : start + batch_size] @ centroids.T, axis=1
+        )
+    order = np.argsort(labels, kind="stable")
+    offsets = np.searchsorted(labels[order], np.arange(n_lists + 1))
+
+    vectors = np.lib.format.open_memmap(out_dir / "vectors.npy", "w+", np.float32, (n, dim))
+    for start in range(0, n, batch_size):
+        vectors[start : start + batch_size] = unsorted[order[start : start + batch_size]]
+    vectors.flush()
+    del unsorted, vectors
+    unsorted_path.unlink()
+
+    np.save(out_dir / "centroids.npy", centroids)
+    np.save(out_dir / "offsets.npy", offsets)
+    trace_ids = pl.Series("trace_id", [t["trace_id"] for t in traces], pl.Utf8)
+    trace_ids.gather(order).to_frame().write_parquet(out_dir / "trace_ids.parquet")
+    meta = {
+        "traces": n,
+        "dim": dim,
+        "lists": n_lists,
+        "built_at": datetime.now(UTC).isoformat(timespec="seconds"),
+    }
+    (out_dir / "meta.json").write_text(json.dumps(meta, indent=2))
+    return meta
+
+
+class SimilarityIndex:
+    """Read-only view of an index written by :func:`build_index`; vectors
+    stay on disk and are paged in list by list."""
+
+    def __init__(self, path: str | Path = INDEX_DIR):
+        path = Path(path)
+        self.meta = json.loads((path / "meta.json").read_text())
+        self.centroids = np.load(path / "centroids.npy")
+        self.offsets = np.load(path / "offsets.npy")
+        self.vectors = np.load(path / "vectors.npy", mmap_mode="r")
+        self.trace_ids = pl.read_parquet(path / "trace_ids.parquet")["trace_id"]
+        self._rows: dict[str, int] | None = None
+
+    def __len__(self) -> int:
+        return len(self.trace_ids)
+
+    def row(self, trace_id: str) -> int:
+        if self._rows is None:
+            self._rows = {tid: i for i, tid in enumerate(self.trace_ids)}
+        return self._rows[trace_id]
+
+    def search(
+        self, query: np.ndarray, k: int = 10, n_probe: int = N_PROBE
+    ) -> list[tuple[int, float]]:
+        """Top-*k* ``(row, cosine similarity)`` among the *n_probe* lists
+        nearest to *query*, best first."""
+        lists = np.argsort(self.centroids @ query)[::-1][:n_probe]
+        rows = np.concatenate(
+            [np.arange(self.offsets[c], self.offsets[c + 1]) for c in lists]
+        )
+        if rows.size == 0:
+            return []
+        scores = np.concatenate(
+            [self.vectors[self.offsets[c] : self.offsets[c + 1]] @ query for c in lists]
+        )
+        top = np.argpartition(-scores, min(k, scores.size) - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [(int(rows[i]), float(scores[i])) for i in top]
+
+    def similar(self, trace_id: str, k: int = 10, n_probe: int = N_PROBE) -> pl.DataFrame:
+        """The *k* traces most similar to *trace_id* (excluding itself)."""
+        row = self.row(trace_id)
+        hits = [
+            (self.trace_ids[r], score)
+            for r, score in self.search(np.asarray(self.vectors[row]), k + 1, n_probe)
+            if r != row
+        ][:k]
+        return pl.DataFrame(
+            hits, schema={"trace_id": pl.Utf8, "similarity": pl.Float64}, orient="row"
+        )
+
+
+def load_index(
+    traces: list[dict], path: str | Path = INDEX_DIR, source: Path | None = None
+) -> SimilarityIndex:
+    """The index at *path*, rebuilt first if it is missing, covers a
+    different number of traces, or is older than *source*."""
+    path = Path(path)
+    meta_path = path / "meta.json"
+    stale = not meta_path.exists() or (
+        json.loads(meta_path.read_text())["traces"] != len(traces)
+        or (source is not None and source.stat().st_mtime > meta_path.stat().st_mtime)
+    )
+    if stale:
+        build_index(traces, path)
+    return SimilarityIndex(path)
+
+
+# ── CLI ──────────────────────────────────────────────────────────────────
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--index", default=INDEX_DIR, type=Path)
+    sub = parser.add_subparsers(dest="command", required=True)
+    build = sub.add_parser("build", help="embed traces and write the index")
+    build.add_argument("--traces", default=Path("data/traces.json"), type=Path)
+    build.add_argument("--dim", type=int, default=DIM)
+    build.add_argument("--lists", type=int, help="IVF lists (default √n)")
+    query = sub.add_parser("query", help="traces most similar to a trace")
+    query.add_argument("trace_id")
+    query.add_argument("-k", type=int, default=10)
+    query.add_argument("--probe", type=int, default=N_PROBE)
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        start = time.perf_counter()
+        meta = build_index(json.loads(args.traces.read_text()), args.index, args.dim, args.lists)
+        print(
+            f"Indexed {meta['traces']} traces ({meta['dim']} dims, {meta['lists']} lists) "
+            f"in {time.perf_counter() - start:.1f}s → {args.index}"
+        )
+        return
+
+    index = SimilarityIndex(args.index)
+    start = time.perf_counter()
+    similar = index.similar(args.trace_id, args.k, args.probe)
+    elapsed = (time.perf_counter() - start) * 1000
+    with pl.Config(tbl_rows=-1):
+        print(similar)
+    print(f"{elapsed:.1f} ms over {len(index)} traces")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,21 @@
-"""Persistence layer for trace grades — Polars + CSV."""
+"""Persistence layer for trace grades — Polars + CSV.
 
+``grades.csv`` holds the current grade per trace. Every save is also
+appended to a change log next to it, ``grades.changes.jsonl``, which keeps
+every earlier grade (see ``src.history``) and only grows: its length in
+bytes is the store's version, and a :class:`GradeFeed` follows it from a
+byte cursor so a grading session picks up grades saved by other sessions
+without reloading the whole store. Log records are JSON lines, so comments
+can hold newlines and a record never spans two lines.
+
+Saves hold an exclusive ``flock`` on the change log, so sessions served by
+several Streamlit servers (or threads of one) never interleave, and replace
+``grades.csv`` atomically, so readers never see it half-written.
+"""
+
+import io
+import os
+import tempfile
 from datetime import datetime, timezone
 from pathlib import Path
 
@@ -10,15 +26,30 @@ SCHEMA = {
     "grade": pl.Utf8,
     "comment": pl.Utf8,
     "graded_at": pl.Utf8,
+    # The near-duplicate (``src.dedup``) a grade was copied from; null for
+    # grades given by hand
+    "propagated_from": pl.Utf8,
 }
 
+CHANGES_SUFFIX = ".changes.jsonl"
+
+
+def scan_grades(path: str | Path) -> pl.LazyFrame:
+    """Lazily scan the grades CSV (no rows if it doesn't exist). Columns
+    added to ``SCHEMA`` since a store was written read as null."""
+    path = Path(path)
+    if not path.exists() or path.stat().st_size == 0:
+        return pl.LazyFrame(schema=SCHEMA)
+    grades = pl.scan_csv(path, schema_overrides=SCHEMA)
+    present = grades.collect_schema().names()
+    return grades.with_columns(
+        pl.lit(None, dtype).alias(name) for name, dtype in SCHEMA.items() if name not in present
+    ).select(SCHEMA.keys())
+
 
 def load_grades(path: str | Path) -> pl.DataFrame:
     """Load grades CSV, returning an empty DataFrame if the file doesn't exist."""
-    path = Path(path)
-    if path.exists() and path.stat().st_size > 0:
-        return pl.read_csv(path, schema=SCHEMA)
-    return pl.DataFrame(schema=SCHEMA)
+    return scan_grades(path).collect()
 
 
 def save_grade(
@@ -29,27 +60,129 @@ def save_grade(
 ) -> pl.DataFrame:
     """Upsert a grade for *trace_id* into the CSV at *path* and return the
     updated DataFrame."""
+    return save_grades(path, [trace_id], grade, comment)
+
+
+def save_grades(
+    path: str | Path,
+    trace_ids: list[str],
+    grade: str,
+    comment: str = "",
+    propagated_from: str | None = None,
+) -> pl.DataFrame:
+    """Upsert the same grade for several traces (e.g. a cluster of
+    near-duplicates) in a single write and return the updated DataFrame.
+    With *propagated_from*, the other traces' grades are tagged as copies of
+    that trace's, so analyses of hand-given grades can leave them out."""
+    import fcntl
+
     path = Path(path)
-    df = load_grades(path)
     now = datetime.now(timezone.utc).isoformat()
 
-    new_row = pl.DataFrame(
+    new_rows = pl.DataFrame(
         {
-            "trace_id": [trace_id],
-            "grade": [grade],
-            "comment": [comment],
-            "graded_at": [now],
+            "trace_id": trace_ids,
+            "grade": [grade] * len(trace_ids),
+            "comment": [comment] * len(trace_ids),
+            "graded_at": [now] * len(trace_ids),
+            "propagated_from": [
+                None if tid == propagated_from else propagated_from for tid in trace_ids
+            ],
         },
         schema=SCHEMA,
     )
 
-    # Remove existing entry for this trace, then append the new one
-    df = df.filter(pl.col("trace_id") != trace_id)
-    df = pl.concat([df, new_row])
-    df.write_csv(path)
+    with open(changes_path(path), "ab") as log:
+        fcntl.flock(log, fcntl.LOCK_EX)
+        before = load_grades(path)
+        df = apply_changes(before, new_rows)
+        fd, tmp = tempfile.mkstemp(suffix=".tmp", dir=path.parent)
+        os.close(fd)
+        df.write_csv(tmp)
+        os.replace(tmp, path)
+        # Grades saved before the log existed become its first entries
+        logged = os.fstat(log.fileno()).st_size > 0
+        log_rows = new_rows if logged else pl.concat([before, new_rows])
+        log.write(log_rows.write_ndjson().encode())
     return df
 
 
+def apply_changes(grades: pl.DataFrame, changes: pl.DataFrame) -> pl.DataFrame:
+    """Upsert *changes* into *grades*: the last change per trace wins."""
+    latest = changes.unique(subset="trace_id", keep="last", maintain_order=True)
+    # Remove existing entries for these traces, then append the new ones
+    kept = grades.filter(~pl.col("trace_id").is_in(latest["trace_id"].implode()))
+    return pl.concat([kept, latest])
+
+
+# ── Change feed ──────────────────────────────────────────────────────────
+def changes_path(path: str | Path) -> Path:
+    """``grades.csv`` → ``grades.changes.jsonl``."""
+    path = Path(path)
+    return path.with_name(path.stem + CHANGES_SUFFIX)
+
+
+def version(path: str | Path) -> int:
+    """The store's version: the size of its change log, which only grows."""
+    log = changes_path(path)
+    return log.stat().st_size if log.exists() else 0
+
+
+def read_changes(path: str | Path, cursor: int = 0) -> tuple[pl.DataFrame, int]:
+    """Grade changes saved after byte *cursor* of the change log, oldest
+    first, and the cursor to read from next time. A line still being
+    written is left for the next read."""
+    empty = pl.DataFrame(schema=SCHEMA)
+    if version(path) <= cursor:
+        return empty, cursor
+    with open(changes_path(path), "rb") as log:
+        log.seek(cursor)
+        data = log.read()
+    end = data.rfind(b"\n") + 1
+    if end == 0:
+        return empty, cursor
+    changes = pl.read_ndjson(io.BytesIO(data[:end]), schema=SCHEMA)
+    return changes, cursor + end
+
+
+class GradeFeed:
+    """One session's copy of the grade store, kept current from the change
+    log. :meth:`poll` costs a ``stat`` when nothing changed; otherwise it
+    reads and applies only the new changes.
+
+    ``grades`` is the current-grade frame and ``index`` maps trace id →
+    ``{"grade", "comment"}`` for per-trace lookups.
+    """
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        self.reload()
+
+    def reload(self) -> None:
+        # Take the cursor before the snapshot: a change saved in between is
+        # read again by the next poll, and applying an upsert twice is harmless.
+        self.cursor = version(self.path)
+        self.grades = load_grades(self.path)
+        self.index = {}
+        self._index(self.grades)
+
+    def poll(self) -> pl.DataFrame:
+        """Apply the changes saved since the last poll and return them."""
+        if version(self.path) < self.cursor:
+            # The log was reset (e.g. the store was deleted): start over
+            self.reload()
+            return self.grades
+        changes, self.cursor = read_changes(self.path, self.cursor)
+        if changes.height:
+            self.grades = apply_changes(self.grades, changes)
+            self._index(changes)
+        return changes
+
+    def _index(self, changes: pl.DataFrame) -> None:
+        for trace_id, grade, comment in changes.select("trace_id", "grade", "comment").iter_rows():
+            self.index[trace_id] = {"grade": grade or "", "comment": comment or ""}
+
+
 def get_progress(df: pl.DataFrame) -> dict:
     """Return grading progress counts."""
     total = df.height
@@ -0,0 +1,336 @@
+"""Judge call telemetry — tokens, cost, latency, retries and cache hits.
+
+``JudgeModel`` reports every completed call to the process-wide
+``TELEMETRY`` collector. Callers attribute calls to a (metric, trace) with
+:func:`scope`; the scope is a context variable, so it follows deepeval into
+its event loops and worker threads. At the end of a run the calls are
+written to a Parquet log, ``data/telemetry/run_id=<id>/calls.parquet``, and
+summarized into a Prometheus textfile for node_exporter's textfile collector.
+Parallel test workers (``src.parallel``) each write a shard of the log,
+``calls-<worker>.parquet``, which :func:`merge_shards` combines afterwards.
+
+    uv run python -m src.telemetry                 # summarize every logged run
+"""
+
+import argparse
+import contextvars
+import os
+import threading
+from contextlib import contextmanager
+from datetime import UTC, datetime
+from pathlib import Path
+
+import polars as pl
+
+TELEMETRY_DIR = Path(__file__).parent.parent / "data" / "telemetry"
+CALLS_FILE = "calls.parquet"
+PROM_FILE = "judge.prom"
+
+# US$ per million (prompt, completion) tokens; JUDGE_PRICE_PROMPT and
+# JUDGE_PRICE_COMPLETION override them for other models.
+PRICES = {
+    "gpt-4.1": (2.00, 8.00),
+    "gpt-4.1-mini": (0.40, 1.60),
+    "gpt-4.1-nano": (0.10, 0.40),
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4o-mini": (0.15, 0.60),
+}
+
+LATENCY_BUCKETS = [0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0]
+
+CALL_SCHEMA = {
+    "metric": pl.Utf8,
+    "trace_id": pl.Utf8,
+    "model": pl.Utf8,
+    "prompt_tokens": pl.Int64,
+    "completion_tokens": pl.Int64,
+    "cost": pl.Float64,
+    "latency": pl.Float64,
+    "retries": pl.Int64,
+    "throttled": pl.Float64,
+    "cache_hit": pl.Boolean,
+    "called_at": pl.Datetime("us", "UTC"),
+}
+
+_scope: contextvars.ContextVar[tuple[str | None, str | None]] = contextvars.ContextVar(
+    "judge_scope", default=(None, None)
+)
+
+
+@contextmanager
+def scope(metric: str | None, trace_id: str | None):
+    """Attribute judge calls made inside the block to *metric* and *trace_id*."""
+    token = _scope.set((metric, trace_id))
+    try:
+        yield
+    finally:
+        _scope.reset(token)
+
+
+@contextmanager
+def metric_scope(metric: str):
+    """Attribute judge calls made inside the block to *metric*, keeping the
+    enclosing scope's trace."""
+    with scope(metric, _scope.get()[1]):
+        yield
+
+
+def price(model: str, prompt_tokens: int, completion_tokens: int) -> float | None:
+    """Dollar cost of one call, or None for a model with no known price."""
+    rates = PRICES.get(model)
+    if "JUDGE_PRICE_PROMPT" in os.environ or "JUDGE_PRICE_COMPLETION" in os.environ:
+        rates = (
+            float(os.environ.get("JUDGE_PRICE_PROMPT", 0)),
+            float(os.environ.get("JUDGE_PRICE_COMPLETION", 0)),
+        )
+    if rates is None:
+        return None
+    return (prompt_tokens * rates[0] + completion_tokens * rates[1]) / 1_000_000
+
+
+class Telemetry:
+    """Thread-safe in-memory log of judge calls for the current run."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.calls: list[dict] = []
+
+    def record(
+        self,
+        model: str,
+        prompt_tokens: int,
+        completion_tokens: int,
+        latency: float,
+        retries: int = 0,
+        throttled: float = 0.0,
+        cache_hit: bool = False,
+    ) -> None:
+        metric, trace_id = _scope.get()
+        call = {
+            "metric": metric,
+            "trace_id": trace_id,
+            "model": model,
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            # Cached answers cost nothing
+            "cost": 0.0 if cache_hit else price(model, prompt_tokens, completion_tokens),
+            "latency": latency,
+            "retries": retries,
+            "throttled": throttled,
+            "cache_hit": cache_hit,
+            "called_at": datetime.now(UTC),
+        }
+        with self._lock:
+            self.calls.append(call)
+
+    def frame(self) -> pl.DataFrame:
+        with self._lock:
+            return pl.DataFrame(self.calls, schema=CALL_SCHEMA)
+
+    def clear(self) -> None:
+        with self._lock:
+            self.calls.clear()
+
+
+TELEMETRY = Telemetry()
+
+
+# ── Aggregation ──────────────────────────────────────────────────────────
+def summarize(calls: pl.DataFrame) -> pl.DataFrame:
+    """Per metric: calls, tokens, dollars (total and per trace), latency
+    percentiles, retries and cache hit rate. A trace's latency is the sum of
+    its calls, since GEval calls the judge several times per measurement."""
+    per_trace = calls.group_by("metric", "trace_id").agg(
+        pl.col("latency").sum().alias("trace_latency"),
+        pl.col("cost").sum().alias("trace_cost"),
+    )
+    totals = calls.group_by("metric").agg(
+        pl.len().alias("calls"),
+        pl.col("prompt_tokens").sum(),
+        pl.col("completion_tokens").sum(),
+        pl.col("cost").sum(),
+        pl.col("latency").quantile(0.5).alias("p50_latency"),
+        pl.col("latency").quantile(0.95).alias("p95_latency"),
+        pl.col("retries").sum(),
+        pl.col("cache_hit").mean().alias("cache_hit_rate"),
+    )
+    traces = per_trace.group_by("metric").agg(
+        pl.len().alias("traces"),
+        pl.col("trace_cost").mean().alias("cost_per_trace"),
+        pl.col("trace_latency").quantile(0.95).alias("p95_trace_latency"),
+    )
+    return (
+        totals.join(traces, on="metric", nulls_equal=True)
+        .select(
+            "metric", "calls", "traces", "prompt_tokens", "completion_tokens",
+            "cost", "cost_per_trace", "p50_latency", "p95_latency",
+            "p95_trace_latency", "retries", "cache_hit_rate",
+        )
+        .sort("cost", descending=True, nulls_last=True)
+    )
+
+
+def latency_histogram(calls: pl.DataFrame, buckets: list[float] = LATENCY_BUCKETS) -> pl.DataFrame:
+    """Cumulative call counts per metric and latency bucket (``le``), as in a
+    Prometheus histogram; the last bucket is ``+Inf``."""
+    edges = pl.DataFrame({"le": [*buckets, float("inf")]})
+    return (
+        calls.select("metric", "latency")
+        .join(edges, how="cross")
+        .group_by("metric", "le")
+        .agg((pl.col("latency") <= pl.col("le")).sum().alias("count"))
+        .sort("metric", "le")
+    )
+
+
+# ── Export ───────────────────────────────────────────────────────────────
+def shard_file(name: str, worker: str | None) -> str:
+    """``calls.parquet`` → ``calls-<worker>.parquet`` for a parallel worker."""
+    if worker is None:
+        return name
+    stem, _, suffix = name.partition(".")
+    return f"{stem}-{worker}.{suffix}"
+
+
+def write_calls(
+    calls: pl.DataFrame,
+    run_id: str,
+    telemetry_dir: str | Path = TELEMETRY_DIR,
+    worker: str | None = None,
+) -> Path:
+    partition = Path(telemetry_dir) / f"run_id={run_id}"
+    partition.mkdir(parents=True, exist_ok=True)
+    path = partition / shard_file(CALLS_FILE, worker)
+    calls.write_parquet(path)
+    return path
+
+
+def scan_calls(telemetry_dir: str | Path = TELEMETRY_DIR) -> pl.LazyFrame:
+    """Every logged run's calls, with ``run_id`` from the partition path."""
+    return pl.scan_parquet(Path(telemetry_dir) / "run_id=*" / CALLS_FILE, hive_partitioning=True)
+
+
+def _labels(**labels: str | None) -> str:
+    escaped = (
+        f'{k}="{str(v).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"'
+        for k, v in labels.items()
+    )
+    return "{" + ",".join(escaped) + "}"
+
+
+def prometheus_text(calls: pl.DataFrame) -> str:
+    """Counters, per-trace cost gauges and a latency histogram per metric in
+    the Prometheus text exposition format."""
+    summary = summarize(calls.with_columns(pl.col("metric").fill_null("unscoped")))
+    lines = []
+
+    def family(name: str, kind: str, help_text: str, samples) -> None:
+        lines.extend([f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"])
+        lines.extend(f"{name}{labels} {value}" for labels, value in samples)
+
+    rows = list(summary.iter_rows(named=True))
+    family("judge_calls_total", "counter", "Judge calls.",
+           ((_labels(metric=r["metric"]), r["calls"]) for r in rows))
+    family("judge_tokens_total", "counter", "Judge tokens by kind.", (
+        (_labels(metric=r["metric"], kind=kind), r[f"{kind}_tokens"])
+        for r in rows for kind in ("prompt", "completion")
+    ))
+    family("judge_cost_dollars_total", "counter", "Judge spend in US dollars.",
+           ((_labels(metric=r["metric"]), r["cost"] or 0.0) for r in rows))
+    family("judge_cost_per_trace_dollars", "gauge", "Mean judge spend per trace.",
+           ((_labels(metric=r["metric"]), r["cost_per_trace"] or 0.0) for r in rows))
+    family("judge_retries_total", "counter", "Retried judge requests.",
+           ((_labels(metric=r["metric"]), r["retries"]) for r in rows))
+    family("judge_cache_hit_ratio", "gauge", "Share of judge calls served from cache.",
+           ((_labels(metric=r["metric"]), r["cache_hit_rate"]) for r in rows))
+
+    histogram = latency_histogram(calls.with_columns(pl.col("metric").fill_null("unscoped")))
+    lines += [
+        "# HELP judge_call_latency_seconds Judge call latency, including retries.",
+        "# TYPE judge_call_latency_seconds histogram",
+    ]
+    for r in rows:
+        metric = r["metric"]
+        for le, count in histogram.filter(pl.col("metric") == metric).select("le", "count").iter_rows():
+            bound = "+Inf" if le == float("inf") else f"{le:g}"
+            lines.append(f"judge_call_latency_seconds_bucket{_labels(metric=metric, le=bound)} {count}")
+        total = calls.filter(pl.col("metric").fill_null("unscoped") == metric)["latency"].sum()
+        lines.append(f"judge_call_latency_seconds_sum{_labels(metric=metric)} {total}")
+        lines.append(f"judge_call_latency_seconds_count{_labels(metric=metric)} {r['calls']}")
+    return "\n".join(lines) + "\n"
+
+
+def write_prometheus(calls: pl.DataFrame, path: str | Path) -> Path:
+    """Write the textfile atomically so the collector never reads half of it."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(prometheus_text(calls))
+    os.replace(tmp, path)
+    return path
+
+
+def export(
+    run_id: str, telemetry_dir: str | Path = TELEMETRY_DIR, worker: str | None = None
+) -> tuple[Path, ...] | None:
+    """Write this run's calls (Parquet) and its Prometheus textfile, or None
+    if the judge was never called. A parallel *worker* writes only its shard
+    of the calls; the textfile is written by :func:`merge_shards`."""
+    calls = TELEMETRY.frame()
+    if calls.height == 0:
+        return None
+    if worker is not None:
+        return (write_calls(calls, run_id, telemetry_dir, worker),)
+    return (
+        write_calls(calls, run_id, telemetry_dir),
+        write_prometheus(calls, Path(telemetry_dir) / PROM_FILE),
+    )
+
+
+def merge_shards(run_id: str, telemetry_dir: str | Path = TELEMETRY_DIR) -> tuple[Path, Path] | None:
+    """Combine the workers' call shards for *run_id* into the run's call log
+    and Prometheus textfile, or None if no worker called the judge."""
+    shards = sorted((Path(telemetry_dir) / f"run_id={run_id}").glob(shard_file(CALLS_FILE, "*")))
+    if not shards:
+        return None
+    calls = pl.concat([pl.read_parquet(p) for p in shards])
+    paths = (
+        write_calls(calls, run_id, telemetry_dir),
+        write_prometheus(calls, Path(telemetry_dir) / PROM_FILE),
+    )
+    for shard in shards:
+        shard.unlink()
+    return paths
+
+
+def format_summary(summary: pl.DataFrame) -> str:
+    lines = []
+    for r in summary.iter_rows(named=True):
+        cost = "n/a" if r["cost"] is None else f"${r['cost']:.4f} (${r['cost_per_trace']:.4f}/trace)"
+        lines.append(
+            f"{r['metric'] or 'unscoped'}: {r['calls']} calls over {r['traces']} traces, "
+            f"{r['prompt_tokens'] + r['completion_tokens']} tokens, {cost}, "
+            f"p95 {r['p95_latency']:.2f}s/call, {r['retries']} retries, "
+            f"{r['cache_hit_rate']:.0%} cached"
+        )
+    return "\n".join(lines)
+
+
+# ── CLI ──────────────────────────────────────────────────────────────────
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--telemetry-dir", default=TELEMETRY_DIR, type=Path)
+    parser.add_argument("--run", help="only this run id")
+    args = parser.parse_args(argv)
+
+    if not any(args.telemetry_dir.glob(f"run_id=*/{CALLS_FILE}")):
+        print(f"No judge telemetry in {args.telemetry_dir}")
+        return
+    calls = scan_calls(args.telemetry_dir)
+    if args.run:
+        calls = calls.filter(pl.col("run_id") == args.run)
+    print(format_summary(summarize(calls.collect())))
+
+
+if __name__ == "__main__":
+    main()
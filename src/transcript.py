@@ -0,0 +1,41 @@
+"""Windowed transcript display — which turns to show, and how much of each.
+
+Long conversations are shown as their first and last turns with the middle
+collapsed; the grader reveals the middle a window at a time. Very long turns
+(pasted logs, documents) are clipped until expanded. Keeping this logic pure
+lets the app render only what is visible.
+"""
+
+HEAD_TURNS = 2
+TAIL_TURNS = 4
+EXPAND_STEP = 20
+MAX_TURN_CHARS = 4000
+
+
+def window(
+    n_turns: int,
+    expanded: int = 0,
+    head: int = HEAD_TURNS,
+    tail: int = TAIL_TURNS,
+) -> tuple[range, range, int]:
+    """Split turn indices into those shown before the collapsed middle, those
+    shown after it, and the number hidden. *expanded* middle turns are
+    revealed after the head, in order."""
+    before = head + max(expanded, 0)
+    if n_turns <= before + tail:
+        return range(n_turns), range(n_turns, n_turns), 0
+    return range(before), range(n_turns - tail, n_turns), n_turns - before - tail
+
+
+def clip(content: str, max_chars: int = MAX_TURN_CHARS) -> tuple[str, bool]:
+    """Shorten *content* to about *max_chars*, cutting at a line break when
+    one is near, and closing an open code fence so the markdown still
+    renders. Returns the text and whether it was clipped."""
+    if len(content) <= max_chars:
+        return content, False
+    cut = content.rfind("\n", max_chars // 2, max_chars)
+    text = content[: cut if cut > 0 else max_chars].rstrip()
+    remaining = len(content) - len(text)
+    if text.count("```") % 2:
+        text += "\n```"
+    return f"{text}\n\n*… {remaining:,} more characters*", True
@@ -0,0 +1,266 @@
+"""Trace schema validation at ingest — Polars + CSV.
+
+Every trace is checked before the app or a CLI reads it: required keys,
+their JSON types, metadata types, turn roles and content, and unique
+trace_ids. Records are flattened once into columns of JSON type names and
+the checks run as Polars expressions over those columns, so validating tens
+of thousands of traces takes a fraction of a second. Problems go to a
+per-record error report; the valid traces load as usual.
+
+    uv run python -m src.validation
+    uv run python -m src.validation --traces data/traces.json --report data/trace_errors.csv
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+import polars as pl
+
+ERRORS_PATH = Path(__file__).parent.parent / "data" / "trace_errors.csv"
+
+# Expected JSON type of each field; nested fields are dotted.
+FIELDS = {
+    "trace_id": "string",
+    "scenario": "string",
+    "metadata": "object",
+    "metadata.has_discount": "boolean",
+    "metadata.product_category": "string",
+    "turns": "array",
+}
+ROLES = ["user", "assistant"]
+
+ERROR_SCHEMA = {
+    "index": pl.Int64,
+    "trace_id": pl.Utf8,
+    "field": pl.Utf8,
+    "error": pl.Utf8,
+}
+
+_MISSING = object()
+_JSON_TYPES = {
+    str: "string",
+    bool: "boolean",
+    int: "integer",
+    float: "number",
+    dict: "object",
+    list: "array",
+    type(None): "null",
+}
+
+
+def _kind(value) -> str:
+    if value is _MISSING:
+        return "missing"
+    return _JSON_TYPES.get(type(value), type(value).__name__)
+
+
+# ── Columnar form ────────────────────────────────────────────────────────
+def record_frame(traces: list) -> pl.DataFrame:
+    """One row per record: its position, trace_id, turn count and, in
+    ``type:<field>`` columns, the JSON type of every field in ``FIELDS``
+    ("missing" when absent)."""
+    records = [t if isinstance(t, dict) else {} for t in traces]
+    metadata = [m if isinstance(m := r.get("metadata"), dict) else {} for r in records]
+    columns = {
+        "index": range(len(traces)),
+        "record": [_kind(t) for t in traces],
+        "trace_id": [tid if isinstance(tid := r.get("trace_id"), str) else None for r in records],
+        "n_turns": [len(ts) if isinstance(ts := r.get("turns"), list) else None for r in records],
+    }
+    for field in FIELDS:
+        parent, _, key = field.rpartition(".")
+        source = metadata if parent else records
+        columns[f"type:{field}"] = [_kind(r.get(key, _MISSING)) for r in source]
+    return pl.DataFrame(
+        columns,
+        schema={"index": pl.Int64, "record": pl.Utf8, "trace_id": pl.Utf8, "n_turns": pl.Int64}
+        | {f"type:{field}": pl.Utf8 for field in FIELDS},
+    )
+
+
+def turn_frame(traces: list) -> pl.DataFrame:
+    """One row per turn of every record whose ``turns`` is an array."""
+    index, position, kind, role, role_kind, content = [], [], [], [], [], []
+    for i, trace in enumerate(traces):
+        turns = trace.get("turns") if isinstance(trace, dict) else None
+        if not isinstance(turns, list):
+            continue
+        for j, turn in enumerate(turns):
+            index.append(i)
+            position.append(j)
+            kind.append(_kind(turn))
+            turn = turn if isinstance(turn, dict) else {}
+            r = turn.get("role", _MISSING)
+            role.append(r if isinstance(r, str) else None)
+            role_kind.append(_kind(r))
+            content.append(_kind(turn.get("content", _MISSING)))
+    return pl.DataFrame(
+        {
+            "index": index,
+            "turn": position,
+            "kind": kind,
+            "role": role,
+            "role_kind": role_kind,
+            "content": content,
+        },
+        schema={
+            "index": pl.Int64,
+            "turn": pl.Int64,
+            "kind": pl.Utf8,
+            "role": pl.Utf8,
+            "role_kind": pl.Utf8,
+            "content": pl.Utf8,
+        },
+    )
+
+
+# ── Checks ───────────────────────────────────────────────────────────────
+def _kind_error(kind: str, expected: str | pl.Expr) -> pl.Expr:
+    expected = expected if isinstance(expected, pl.Expr) else pl.lit(expected)
+    return (
+        pl.when(pl.col(kind) == "missing")
+        .then(pl.lit("missing"))
+        .otherwise(pl.format("expected {}, got {}", expected, kind))
+    )
+
+
+def _type_errors(records: pl.DataFrame) -> pl.DataFrame:
+    expected = pl.DataFrame(
+        {"field": list(FIELDS), "expected": list(FIELDS.values())},
+    )
+    return (
+        records.filter(pl.col("record") == "object")
+        .with_columns(has_metadata=pl.col("type:metadata") == "object")
+        .unpivot(
+            index=["index", "trace_id", "has_metadata"],
+            on=[f"type:{field}" for field in FIELDS],
+            variable_name="field",
+            value_name="kind",
+        )
+        .with_columns(pl.col("field").str.strip_prefix("type:"))
+        # A missing or malformed metadata object is reported once, not per key
+        .filter(pl.col("has_metadata") | ~pl.col("field").str.starts_with("metadata."))
+        .join(expected, on="field")
+        .filter(pl.col("kind") != pl.col("expected"))
+        .with_columns(error=_kind_error("kind", pl.col("expected")))
+        .select(ERROR_SCHEMA.keys())
+    )
+
+
+def _record_errors(records: pl.DataFrame) -> pl.DataFrame:
+    return pl.concat(
+        [
+            records.filter(pl.col("record") != "object").select(
+                "index",
+                "trace_id",
+                field=pl.lit(""),
+                error=pl.format("expected object, got {}", "record"),
+            ),
+            records.filter(pl.col("n_turns") == 0).select(
+                "index", "trace_id", field=pl.lit("turns"), error=pl.lit("no turns")
+            ),
+            records.filter(
+                pl.col("trace_id").is_not_null()
+                & ~pl.col("trace_id").is_first_distinct()
+            ).select(
+                "index", "trace_id", field=pl.lit("trace_id"), error=pl.lit("duplicate trace_id")
+            ),
+        ]
+    )
+
+
+def _turn_errors(turns: pl.DataFrame, records: pl.DataFrame) -> pl.DataFrame:
+    field = pl.format("turns[{}]", "turn")
+    errors = pl.concat(
+        [
+            turns.filter(pl.col("kind") != "object").select(
+                "index", field=field, error=pl.format("expected object, got {}", "kind")
+            ),
+            turns.filter(pl.col("kind") == "object", pl.col("role_kind") != "string").select(
+                "index",
+                field=pl.format("turns[{}].role", "turn"),
+                error=_kind_error("role_kind", "string"),
+            ),
+            turns.filter(pl.col("kind") == "object", ~pl.col("role").is_in(ROLES)).select(
+                "index",
+                field=pl.format("turns[{}].role", "turn"),
+                error=pl.format("unknown role '{}'", "role"),
+            ),
+            turns.filter(pl.col("kind") == "object", pl.col("content") != "string").select(
+                "index",
+                field=pl.format("turns[{}].content", "turn"),
+                error=_kind_error("content", "string"),
+            ),
+        ]
+    )
+    return errors.join(records.select("index", "trace_id"), on="index", how="left").select(
+        ERROR_SCHEMA.keys()
+    )
+
+
+def validate(traces: list) -> tuple[list[dict], pl.DataFrame]:
+    """Split *traces* into the valid ones and an error report with one row
+    per problem (``index`` is the record's position in *traces*)."""
+    records = record_frame(traces)
+    errors = (
+        pl.concat(
+            [
+                _record_errors(records),
+                _type_errors(records),
+                _turn_errors(turn_frame(traces), records),
+            ]
+        )
+        .cast(ERROR_SCHEMA)
+        .sort("index", maintain_order=True)
+    )
+    if errors.height == 0:
+        return list(traces), errors
+    bad = set(errors["index"].to_list())
+    return [t for i, t in enumerate(traces) if i not in bad], errors
+
+
+# ── I/O ──────────────────────────────────────────────────────────────────
+def write_report(errors: pl.DataFrame, path: str | Path = ERRORS_PATH) -> None:
+    """Write the error report, or remove a stale one when there are no errors."""
+    path = Path(path)
+    if errors.height == 0:
+        path.unlink(missing_ok=True)
+    else:
+        errors.write_csv(path)
+
+
+def load_traces(
+    path: str | Path, report_path: str | Path | None = ERRORS_PATH
+) -> tuple[list[dict], pl.DataFrame]:
+    """Read and validate a traces file; writes the error report to
+    *report_path* unless it is ``None``."""
+    traces = json.loads(Path(path).read_text())
+    if not isinstance(traces, list):
+        raise ValueError(f"{path}: expected a JSON array of traces")
+    valid, errors = validate(traces)
+    if report_path is not None:
+        write_report(errors, report_path)
+    return valid, errors
+
+
+# ── CLI ──────────────────────────────────────────────────────────────────
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--traces", default=Path("data/traces.json"), type=Path)
+    parser.add_argument("--report", default=ERRORS_PATH, type=Path)
+    args = parser.parse_args(argv)
+
+    valid, errors = load_traces(args.traces, args.report)
+    bad = errors["index"].n_unique()
+    print(f"{len(valid)} valid traces, {bad} invalid ({errors.height} errors)")
+    if errors.height:
+        with pl.Config(tbl_rows=20, fmt_str_lengths=60):
+            print(errors)
+        print(f"Report written to {args.report}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
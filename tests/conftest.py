@@ -0,0 +1,132 @@
+"""Shared pytest hooks."""
+
+import os
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+from src import telemetry
+from src.features import FEATURES, compute_features, select
+from src.runs import current_run, finish_run, new_run_id, start_run
+from src.validation import load_traces
+
+TRACES_PATH = Path(__file__).parent.parent / "data" / "traces.json"
+
+
+@pytest.fixture
+def isolated_telemetry():
+    """Keep a test's judge calls (e.g. to the fake server) out of the run's
+    judge telemetry."""
+    before = len(telemetry.TELEMETRY.calls)
+    yield telemetry.TELEMETRY
+    del telemetry.TELEMETRY.calls[before:]
+
+
+def pytest_addoption(parser):
+    parser.addoption(
+        "--record-run",
+        nargs="?",
+        const="",
+        default=None,
+        metavar="RUN_ID",
+        help="record deepeval metric results as a run in data/runs (default id: UTC timestamp)",
+    )
+    parser.addoption(
+        "--trace-where",
+        metavar="CONDITIONS",
+        help='only run trace-parametrized tests whose trace features match, e.g. "emoji_count>0"',
+    )
+    parser.addoption(
+        "--trace-sort",
+        choices=FEATURES,
+        help="run trace-parametrized tests ordered by a trace feature (largest first)",
+    )
+
+
+def pytest_configure(config):
+    # Set by src.parallel: one run split across worker processes
+    config._run_id = os.environ.get("EVAL_RUN_ID")
+    config._worker = os.environ.get("EVAL_WORKER")
+    config._judge_latencies = {}
+    run_id = config.getoption("--record-run")
+    # Only evaluation runs leave logs in data/; a plain test run writes nothing
+    config._eval_run = config._worker is not None or run_id is not None
+    if run_id is not None:
+        start_run(run_id or config._run_id, worker=config._worker)
+
+
+def pytest_collection_modifyitems(config, items):
+    """Filter and order tests parametrized by ``trace_id`` with the trace
+    features (``src.features``), computed in memory so a test run writes
+    nothing to data/; other tests are left alone."""
+    where, sort_by = config.getoption("--trace-where"), config.getoption("--trace-sort")
+    if not (where or sort_by):
+        return
+    traces, _ = load_traces(TRACES_PATH, report_path=None)
+    rank = {tid: i for i, tid in enumerate(select(compute_features(traces), where, sort_by))}
+
+    def trace_of(item):
+        callspec = getattr(item, "callspec", None)
+        return callspec.params.get("trace_id") if callspec else None
+
+    kept, deselected = [], []
+    for item in items:
+        tid = trace_of(item)
+        (deselected if tid is not None and tid not in rank else kept).append(item)
+    if deselected:
+        config.hook.pytest_deselected(items=deselected)
+    if sort_by:
+        kept.sort(key=lambda it: rank.get(trace_of(it), len(rank)))
+    items[:] = kept
+
+
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_call(item):
+    """Time tests that call the judge, for latency-balanced sharding in
+    ``src.parallel``. Tests answered entirely from the judge cache keep their
+    last uncached time."""
+    calls = telemetry.TELEMETRY.calls
+    before, started = len(calls), time.perf_counter()
+    yield
+    made = calls[before:]
+    if "isolated_telemetry" in item.fixturenames:
+        return
+    if made and not all(call["cache_hit"] for call in made):
+        item.config._judge_latencies[item.nodeid] = time.perf_counter() - started
+
+
+def pytest_sessionfinish(session):
+    config = session.config
+    config._judge_telemetry = telemetry.TELEMETRY.frame()
+    config._telemetry_files = None
+    if config._eval_run:
+        from src.parallel import save_latencies
+
+        run = current_run()
+        run_id = run.run_id if run is not None else config._run_id or new_run_id()
+        save_latencies(config._judge_latencies)
+        config._telemetry_files = telemetry.export(run_id, worker=config._worker)
+    path = finish_run()
+    if path is not None:
+        session.config._recorded_run = path
+
+
+def pytest_terminal_summary(terminalreporter):
+    """Report judge-context savings, judge spend and the recorded run."""
+    module = sys.modules.get("src.metrics")
+    builder = getattr(module, "CONTEXT_BUILDER", None)
+    if builder is not None and builder.stats["calls"]:
+        terminalreporter.write_sep("-", "judge context")
+        terminalreporter.write_line(builder.summary())
+    calls = getattr(terminalreporter.config, "_judge_telemetry", None)
+    if calls is not None and calls.height:
+        terminalreporter.write_sep("-", "judge telemetry")
+        terminalreporter.write_line(telemetry.format_summary(telemetry.summarize(calls)))
+        for path in terminalreporter.config._telemetry_files or ():
+            terminalreporter.write_line(f"→ {path}")
+    path = getattr(terminalreporter.config, "_recorded_run", None)
+    if path is not None:
+        terminalreporter.write_sep("-", "run history")
+        terminalreporter.write_line(f"Recorded run → {path}")
@@ -0,0 +1,151 @@
+"""Local fake OpenAI-compatible judge server for offline tests.
+
+Serves ``POST /chat/completions`` with a JSON verdict: a passing one by
+default, and a failing one for prompts that quote a known-bad response, so
+the deepeval suite passes offline. Latency and error injection are
+configurable so retry and rate-limit behaviour can be exercised without a
+network connection.
+"""
+
+import json
+import threading
+import time
+from collections.abc import Iterable
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+# The bad traces in data/generate_traces.py, which the suite expects to fail
+BAD_TRACES = [f"trace_{i:03d}" for i in range(11, 21)]
+
+FAILING_VERDICT = {
+    "steps": ["Read the response.", "Judge it against the criteria."],
+    "score": 1,
+    "reason": "Fake judge verdict for a known-bad response.",
+}
+
+
+def bad_responses(traces_path: str | Path) -> list[str]:
+    """Assistant replies of the bad traces, for ``FakeJudgeServer(failing=...)``."""
+    traces = json.loads(Path(traces_path).read_text())
+    return [
+        turn["content"]
+        for trace in traces if trace["trace_id"] in BAD_TRACES
+        for turn in trace["turns"] if turn["role"] == "assistant"
+    ]
+
+
+class FakeJudgeServer:
+    """Run a fake judge on a background thread.
+
+    Args:
+        latency: Seconds to sleep before every response.
+        errors: Status codes to return, in order, before succeeding
+            (e.g. ``[429, 503]``).
+        verdict: JSON object returned as the completion content.
+        failing: Texts that get ``FAILING_VERDICT`` instead when a prompt
+            contains any of them (e.g. ``bad_responses(TRACES_PATH)``).
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        errors: list[int] | None = None,
+        verdict: dict | None = None,
+        failing: Iterable[str] = (),
+    ):
+        self.latency = latency
+        self.errors = list(errors or [])
+        self.verdict = verdict or {
+            "steps": ["Read the response.", "Judge it against the criteria."],
+            "score": 8,
+            "reason": "Fake judge verdict.",
+        }
+        self.failing = tuple(failing)
+        self.requests = 0
+        self.connections = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def __enter__(self) -> "FakeJudgeServer":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _next_error(self) -> int | None:
+        with self._lock:
+            self.requests += 1
+            return self.errors.pop(0) if self.errors else None
+
+    def verdict_for(self, prompt: str) -> dict:
+        if any(text in prompt for text in self.failing):
+            return FAILING_VERDICT
+        return self.verdict
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive
+
+            def setup(self):
+                super().setup()
+                with fake._lock:
+                    fake.connections += 1
+
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                request = json.loads(self.rfile.read(length) or b"{}")
+                time.sleep(fake.latency)
+
+                status = fake._next_error()
+                if status is not None:
+                    body = {"error": {"message": "injected", "type": "fake"}}
+                    self._send(status, body, {"Retry-After": "0"})
+                    return
+
+                prompt = request["messages"][-1]["content"]
+                prompt_tokens = len(str(prompt).split())
+                self._send(200, {
+                    "id": "chatcmpl-fake",
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": request.get("model", "fake"),
+                    "choices": [{
+                        "index": 0,
+                        "finish_reason": "stop",
+                        "message": {
+                            "role": "assistant",
+                            "content": json.dumps(fake.verdict_for(str(prompt))),
+                        },
+                    }],
+                    "usage": {
+                        "prompt_tokens": prompt_tokens,
+                        "completion_tokens": 20,
+                        "total_tokens": prompt_tokens + 20,
+                    },
+                })
+
+            def _send(self, status, body, headers=None):
+                payload = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(payload)
+
+        return Handler
@@ -0,0 +1,104 @@
+"""Tests for judge-versus-human agreement analytics."""
+
+import tempfile
+from pathlib import Path
+
+import polars as pl
+import pytest
+
+from src.agreement import (
+    best_thresholds,
+    collect,
+    confusion,
+    joined,
+    over_time,
+    scan_grades,
+    scan_judge_scores,
+    threshold_sweep,
+)
+from src.grading_queue import JUDGE_SCORES_SCHEMA
+from src.state import SCHEMA
+
+
+def write_inputs(tmp: Path) -> tuple[Path, Path]:
+    grades = pl.DataFrame(
+        {
+            "trace_id": ["t1", "t2", "t3", "t4", "t5", "t6"],
+            "grade": ["pass", "pass", "fail", "fail", "skip", "pass"],
+            "comment": [""] * 6,
+            "graded_at": [
+                "2026-10-01T09:00:00+00:00",
+                "2026-10-01T10:00:00+00:00",
+                "2026-10-09T09:00:00+00:00",
+                "2026-10-09T10:00:00+00:00",
+                "2026-10-09T11:00:00+00:00",
+                "2026-10-01T09:00:00+00:00",
+            ],
+            # t6 is a near-duplicate of t1 and only has its copied grade
+            "propagated_from": [None] * 5 + ["t1"],
+        },
+        schema=SCHEMA,
+    )
+    scores = pl.DataFrame(
+        {
+            "trace_id": ["t1", "t2", "t3", "t4", "t5", "t6"],
+            "metric": ["Kindness"] * 6,
+            "score": [0.9, 0.4, 0.6, 0.1, 0.9, 0.9],
+            "threshold": [0.5] * 6,
+        },
+        schema=JUDGE_SCORES_SCHEMA,
+    )
+    grades.write_csv(tmp / "grades.csv")
+    scores.write_csv(tmp / "scores.csv")
+    return tmp / "grades.csv", tmp / "scores.csv"
+
+
+def make_pairs(tmp: Path) -> pl.LazyFrame:
+    grades_path, scores_path = write_inputs(tmp)
+    facets = pl.LazyFrame({"trace_id": ["t1", "t2", "t3", "t4"], "scenario": ["a", "b", "a", "b"]})
+    return joined(scan_grades(grades_path), scan_judge_scores(scores_path), facets)
+
+
+def test_confusion_and_kappa():
+    """Only traces with both a hand-given pass/fail grade and a score are
+    compared."""
+    with tempfile.TemporaryDirectory() as tmp:
+        row = collect(confusion(make_pairs(Path(tmp)))).row(0, named=True)
+
+    assert (row["tp"], row["fp"], row["fn"], row["tn"]) == (1, 1, 1, 1)
+    assert row["n"] == 4
+    assert row["precision"] == row["recall"] == row["accuracy"] == 0.5
+    assert row["kappa"] == pytest.approx(0.0)
+
+
+def test_confusion_by_facet():
+    with tempfile.TemporaryDirectory() as tmp:
+        table = collect(confusion(make_pairs(Path(tmp)), by=["scenario"]))
+
+    # a: t1 both pass, t3 judge pass / human fail; b: t2 judge fail / human pass, t4 both fail
+    assert table.select("scenario", "tp", "fp", "fn", "tn").rows() == [
+        ("a", 1, 1, 0, 0),
+        ("b", 0, 0, 1, 1),
+    ]
+
+
+def test_over_time():
+    with tempfile.TemporaryDirectory() as tmp:
+        timeline = collect(over_time(make_pairs(Path(tmp)), every="1w"))
+    assert timeline["n"].to_list() == [2, 2]
+
+
+def test_threshold_sweep_finds_best_threshold():
+    with tempfile.TemporaryDirectory() as tmp:
+        sweep = collect(threshold_sweep(make_pairs(Path(tmp)), thresholds=[0.3, 0.5, 0.7]))
+
+    assert sweep["threshold"].to_list() == [0.3, 0.5, 0.7]
+    # At 0.3 the judge passes t2 (0.4) and fails t4 (0.1): full agreement
+    # except t3 (0.6, human fail) → kappa 0.5; at 0.7 only t1 passes → 0.5.
+    best = best_thresholds(sweep)
+    assert best.row(0) == ("Kindness", 0.3, pytest.approx(0.5))
+
+
+def test_missing_files_yield_empty_tables():
+    pairs = joined(scan_grades("/nonexistent/grades.csv"), scan_judge_scores("/nonexistent.csv"))
+    assert collect(confusion(pairs)).height == 0
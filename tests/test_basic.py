@@ -2,11 +2,22 @@
 
 import json
 import tempfile
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 import pytest
 
-from src.state import get_progress, load_grades, save_grade
+from src.state import (
+    SCHEMA,
+    GradeFeed,
+    changes_path,
+    get_progress,
+    load_grades,
+    read_changes,
+    save_grade,
+    save_grades,
+    version,
+)
 
 
 def test_load_empty_grades():
@@ -34,6 +45,7 @@ def test_save_grade():
         assert df["comment"][0] == "Good conversation"
     finally:
         Path(tmp_path).unlink(missing_ok=True)
+        changes_path(tmp_path).unlink(missing_ok=True)
 
 
 def test_upsert_grade():
@@ -53,6 +65,31 @@ def test_upsert_grade():
         assert df["comment"][0] == "Changed mind"
     finally:
         Path(tmp_path).unlink(missing_ok=True)
+        changes_path(tmp_path).unlink(missing_ok=True)
+
+
+def test_propagated_grades_are_tagged():
+    """Grades copied to near-duplicates name the trace they came from."""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "grades.csv"
+        save_grades(path, ["trace_001", "dup_a", "dup_b"], "pass", propagated_from="trace_001")
+        grades = load_grades(path).sort("trace_id")
+        assert grades["propagated_from"].to_list() == ["trace_001", "trace_001", None]
+        changes, _ = read_changes(path)
+        assert changes["propagated_from"].null_count() == 1
+
+
+def test_grades_without_newer_columns_load():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "grades.csv"
+        path.write_text(
+            "trace_id,grade,comment,graded_at\n"
+            "trace_001,pass,,2026-01-01T00:00:00+00:00\n"
+        )
+        grades = load_grades(path)
+        assert grades.columns == list(SCHEMA)
+        assert grades["propagated_from"].to_list() == [None]
+        assert save_grade(path, "trace_002", "fail").height == 2
 
 
 def test_progress_calculation():
@@ -74,6 +111,53 @@ def test_progress_calculation():
         assert progress["ungraded"] == 0
     finally:
         Path(tmp_path).unlink(missing_ok=True)
+        changes_path(tmp_path).unlink(missing_ok=True)
+
+
+def test_change_feed_reads_only_new_changes():
+    """Sessions follow the change log from a cursor instead of reloading."""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "grades.csv"
+        save_grade(path, "trace_001", "pass", "Good, kind\nand accurate")
+        other = GradeFeed(path)
+        assert other.index["trace_001"]["comment"] == "Good, kind\nand accurate"
+        assert other.poll().height == 0
+
+        before = version(path)
+        save_grades(path, ["trace_002", "trace_003"], "fail")
+        save_grade(path, "trace_001", "fail")
+        assert version(path) > before
+
+        changes = other.poll()
+        assert changes["trace_id"].to_list() == ["trace_002", "trace_003", "trace_001"]
+        assert other.cursor == version(path)
+        assert other.index["trace_001"] == {"grade": "fail", "comment": ""}
+        assert other.grades.sort("trace_id").equals(load_grades(path).sort("trace_id"))
+
+        # Comments spanning several lines arrive whole
+        save_grade(path, "trace_002", "pass", 'Kind, but "quoted"\nover\ntwo lines')
+        assert other.poll()["comment"].to_list() == ['Kind, but "quoted"\nover\ntwo lines']
+        assert other.index["trace_002"]["comment"].count("\n") == 2
+
+        # A partly written line waits for the next read
+        with open(changes_path(path), "ab") as log:
+            log.write(b'{"trace_id":"trace_004","grade":"pass"')
+        changes, cursor = read_changes(path, other.cursor)
+        assert changes.height == 0 and cursor == other.cursor
+
+
+def test_concurrent_saves_keep_every_grade():
+    """Saves from many threads neither lose grades nor tear the CSV."""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "grades.csv"
+        trace_ids = [f"trace_{i:03d}" for i in range(40)]
+        with ThreadPoolExecutor(8) as pool:
+            list(pool.map(lambda tid: save_grade(path, tid, "pass", "a\nb"), trace_ids))
+
+        assert sorted(load_grades(path)["trace_id"]) == trace_ids
+        changes, _ = read_changes(path)
+        assert sorted(changes["trace_id"]) == trace_ids
+        assert [p.name for p in Path(tmp).iterdir() if p.suffix == ".tmp"] == []
 
 
 def test_load_traces_from_json():
@@ -129,3 +213,4 @@ def test_grade_types(grade, expected):
         assert progress["failed"] == expected["failed"]
     finally:
         Path(tmp_path).unlink(missing_ok=True)
+        changes_path(tmp_path).unlink(missing_ok=True)
@@ -0,0 +1,103 @@
+"""Tests for the deterministic claim verifier."""
+
+import json
+from pathlib import Path
+
+import polars as pl
+
+from src.claims import (
+    DISCOUNT_CLAIMS,
+    PRODUCT_CLAIMS,
+    load_catalog,
+    needs_judge,
+    price_index,
+    trace_verdicts,
+    verify_claims,
+)
+
+TRACES_PATH = Path(__file__).parent.parent / "data" / "traces.json"
+TRACES = json.loads(TRACES_PATH.read_text())
+CATALOG = load_catalog()
+
+
+def make_trace(trace_id: str, reply: str, has_discount: bool = False, question: str = "Hi") -> dict:
+    return {
+        "trace_id": trace_id,
+        "turns": [
+            {"role": "user", "content": question},
+            {"role": "assistant", "content": reply},
+        ],
+        "metadata": {"has_discount": has_discount},
+    }
+
+
+def status_of(trace: dict) -> str:
+    return trace_verdicts([trace], CATALOG)["status"][0]
+
+
+def test_sample_traces():
+    verdicts = dict(trace_verdicts(TRACES, CATALOG).select("trace_id", "status").iter_rows())
+    assert verdicts["trace_001"] == "verified"   # 300 PPI, 170 grams, 6 weeks
+    assert verdicts["trace_002"] == "verified"   # $95.99 with 20% off
+    assert verdicts["trace_012"] == "violation"  # withholds an available discount
+    assert verdicts["trace_013"] == "no_claims"  # hallucinations are left to the judge
+
+
+def test_discounted_price_needs_discount():
+    reply = "The PaperLight Classic is $95.99 right now."
+    assert status_of(make_trace("t", reply, has_discount=True)) == "verified"
+    assert status_of(make_trace("t", reply, has_discount=False)) == "violation"
+
+
+def test_discount_rate_must_be_in_catalog():
+    assert status_of(make_trace("t", "The Pro is 20% off today!", has_discount=True)) == "verified"
+    assert status_of(make_trace("t", "The Pro is 35% off today!", has_discount=True)) == "violation"
+    assert status_of(make_trace("t", "The Pro is 20% off today!")) == "violation"
+
+
+def test_specs_are_attributed_to_nearest_product():
+    reply = (
+        "The Classic has 167 PPI and the Pro has 300 PPI. "
+        "It weighs 170 grams."  # no product in sentence → the Pro from before
+    )
+    claims = verify_claims([make_trace("t", reply)], CATALOG)
+    assert claims.select("text", "product", "verdict").rows() == [
+        ("167 PPI", "Classic", "ok"),
+        ("300 PPI", "Pro", "ok"),
+        ("170 grams", "Pro", "ok"),
+    ]
+    assert status_of(make_trace("t", "The PaperLight Pro weighs 250 grams.")) == "violation"
+
+
+def test_unknown_values_go_to_the_judge():
+    traces = [
+        make_trace("a", "That saves you $100 compared to the Max."),
+        make_trace("b", "The Mini has 6-week battery life."),  # not in catalog
+        make_trace("c", "Happy to help!"),
+        make_trace("d", "The Max is $259.99."),
+    ]
+    assert needs_judge(trace_verdicts(traces, CATALOG)) == ["a", "b", "c"]
+
+
+def test_verdicts_per_claim_type():
+    """A wrong discount doesn't make product claims fail, and vice versa."""
+    trace = make_trace("t", "The Max is $259.99, and today it's 90% off.")
+    product = trace_verdicts([trace], CATALOG, claim_types=PRODUCT_CLAIMS)
+    discount = trace_verdicts([trace], CATALOG, claim_types=DISCOUNT_CLAIMS)
+    assert product["status"].to_list() == ["verified"]
+    assert discount["status"].to_list() == ["violation"]
+
+
+def test_price_index_includes_discounted_prices():
+    prices = dict(price_index(CATALOG).select("value", "needs_discount").iter_rows())
+    assert prices[119.99] is False
+    assert prices[95.99] is True   # 20% off the Classic
+    assert prices[89.99] is True   # education discount
+    assert prices[5.99] is False   # express shipping
+
+
+def test_verifies_large_dataset_in_one_pass():
+    traces = [{**t, "trace_id": f"{t['trace_id']}_{i:04d}"} for i in range(500) for t in TRACES]
+    verdicts = trace_verdicts(traces, CATALOG)
+    assert verdicts.height == 10_000
+    assert verdicts.filter(pl.col("status") == "violation").height == 500
@@ -0,0 +1,61 @@
+"""Tests for the token-budgeted judge context builder."""
+
+import json
+from pathlib import Path
+
+from src.context import ContextBuilder, count_tokens
+
+TRACES_PATH = Path(__file__).parent.parent / "data" / "traces.json"
+TRACES = json.loads(TRACES_PATH.read_text())
+
+
+def make_long_trace(n_repeats: int = 50) -> dict:
+    trace = dict(TRACES[0])
+    trace["turns"] = TRACES[0]["turns"] * n_repeats
+    return trace
+
+
+def test_short_trace_is_unchanged():
+    """Traces under budget render the full conversation verbatim."""
+    builder = ContextBuilder(budget=2000)
+    context = builder.build(TRACES[0])
+
+    assert context.startswith("Scenario: Product recommendation\n")
+    assert "Discount available: No" in context
+    for turn in TRACES[0]["turns"]:
+        assert turn["content"] in context
+    assert builder.stats["tokens_saved"] == 0
+
+
+def test_long_trace_fits_budget():
+    """Long traces keep head and tail turns and stay within budget."""
+    trace = make_long_trace()
+    builder = ContextBuilder(budget=500, head_turns=1, tail_turns=2)
+    context = builder.build(trace)
+
+    assert count_tokens(context) <= 500
+    assert trace["turns"][0]["content"] in context
+    assert trace["turns"][-1]["content"] in context
+    assert "middle turns" in context
+    assert builder.stats["tokens_saved"] > 0
+
+
+def test_tiny_budget_is_respected():
+    """Even budgets smaller than the tail turns are enforced."""
+    builder = ContextBuilder(budget=60)
+    context = builder.build(make_long_trace())
+    assert count_tokens(context) <= 60
+
+
+def test_memoized_per_trace_and_budget():
+    """Repeated builds hit the cache; a different budget does not."""
+    trace = make_long_trace()
+    builder = ContextBuilder(budget=500)
+
+    first = builder.build(trace)
+    assert builder.build(trace) == first
+    assert builder.stats["cache_hits"] == 1
+
+    builder.build(trace, budget=300)
+    assert builder.stats["cache_hits"] == 1
+    assert builder.stats["calls"] == 3
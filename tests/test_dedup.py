@@ -0,0 +1,90 @@
+"""Tests for MinHash/LSH near-duplicate detection."""
+
+import json
+from pathlib import Path
+
+import polars as pl
+
+from src.dedup import (
+    cluster_members,
+    cluster_traces,
+    dedup_judge,
+    lsh_params,
+    next_to_grade,
+    propagate,
+    representatives,
+)
+
+TRACES_PATH = Path(__file__).parent.parent / "data" / "traces.json"
+TRACES = json.loads(TRACES_PATH.read_text())
+
+
+def with_greeting(trace: dict, trace_id: str, greeting: str) -> dict:
+    turns = [dict(t) for t in trace["turns"]]
+    turns[0]["content"] = f"{greeting} {turns[0]['content']}"
+    return {**trace, "trace_id": trace_id, "turns": turns}
+
+
+def test_sample_traces_are_distinct():
+    clusters = cluster_traces(TRACES)
+    assert clusters.height == 20
+    assert clusters["cluster_id"].n_unique() == 20
+
+
+def test_greeting_variants_cluster_together():
+    """The same FAQ with different greetings is one cluster."""
+    traces = [
+        *TRACES,
+        with_greeting(TRACES[1], "dup_a", "Hello there!"),
+        with_greeting(TRACES[1], "dup_b", "Good morning 👋"),
+    ]
+    clusters = cluster_traces(traces)
+
+    assert clusters["cluster_id"].n_unique() == 20
+    assert sorted(cluster_members(clusters, "dup_b")) == ["dup_a", "dup_b", "trace_002"]
+    # The first trace in file order represents the cluster
+    assert "trace_002" in representatives(clusters)
+    assert "dup_a" not in representatives(clusters)
+
+
+def test_lsh_params_favour_recall():
+    bands, rows = lsh_params(0.8, num_perm=128)
+    assert bands * rows <= 128
+    assert (1 / bands) ** (1 / rows) <= 0.8
+
+
+def test_propagate_grades_to_members():
+    traces = [*TRACES[:3], with_greeting(TRACES[0], "dup", "Hey,")]
+    clusters = cluster_traces(traces)
+    grades = pl.DataFrame({"trace_id": ["trace_001"], "grade": ["pass"]})
+
+    propagated = propagate(grades, clusters)
+    assert propagated.sort("trace_id").rows() == [
+        ("dup", "pass"),
+        ("trace_001", "pass"),
+    ]
+
+
+def test_next_to_grade_moves_past_graded_members():
+    traces = [*TRACES[:2], with_greeting(TRACES[0], "dup", "Hey,")]
+    clusters = cluster_traces(traces)
+
+    assert next_to_grade(clusters, []) == ["trace_001", "trace_002"]
+    assert next_to_grade(clusters, ["trace_001"]) == ["dup", "trace_002"]
+    # Once the whole cluster is graded it is shown by its representative
+    assert next_to_grade(clusters, ["trace_001", "dup"]) == ["trace_001", "trace_002"]
+
+
+def test_dedup_judge_calls_once_per_cluster():
+    traces = [TRACES[0], with_greeting(TRACES[0], "dup", "Hi!"), TRACES[1]]
+    clusters = cluster_traces(traces)
+    calls = []
+
+    def judge(trace: dict) -> dict:
+        calls.append(trace["trace_id"])
+        return {"Kindness": True}
+
+    judge_once = dedup_judge(judge, clusters)
+    for trace in traces:
+        assert judge_once(trace) == {"Kindness": True}
+    assert calls == ["trace_001", "trace_002"]
@@ -4,95 +4,46 @@ import json
 from pathlib import Path
 
 import pytest
-from deepeval import assert_test
-from deepeval.metrics import GEval
-from deepeval.test_case import LLMTestCase, LLMTestCaseParams
+from deepeval.test_case import LLMTestCase
+
+from src.claims import DISCOUNT_CLAIMS, PRODUCT_CLAIMS, trace_verdicts
+from src.metrics import (
+    discount_accuracy_metric,
+    kindness_metric,
+    product_accuracy_metric,
+    professionalism_metric,
+    trace_to_conversation,
+)
+from src.runs import assert_test, current_run
 
 # Load traces once
 TRACES_PATH = Path(__file__).parent.parent / "data" / "traces.json"
 TRACES = json.loads(TRACES_PATH.read_text())
 
+# Numeric claims checked against the catalog for every trace up front, per
+# metric: product accuracy covers prices and specs, discount accuracy
+# discount rates and withheld discounts
+CLAIM_VERDICTS = {
+    metric: {row["trace_id"]: row for row in trace_verdicts(TRACES, claim_types=types).iter_rows(named=True)}
+    for metric, types in (
+        (product_accuracy_metric.name, PRODUCT_CLAIMS),
+        (discount_accuracy_metric.name, DISCOUNT_CLAIMS),
+    )
+}
 
-def trace_to_conversation(trace: dict) -> tuple[str, str, str]:
-    """Convert a trace to input/actual_output/context format for GEval.
-    
-    Returns:
-        tuple: (input, actual_output, context)
-            - input: The last user message
-            - actual_output: The last assistant message
-            - context: Full conversation history
-    """
-    turns = trace["turns"]
-    
-    # Get last user and assistant messages
-    user_messages = [t["content"] for t in turns if t["role"] == "user"]
-    assistant_messages = [t["content"] for t in turns if t["role"] == "assistant"]
-    
-    input_text = user_messages[-1] if user_messages else ""
-    output_text = assistant_messages[-1] if assistant_messages else ""
-    
-    # Build conversation context
-    conversation = "\n".join([
-        f"{t['role'].upper()}: {t['content']}" 
-        for t in turns
-    ])
-    
-    # Add metadata context
-    metadata = trace.get("metadata", {})
-    context_lines = [
-        f"Scenario: {trace['scenario']}",
-        f"Product: {metadata.get('product_category', 'e-ink reader')}",
-        f"Discount available: {'Yes' if metadata.get('has_discount') else 'No'}",
-        "",
-        "Full conversation:",
-        conversation,
-    ]
-    
-    return input_text, output_text, "\n".join(context_lines)
-
-
-# Define GEval metrics
-kindness_metric = GEval(
-    name="Kindness",
-    criteria="Determine if the assistant's response is kind, polite, and empathetic towards the customer. A kind response shows understanding, uses friendly language, and makes the customer feel valued.",
-    evaluation_params=[
-        LLMTestCaseParams.INPUT,
-        LLMTestCaseParams.ACTUAL_OUTPUT,
-    ],
-    threshold=0.5,
-)
-
-product_accuracy_metric = GEval(
-    name="Product Accuracy",
-    criteria="Determine if the assistant provides accurate product information. Check if the features, prices, and specifications mentioned are realistic and internally consistent. Penalize hallucinated features or impossible claims.",
-    evaluation_params=[
-        LLMTestCaseParams.INPUT,
-        LLMTestCaseParams.ACTUAL_OUTPUT,
-        LLMTestCaseParams.CONTEXT,
-    ],
-    threshold=0.5,
-)
-
-professionalism_metric = GEval(
-    name="Professionalism",
-    criteria="Determine if the assistant maintains professional standards. This includes avoiding rudeness, dismissiveness, pressure tactics, and misinformation about competitors. Professional responses respect customer autonomy and provide honest information.",
-    evaluation_params=[
-        LLMTestCaseParams.INPUT,
-        LLMTestCaseParams.ACTUAL_OUTPUT,
-    ],
-    threshold=0.5,
-)
 
-discount_accuracy_metric = GEval(
-    name="Discount Accuracy",
-    criteria="Determine if the assistant correctly handles discount information. If a discount is available (mentioned in context), the assistant should mention it when relevant. If no discount is available, the assistant should not claim there is one.",
-    evaluation_params=[
-        LLMTestCaseParams.INPUT,
-        LLMTestCaseParams.ACTUAL_OUTPUT,
-        LLMTestCaseParams.CONTEXT,
-    ],
-    threshold=0.5,
-)
+def assert_claims(trace, test_case, metric):
+    """Fail a trace whose claims for *metric* contradict the catalog without
+    an LLM call. Everything else goes to the judge: matching numbers don't
+    rule out problems the catalog doesn't cover, like invented features."""
+    verdict = CLAIM_VERDICTS[metric.name][trace["trace_id"]]
+    if verdict["status"] != "violation":
+        assert_test(test_case, [metric])
+        return
+    reason = "; ".join(verdict["messages"])
+    if current_run() is not None:
+        current_run().record(trace["trace_id"], metric.name, 0.0, False, reason, "catalog")
+    raise AssertionError(reason)
 
 
 # Test good traces (should pass)
@@ -110,6 +61,7 @@ def test_good_traces_kindness(trace_id):
         input=input_text,
         actual_output=output_text,
         context=[context],
+        name=trace["trace_id"],
     )
     
     assert_test(test_case, [kindness_metric])
@@ -129,9 +81,10 @@ def test_good_traces_product_accuracy(trace_id):
         input=input_text,
         actual_output=output_text,
         context=[context],
+        name=trace["trace_id"],
     )
     
-    assert_test(test_case, [product_accuracy_metric])
+    assert_claims(trace, test_case, product_accuracy_metric)
 
 
 @pytest.mark.parametrize("trace_id", [
@@ -148,6 +101,7 @@ def test_good_traces_professionalism(trace_id):
         input=input_text,
         actual_output=output_text,
         context=[context],
+        name=trace["trace_id"],
     )
     
     assert_test(test_case, [professionalism_metric])
@@ -168,6 +122,7 @@ def test_bad_traces_kindness_fails(trace_id):
         input=input_text,
         actual_output=output_text,
         context=[context],
+        name=trace["trace_id"],
     )
     
     # These should fail - expect AssertionError
@@ -188,11 +143,12 @@ def test_bad_traces_product_accuracy_fails(trace_id):
         input=input_text,
         actual_output=output_text,
         context=[context],
+        name=trace["trace_id"],
     )
     
     # These should fail - expect AssertionError
     with pytest.raises(AssertionError):
-        assert_test(test_case, [product_accuracy_metric])
+        assert_claims(trace, test_case, product_accuracy_metric)
 
 
 @pytest.mark.parametrize("trace_id", [
@@ -208,6 +164,7 @@ def test_bad_traces_professionalism_fails(trace_id):
         input=input_text,
         actual_output=output_text,
         context=[context],
+        name=trace["trace_id"],
     )
     
     # These should fail - expect AssertionError
@@ -224,9 +181,10 @@ def test_discount_accuracy_good():
         input=input_text,
         actual_output=output_text,
         context=[context],
+        name=trace["trace_id"],
     )
     
-    assert_test(test_case, [discount_accuracy_metric])
+    assert_claims(trace, test_case, discount_accuracy_metric)
 
 
 def test_discount_accuracy_bad():
@@ -238,11 +196,12 @@ def test_discount_accuracy_bad():
         input=input_text,
         actual_output=output_text,
         context=[context],
+        name=trace["trace_id"],
     )
     
     # Should fail - expect AssertionError
     with pytest.raises(AssertionError):
-        assert_test(test_case, [discount_accuracy_metric])
+        assert_claims(trace, test_case, discount_accuracy_metric)
 
 
 # Multi-metric test
@@ -255,6 +214,7 @@ def test_comprehensive_evaluation_good_trace():
         input=input_text,
         actual_output=output_text,
         context=[context],
+        name=trace["trace_id"],
     )
     
     # Should pass all metrics
@@ -275,6 +235,7 @@ def test_comprehensive_evaluation_bad_trace():
         input=input_text,
         actual_output=output_text,
         context=[context],
+        name=trace["trace_id"],
     )
     
     # Should fail - expect AssertionError
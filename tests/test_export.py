@@ -0,0 +1,142 @@
+"""Tests for the streaming trace/grade export."""
+
+import json
+import tempfile
+from pathlib import Path
+
+import polars as pl
+
+from src.export import export, iter_traces, last_export, load_grade_store
+from src.state import SCHEMA
+
+TRACES = Path(__file__).parent.parent / "data" / "traces.json"
+
+
+def write_grades(path: Path, rows: list[tuple[str, str, str]]) -> Path:
+    pl.DataFrame(
+        {
+            "trace_id": [r[0] for r in rows],
+            "grade": [r[1] for r in rows],
+            "comment": [""] * len(rows),
+            "graded_at": [r[2] for r in rows],
+            "propagated_from": [None] * len(rows),
+        },
+        schema=SCHEMA,
+    ).write_csv(path)
+    return path
+
+
+def test_iter_traces_streams_across_chunks():
+    """Small chunks split traces mid-object; every trace still comes out whole."""
+    expected = json.loads(TRACES.read_text())
+    streamed = list(iter_traces(TRACES, chunk_size=64))
+    assert streamed == expected
+
+
+def test_iter_traces_jsonl():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "traces.jsonl"
+        path.write_text('{"trace_id": "a"}\n\n{"trace_id": "b"}\n')
+        assert [t["trace_id"] for t in iter_traces(path)] == ["a", "b"]
+
+
+def test_export_joins_all_traces():
+    with tempfile.TemporaryDirectory() as tmp:
+        grades = write_grades(
+            Path(tmp) / "grades.csv", [("trace_001", "pass", "2026-10-01T09:00:00+00:00")]
+        )
+        stats = export(TRACES, grades, Path(tmp) / "out", batch_size=7)
+        out = pl.read_parquet(Path(tmp) / "out" / "*.parquet")
+
+    assert stats["traces"] == stats["rows"] == 20
+    assert stats["files"] == 3
+    assert out.filter(pl.col("grade").is_not_null())["trace_id"].to_list() == ["trace_001"]
+    assert out["turns"].list.len().min() > 0
+
+
+def test_export_filters():
+    with tempfile.TemporaryDirectory() as tmp:
+        grades = write_grades(
+            Path(tmp) / "grades.csv",
+            [
+                ("trace_001", "pass", "2026-10-01T09:00:00+00:00"),
+                ("trace_002", "fail", "2026-10-01T10:00:00+00:00"),
+                ("trace_003", "skip", "2026-10-01T11:00:00+00:00"),
+                ("trace_013", "fail", "2026-10-01T12:00:00+00:00"),
+            ],
+        )
+        graded = export(TRACES, grades, Path(tmp) / "graded", graded_only=True)
+        failed = export(TRACES, grades, Path(tmp) / "failed", fmt="jsonl", fail_only=True)
+        scenario = export(
+            TRACES,
+            grades,
+            Path(tmp) / "scenario",
+            fail_only=True,
+            scenarios=["Hallucinated product specs"],
+        )
+        failed_ids = pl.read_ndjson(Path(tmp) / "failed" / "*.jsonl")["trace_id"].sort()
+
+    assert graded["rows"] == 3
+    assert failed_ids.to_list() == ["trace_002", "trace_013"]
+    assert scenario["rows"] == 1
+
+
+def test_since_last_exports_only_new_grades():
+    with tempfile.TemporaryDirectory() as tmp:
+        out = Path(tmp) / "out"
+        grades = Path(tmp) / "grades.csv"
+        first = [
+            ("trace_001", "pass", "2026-10-01T09:00:00+00:00"),
+            ("trace_002", "fail", "2026-10-01T10:00:00+00:00"),
+        ]
+        write_grades(grades, first)
+        assert export(TRACES, grades, out, since_last=True)["rows"] == 2
+        assert last_export(out).isoformat() == "2026-10-01T10:00:00+00:00"
+
+        # Nothing new: nothing written
+        assert export(TRACES, grades, out, since_last=True)["files"] == 0
+
+        write_grades(grades, [*first, ("trace_005", "pass", "2026-10-02T09:00:00+00:00")])
+        assert export(TRACES, grades, out, since_last=True)["rows"] == 1
+        total = pl.read_parquet(out / "*.parquet")
+
+    assert sorted(total["trace_id"]) == ["trace_001", "trace_002", "trace_005"]
+
+
+def test_partition_by_grade():
+    with tempfile.TemporaryDirectory() as tmp:
+        grades = write_grades(
+            Path(tmp) / "grades.csv",
+            [
+                ("trace_001", "pass", "2026-10-01T09:00:00+00:00"),
+                ("trace_002", "fail", "2026-10-01T10:00:00+00:00"),
+            ],
+        )
+        out = Path(tmp) / "out"
+        export(TRACES, grades, out, graded_only=True, partition_by="grade")
+        partitions = sorted(p.name for p in out.iterdir())
+        fails = pl.read_parquet(out / "grade=fail" / "*.parquet")
+
+    assert partitions == ["grade=fail", "grade=pass"]
+    assert fails["trace_id"].to_list() == ["trace_002"]
+
+
+def test_grade_store_is_scanned_lazily():
+    with tempfile.TemporaryDirectory() as tmp:
+        grades = write_grades(
+            Path(tmp) / "grades.csv",
+            [
+                ("trace_001", "pass", "2026-10-01T09:00:00+00:00"),
+                ("trace_002", "fail", "2026-10-01T10:00:00+00:00"),
+            ],
+        )
+        store = load_grade_store(grades, fail_only=True)
+        assert isinstance(store, pl.LazyFrame)
+        assert store.collect()["trace_id"].to_list() == ["trace_002"]
+
+        out = Path(tmp) / "out"
+        export(TRACES, grades, out, fmt="jsonl", batch_size=7, partition_by="has_discount")
+        rows = [json.loads(line) for f in out.glob("*/*.jsonl") for line in f.open()]
+
+    assert len(rows) == 20
+    assert sorted(r["trace_id"] for r in rows if r["grade"]) == ["trace_001", "trace_002"]
@@ -0,0 +1,85 @@
+"""Tests for the per-trace feature table."""
+
+import json
+import tempfile
+from pathlib import Path
+
+import polars as pl
+import pytest
+
+from src.features import compute_features, parse_where, select, update_features
+
+TRACES_PATH = Path(__file__).parent.parent / "data" / "traces.json"
+TRACES = json.loads(TRACES_PATH.read_text())
+
+
+def make_trace(trace_id: str, *turns: tuple[str, str]) -> dict:
+    return {
+        "trace_id": trace_id,
+        "scenario": "test",
+        "metadata": {"has_discount": False, "product_category": "e-ink reader"},
+        "turns": [{"role": role, "content": content} for role, content in turns],
+    }
+
+
+def test_compute_features():
+    trace = make_trace(
+        "t1",
+        ("user", "How much is it?"),
+        ("assistant", "It's $129.99 😊 Anything else?"),
+        ("user", "And the case? Is it $20?"),
+        ("assistant", "$24.99."),
+    )
+    row = compute_features([trace]).row(0, named=True)
+
+    assert row["n_turns"] == 4
+    assert row["assistant_chars"] == 36
+    assert row["mean_reply_chars"] == pytest.approx(18.0)
+    assert row["emoji_count"] == 1
+    # Only assistant replies are counted
+    assert row["question_marks"] == 1
+    assert row["price_mentions"] == 2
+    assert row["reply_ratio"] == pytest.approx(36 / 39)
+
+
+def test_features_keep_trace_order():
+    features = compute_features(TRACES)
+    assert features["trace_id"].to_list() == [t["trace_id"] for t in TRACES]
+    assert features.null_count().sum_horizontal().item() == 0
+
+
+def test_update_only_computes_new_traces():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "features.parquet"
+        update_features(TRACES[:5], path)
+
+        # Mark the stored rows so recomputation would be visible
+        stored = pl.read_parquet(path).with_columns(pl.lit(999, pl.UInt32).alias("n_turns"))
+        stored.write_parquet(path)
+
+        features = update_features(TRACES[:8], path)
+        assert features["n_turns"].to_list() == [999] * 5 + [4] * 3
+        assert pl.read_parquet(path).height == 8
+
+        # Traces that are gone are dropped
+        assert update_features(TRACES[6:8], path).height == 2
+
+
+def test_select_filters_and_sorts():
+    features = compute_features(TRACES)
+    emoji = select(features, "emoji_count>0")
+    assert emoji and all(tid <= "trace_010" for tid in emoji)
+
+    by_length = select(features, sort_by="assistant_chars")
+    lengths = features.sort("assistant_chars", descending=True)["trace_id"].to_list()
+    assert by_length == lengths
+
+    shortest = select(features, "n_turns>=2, price_mentions==0", "assistant_chars", descending=False)
+    assert shortest[0] == "trace_017"
+
+
+def test_parse_where_rejects_bad_input():
+    with pytest.raises(ValueError, match="Unknown feature"):
+        parse_where("sentiment>0")
+    with pytest.raises(ValueError, match="Can't parse"):
+        parse_where("n_turns >> 3")
@@ -0,0 +1,94 @@
+"""Tests for the uncertainty-ordered grading queue."""
+
+import tempfile
+from pathlib import Path
+
+import polars as pl
+
+from src.grading_queue import (
+    JUDGE_SCORES_SCHEMA,
+    build_queue,
+    estimate_savings,
+    load_queue,
+    pending,
+    refresh_queue,
+)
+from src.state import SCHEMA, save_grade
+
+TRACE_IDS = ["trace_001", "trace_002", "trace_003", "trace_004"]
+
+
+def make_scores() -> pl.DataFrame:
+    return pl.DataFrame(
+        {
+            "trace_id": ["trace_001", "trace_001", "trace_002", "trace_002",
+                         "trace_003", "trace_003"],
+            "metric": ["Kindness", "Accuracy"] * 3,
+            "score": [0.95, 0.9,    # confident pass
+                      0.52, 0.8,    # near the threshold
+                      0.7, 0.3],    # metrics disagree
+            "threshold": [0.5] * 6,
+        },
+        schema=JUDGE_SCORES_SCHEMA,
+    )
+
+
+def test_queue_orders_by_uncertainty():
+    """Unscored and disagreeing traces first, confident ones last."""
+    queue = build_queue(TRACE_IDS, make_scores())
+    assert queue["trace_id"].to_list() == [
+        "trace_004",  # never judged
+        "trace_003",  # metrics disagree
+        "trace_002",  # close to threshold
+        "trace_001",  # confident
+    ]
+    assert queue.filter(pl.col("trace_id") == "trace_004")["judged"][0] is False
+
+
+def test_pending_skips_graded_traces():
+    with tempfile.TemporaryDirectory() as tmp:
+        grades = save_grade(Path(tmp) / "grades.csv", "trace_003", "fail")
+        queue = build_queue(TRACE_IDS, make_scores())
+        assert "trace_003" not in pending(queue, grades)["trace_id"].to_list()
+        assert pending(queue, grades).height == 3
+
+
+def test_queue_is_stored_and_reused():
+    with tempfile.TemporaryDirectory() as tmp:
+        queue_path = Path(tmp) / "queue.csv"
+        scores_path = Path(tmp) / "scores.csv"
+        make_scores().write_csv(scores_path)
+
+        queue = refresh_queue(queue_path, scores_path, TRACE_IDS)
+        assert load_queue(queue_path).equals(queue)
+
+        # Unchanged inputs: the stored file is returned as-is
+        mtime = queue_path.stat().st_mtime_ns
+        refresh_queue(queue_path, scores_path, TRACE_IDS)
+        assert queue_path.stat().st_mtime_ns == mtime
+
+        # A new trace invalidates it
+        queue = refresh_queue(queue_path, scores_path, [*TRACE_IDS, "trace_005"])
+        assert queue.height == 5
+
+
+def test_estimate_savings():
+    """The queue reaches uncertain traces sooner than file order."""
+    trace_ids = [f"trace_{i:03d}" for i in range(1, 11)]
+    scores = pl.DataFrame(
+        {
+            "trace_id": trace_ids,
+            "metric": ["Kindness"] * 10,
+            # Only the last two traces are borderline
+            "score": [0.99] * 8 + [0.5, 0.55],
+            "threshold": [0.5] * 10,
+        },
+        schema=JUDGE_SCORES_SCHEMA,
+    )
+    grades = pl.DataFrame(schema=SCHEMA)  # nothing graded yet
+    queue = build_queue(trace_ids, scores)
+
+    savings = estimate_savings(queue, grades, trace_ids, target=2)
+    assert savings["queue_order"] == 2
+    assert savings["file_order"] == 10
+    assert savings["seconds_saved"] == 8 * savings["seconds_per_trace"]
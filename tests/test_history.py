@@ -0,0 +1,93 @@
+"""Tests for grade history and time-travel queries."""
+
+import tempfile
+from datetime import UTC, datetime
+from pathlib import Path
+
+import polars as pl
+
+from src.history import as_of, compact, history_path, scan_history, trace_history
+from src.state import changes_path, load_grades, save_grade, save_grades
+
+
+def test_history_keeps_every_change():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "grades.csv"
+        save_grades(path, ["trace_001", "trace_002"], "pass", "first pass")
+        between = datetime.now(UTC)
+        save_grade(path, "trace_001", "fail", "changed my mind")
+        save_grade(path, "trace_003", "pass")
+
+        changes = trace_history("trace_001", path)
+        assert changes["grade"].to_list() == ["pass", "fail"]
+        assert changes["comment"].to_list() == ["first pass", "changed my mind"]
+
+        then = as_of(between, path)
+        assert then["trace_id"].to_list() == ["trace_001", "trace_002"]
+        assert then["grade"].to_list() == ["pass", "pass"]
+
+        # Naive timestamps and ISO strings are UTC
+        assert as_of(between.replace(tzinfo=None), path).equals(then)
+        assert as_of(between.isoformat(), path).equals(then)
+        assert as_of(datetime(2000, 1, 1), path).height == 0
+
+        now = as_of(path=path)
+        current = load_grades(path).sort("trace_id")
+        assert now["trace_id"].to_list() == current["trace_id"].to_list()
+        assert now["grade"].to_list() == current["grade"].to_list()
+
+
+def test_compact_folds_the_log_into_parquet():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "grades.csv"
+        for grade in ("pass", "fail", "pass"):
+            save_grade(path, "trace_002", grade)
+        save_grade(path, "trace_001", "fail")
+        assert compact(path) == 4
+        folded = pl.read_parquet(history_path(path))
+        assert folded["trace_id"].to_list() == ["trace_001"] + ["trace_002"] * 3
+
+        # Later saves are read from the log's tail until the next fold
+        save_grade(path, "trace_002", "fail")
+        history = scan_history(path).collect()
+        assert history["seq"].sort().to_list() == list(range(5))
+        assert trace_history("trace_002", path)["grade"].to_list() == ["pass", "fail", "pass", "fail"]
+        assert compact(path) == 5
+        assert scan_history(path, compact_after=0).collect().height == 5
+
+
+def test_grades_saved_before_the_log_are_kept():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "grades.csv"
+        pl.DataFrame(
+            {
+                "trace_id": ["trace_001"],
+                "grade": ["pass"],
+                "comment": ["legacy"],
+                "graded_at": ["2026-01-01T00:00:00+00:00"],
+            }
+        ).write_csv(path)
+        save_grade(path, "trace_001", "fail")
+        changes = trace_history("trace_001", path)
+        assert changes["grade"].to_list() == ["pass", "fail"]
+        assert changes["comment"][0] == "legacy"
+        assert as_of("2026-06-01", path)["grade"].to_list() == ["pass"]
+
+
+def test_history_follows_a_replaced_log():
+    """A log reset and regrown past the old fold's cursor isn't mistaken
+    for the log that was folded."""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "grades.csv"
+        save_grade(path, "trace_001", "pass")
+        assert compact(path) == 1
+
+        path.unlink()
+        changes_path(path).unlink()
+        save_grades(path, ["trace_002", "trace_003", "trace_004"], "fail", "a longer comment")
+        assert scan_history(path).collect()["trace_id"].to_list() == [
+            "trace_002",
+            "trace_003",
+            "trace_004",
+        ]
+        assert compact(path) == 3
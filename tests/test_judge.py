@@ -0,0 +1,146 @@
+"""Tests for the shared judge client, against a local fake server."""
+
+import tempfile
+from pathlib import Path
+
+import openai
+import pytest
+from deepeval.metrics import GEval
+from deepeval.test_case import LLMTestCase, LLMTestCaseParams
+
+from src.judge import JudgeCache, JudgeModel, RateLimiter, SharedRateLimiter, backoff_delay
+from src.telemetry import TELEMETRY
+from tests.fake_judge import FakeJudgeServer
+
+pytestmark = pytest.mark.usefixtures("isolated_telemetry")
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        self.now += seconds
+
+
+def make_judge(server: FakeJudgeServer, **kwargs) -> JudgeModel:
+    return JudgeModel(
+        model="fake-judge",
+        api_key="test",
+        base_url=server.base_url,
+        sleep=lambda _: None,
+        **kwargs,
+    )
+
+
+def test_rate_limiter_requests_per_minute():
+    """A 60 rpm bucket allows a burst of 60, then one request per second."""
+    clock = FakeClock()
+    limiter = RateLimiter(60, 1_000_000, clock=clock, sleep=clock.sleep)
+
+    for _ in range(60):
+        assert limiter.acquire() == 0
+    assert limiter.acquire() == pytest.approx(1.0)
+    assert clock.now == pytest.approx(1.0)
+
+
+def test_rate_limiter_tokens_per_minute():
+    """Token spend is throttled independently of request count."""
+    clock = FakeClock()
+    limiter = RateLimiter(1000, 600, clock=clock, sleep=clock.sleep)
+
+    limiter.acquire(600)
+    assert limiter.acquire(300) == pytest.approx(30.0)
+
+
+def test_shared_rate_limiter_spans_instances():
+    """Limiters on the same file (one per worker process) share one bucket."""
+    clock = FakeClock()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "rate"
+        workers = [SharedRateLimiter(path, 60, 1_000_000, clock=clock, sleep=clock.sleep) for _ in range(2)]
+        for i in range(60):
+            assert workers[i % 2].acquire() == 0
+        assert workers[0].acquire() == pytest.approx(1.0)
+        assert workers[1].acquire() == pytest.approx(1.0)
+    assert clock.now == pytest.approx(2.0)
+
+
+def test_backoff_respects_retry_after():
+    for attempt in range(6):
+        assert 0 <= backoff_delay(attempt, base=0.5, cap=4) <= 4
+    assert backoff_delay(0, retry_after=2.0) >= 2.0
+
+
+def test_retries_on_rate_limit_and_server_errors():
+    """429 and 5xx responses are retried until the call succeeds."""
+    with FakeJudgeServer(errors=[429, 503, 500]) as server:
+        judge = make_judge(server)
+        output = judge.generate("Is this kind?")
+
+    assert '"score": 8' in output
+    assert server.requests == 4
+
+
+def test_gives_up_after_max_retries():
+    with FakeJudgeServer(errors=[503] * 5) as server:
+        judge = make_judge(server, max_retries=2)
+        with pytest.raises(openai.APIStatusError):
+            judge.generate("Is this kind?")
+
+    assert server.requests == 3
+
+
+def test_non_retryable_errors_raise_immediately():
+    with FakeJudgeServer(errors=[400]) as server:
+        judge = make_judge(server)
+        with pytest.raises(openai.BadRequestError):
+            judge.generate("Is this kind?")
+
+    assert server.requests == 1
+
+
+def test_connections_are_pooled():
+    """Sequential calls reuse one keep-alive connection."""
+    with FakeJudgeServer(latency=0.01) as server:
+        judge = make_judge(server)
+        for _ in range(5):
+            judge.generate("Is this kind?")
+
+    assert server.requests == 5
+    assert server.connections == 1
+
+
+def test_geval_with_judge_model():
+    """GEval runs end to end through the judge client."""
+    with FakeJudgeServer() as server:
+        metric = GEval(
+            name="Kindness",
+            criteria="Determine if the response is kind.",
+            evaluation_params=[LLMTestCaseParams.ACTUAL_OUTPUT],
+            model=make_judge(server),
+            threshold=0.5,
+        )
+        metric.measure(LLMTestCase(input="Hi", actual_output="Hello! 😊"))
+
+    assert metric.score == pytest.approx(0.8)
+    assert metric.success
+
+
+def test_cache_answers_repeated_prompts():
+    with tempfile.TemporaryDirectory() as tmp, FakeJudgeServer() as server:
+        first = make_judge(server, cache=JudgeCache(Path(tmp) / "cache.sqlite"))
+        answer = first.generate("Rate this.", schema=dict)
+        first.close()
+
+        # A second process opening the same cache file gets the stored answer
+        second = make_judge(server, cache=JudgeCache(Path(tmp) / "cache.sqlite"))
+        assert second.generate("Rate this.", schema=dict) == answer
+        second.generate("Rate this.")  # not JSON mode: a different entry
+        assert len(second.cache) == 2
+        second.close()
+    assert server.requests == 2
+    assert [c["cache_hit"] for c in TELEMETRY.calls[-3:]] == [False, True, False]
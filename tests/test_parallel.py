@@ -0,0 +1,92 @@
+"""Tests for latency-balanced sharding and merging parallel workers' logs."""
+
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+import polars as pl
+
+from src import runs, telemetry
+from src.parallel import ROOT, balance, load_latencies, save_latencies
+
+
+def test_balance_spreads_expected_latency():
+    latencies = {"a": 8.0, "b": 7.0, "c": 6.0, "d": 5.0, "e": 4.0, "f": 3.0, "g": 3.0}
+    shards = balance(list(latencies), latencies, 3)
+
+    assert sorted(n for tests, _ in shards for n in tests) == sorted(latencies)
+    loads = [load for _, load in shards]
+    assert sum(loads) == sum(latencies.values())
+    # Within LPT's guarantee of the ideal 12s per worker
+    assert max(loads) <= 4 / 3 * 12.0
+    for tests, load in shards:
+        assert sum(latencies[n] for n in tests) == load
+
+
+def test_balance_uses_median_for_untimed_tests():
+    shards = balance(["slow", "new1", "new2"], {"slow": 4.0, "fast": 1.0, "other": 2.0}, 2)
+    # Untimed tests count as the median of the timed tests being run
+    assert [load for _, load in shards] == [8.0, 4.0]
+    assert balance(["a"], {}, 4) == [(["a"], 1.0)]
+
+
+def test_save_latencies_merges():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "latency.json"
+        save_latencies({"a": 1.0, "b": 2.0}, path)
+        save_latencies({"b": 3.0}, path)
+        assert load_latencies(path) == {"a": 1.0, "b": 3.0}
+
+
+def test_worker_results_merge_into_one_run():
+    with tempfile.TemporaryDirectory() as tmp:
+        for worker, trace_id in enumerate(["t2", "t1"]):
+            recorder = runs.RunRecorder("run1", tmp, worker=str(worker))
+            recorder.record(trace_id, "Kindness", 0.9, True, "reason", "fake-judge")
+            assert recorder.write().name == f"results-{worker}.parquet"
+        assert runs.list_runs(tmp) == []
+
+        path = runs.merge_shards("run1", tmp)
+        assert runs.list_runs(tmp) == ["run1"]
+        assert pl.read_parquet(path)["trace_id"].to_list() == ["t1", "t2"]
+        assert [p.name for p in path.parent.iterdir()] == ["results.parquet"]
+        assert runs.merge_shards("run2", tmp) is None
+
+
+def test_worker_calls_merge_into_one_log(monkeypatch):
+    with tempfile.TemporaryDirectory() as tmp:
+        for worker in ("0", "1"):
+            # Each worker is its own process, with its own in-memory log
+            monkeypatch.setattr(telemetry, "TELEMETRY", telemetry.Telemetry())
+            with telemetry.scope("Kindness", f"t{worker}"):
+                telemetry.TELEMETRY.record("gpt-4.1", 100, 10, 0.5)
+            assert len(telemetry.export("run1", tmp, worker=worker)) == 1
+        assert not (Path(tmp) / telemetry.PROM_FILE).exists()
+
+        calls_path, prom_path = telemetry.merge_shards("run1", tmp)
+        calls = telemetry.scan_calls(tmp).collect()
+        assert calls.height == 2 and calls["run_id"].unique().to_list() == ["run1"]
+        assert sorted(calls["trace_id"]) == ["t0", "t1"]
+        assert "judge_calls_total" in prom_path.read_text()
+        assert [p.name for p in calls_path.parent.iterdir()] == [telemetry.CALLS_FILE]
+
+
+def test_suite_passes_against_fake_judge():
+    with tempfile.TemporaryDirectory() as tmp:
+        # A copy of the tree, so the run's cache and logs stay out of data/
+        for name in ("src", "tests"):
+            shutil.copytree(ROOT / name, Path(tmp) / name, ignore=shutil.ignore_patterns("__pycache__"))
+        (Path(tmp) / "data").mkdir()
+        for name in ("traces.json", "catalog.json"):
+            shutil.copy(ROOT / "data" / name, Path(tmp) / "data" / name)
+
+        result = subprocess.run(
+            [sys.executable, "-m", "src.parallel", "-n", "2", "--fake-judge"],
+            cwd=tmp, capture_output=True, text=True,
+            env={**os.environ, "DEEPEVAL_TELEMETRY_OPT_OUT": "YES"},
+        )
+        assert result.returncode == 0, result.stdout + result.stderr
+        assert "20 tests on 2 workers" in result.stdout
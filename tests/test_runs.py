@@ -0,0 +1,115 @@
+"""Tests for the evaluation run history store and diffs."""
+
+import tempfile
+from pathlib import Path
+
+import pytest
+from deepeval.metrics import GEval
+from deepeval.test_case import LLMTestCase, LLMTestCaseParams
+
+from src.judge import JudgeModel
+from src.runs import (
+    RunRecorder,
+    assert_test,
+    diff_runs,
+    finish_run,
+    list_runs,
+    main,
+    new_run_id,
+    scan_runs,
+    start_run,
+    summarize_diff,
+)
+from tests.fake_judge import FakeJudgeServer
+
+
+def record(runs_dir: Path, run_id: str, results: dict[str, float]) -> None:
+    recorder = RunRecorder(run_id, runs_dir)
+    for trace_id, score in results.items():
+        recorder.record(trace_id, "Kindness", score, score >= 0.5, "reason", "fake-judge")
+    recorder.write()
+
+
+def test_runs_are_partitions():
+    with tempfile.TemporaryDirectory() as tmp:
+        runs_dir = Path(tmp)
+        record(runs_dir, "20261018T090000Z", {"t1": 0.9})
+        record(runs_dir, "20261019T090000Z", {"t1": 0.8})
+
+        assert list_runs(runs_dir) == ["20261018T090000Z", "20261019T090000Z"]
+        history = scan_runs(runs_dir).collect()
+        assert history["run_id"].to_list() == ["20261018T090000Z", "20261019T090000Z"]
+        assert history["judge_model"].unique().to_list() == ["fake-judge"]
+
+
+def test_diff_finds_flips_and_deltas():
+    with tempfile.TemporaryDirectory() as tmp:
+        runs_dir = Path(tmp)
+        record(runs_dir, "base", {"t1": 0.9, "t2": 0.2, "t3": 0.7})
+        record(runs_dir, "head", {"t1": 0.3, "t2": 0.6, "t3": 0.8})
+
+        diff = diff_runs("base", "head", runs_dir)
+        assert dict(diff.select("trace_id", "change").iter_rows()) == {
+            "t1": "regressed",
+            "t2": "fixed",
+            "t3": "unchanged",
+        }
+        assert diff.filter(trace_id="t3")["delta"][0] == pytest.approx(0.1)
+
+
+def test_diff_handles_added_and_removed_traces():
+    with tempfile.TemporaryDirectory() as tmp:
+        runs_dir = Path(tmp)
+        record(runs_dir, "base", {"t1": 0.9, "t2": 0.9})
+        record(runs_dir, "head", {"t2": 0.9, "t3": 0.1})
+
+        summary = summarize_diff(diff_runs("base", "head", runs_dir)).row(0, named=True)
+        assert (summary["added"], summary["removed"], summary["unchanged"]) == (1, 1, 1)
+
+
+def test_cli_fails_past_regression_limit(capsys):
+    with tempfile.TemporaryDirectory() as tmp:
+        runs_dir = Path(tmp)
+        record(runs_dir, "1", {"t1": 0.9, "t2": 0.9})
+        record(runs_dir, "2", {"t1": 0.1, "t2": 0.1})
+
+        main(["--runs-dir", tmp, "diff", "--max-regressions", "2"])
+        with pytest.raises(SystemExit, match="2 regressions"):
+            main(["--runs-dir", tmp, "diff", "--max-regressions", "1"])
+        assert "t1" in capsys.readouterr().out
+
+
+def kindness(judge: JudgeModel) -> GEval:
+    return GEval(
+        name="Kindness",
+        criteria="Determine if the response is kind.",
+        evaluation_params=[LLMTestCaseParams.ACTUAL_OUTPUT],
+        model=judge,
+        threshold=0.5,
+    )
+
+
+def test_assert_test_records_into_current_run(isolated_telemetry):
+    test_case = LLMTestCase(input="Hi", actual_output="Hello!", name="trace_001")
+    with tempfile.TemporaryDirectory() as tmp:
+        start_run("run", tmp)
+        with FakeJudgeServer() as server:
+            judge = JudgeModel(model="gpt-4.1", api_key="test", base_url=server.base_url)
+            assert_test(test_case, [kindness(judge)])
+            server.verdict = {"steps": ["Unkind."], "score": 1, "reason": "Rude."}
+            with pytest.raises(AssertionError, match="Kindness"):
+                assert_test(test_case, [kindness(judge)])
+        finish_run()
+
+        # The last result for a (metric, trace) wins
+        rows = scan_runs(tmp).collect()
+        assert rows.select("metric", "trace_id", "score", "success", "reason").rows() == [
+            ("Kindness", "trace_001", 0.1, False, "Rude.")
+        ]
+        assert rows["judge_model"].to_list() == ["gpt-4.1"]
+
+
+def test_new_run_ids_are_unique_and_sort_chronologically():
+    run_ids = [new_run_id() for _ in range(100)]
+    assert len(set(run_ids)) == 100
+    assert sorted(run_ids) == run_ids
@@ -0,0 +1,119 @@
+"""Tests for stratified sampling evaluation."""
+
+import json
+from pathlib import Path
+
+import polars as pl
+import pytest
+
+from src.sampling import (
+    allocate,
+    pass_rates,
+    stratified_evaluate,
+    strata_frame,
+    wilson_interval,
+)
+
+TRACES_PATH = Path(__file__).parent.parent / "data" / "traces.json"
+TRACES = json.loads(TRACES_PATH.read_text())
+
+
+def make_population(n_per_trace: int) -> list[dict]:
+    """Replicate the sample traces so every stratum has *n_per_trace* members."""
+    return [
+        {**t, "trace_id": f"{t['trace_id']}_{i:03d}"}
+        for t in TRACES
+        for i in range(n_per_trace)
+    ]
+
+
+def good_trace_judge(trace: dict) -> dict[str, bool]:
+    """Deterministic stand-in for the LLM judge: good traces pass."""
+    return {"Kindness": trace["trace_id"][:9] <= "trace_010"}
+
+
+def test_strata_keys():
+    strata = strata_frame(TRACES)
+    assert strata.height == 20
+    assert set(strata.columns) >= {"scenario", "has_discount", "product_category", "stratum"}
+
+
+def test_wilson_interval():
+    low, high = wilson_interval(8, 10)
+    assert 0.4 < low < 0.8 < high < 1.0
+    assert wilson_interval(0, 0) == (0.0, 1.0)
+    # Judging a whole stratum leaves no sampling error
+    assert wilson_interval(3, 5, population=5) == (0.6, 0.6)
+
+
+def test_allocate_proportional_with_minimum():
+    alloc = allocate({"a": 100, "b": 10, "c": 1}, budget=20)
+    assert sum(alloc.values()) == 20
+    assert alloc["c"] == 1
+    assert alloc["a"] > alloc["b"] >= 1
+
+
+def test_budget_is_respected():
+    population = make_population(50)
+    results = stratified_evaluate(population, good_trace_judge, budget=100)
+    assert results["trace_id"].n_unique() == 100
+
+
+def test_cluster_copies_dont_use_budget():
+    population = make_population(50)
+    # Every copy of a sample trace is a near-duplicate of the others
+    clusters = pl.DataFrame({
+        "trace_id": [t["trace_id"] for t in population],
+        "cluster_id": [t["trace_id"][:9] for t in population],
+    })
+    calls = []
+
+    def judge(trace: dict) -> dict[str, bool]:
+        calls.append(trace["trace_id"][:9])
+        return good_trace_judge(trace)
+
+    results = stratified_evaluate(population, judge, budget=100, clusters=clusters)
+    assert sorted(calls) == sorted(t["trace_id"] for t in TRACES)
+    assert results["trace_id"].n_unique() > 100
+
+
+def test_stops_when_intervals_are_narrow():
+    """Cost follows the requested precision, not the dataset size."""
+    population = make_population(200)
+    loose = stratified_evaluate(
+        population, good_trace_judge, budget=4000, target_half_width=0.3
+    )
+    tight = stratified_evaluate(
+        population, good_trace_judge, budget=4000, target_half_width=0.05
+    )
+    assert loose["trace_id"].n_unique() < tight["trace_id"].n_unique() < 4000
+
+
+def test_pass_rates_by_facet():
+    population = make_population(30)
+    results = stratified_evaluate(population, good_trace_judge, budget=300)
+
+    overall = pass_rates(results, population, by=[])
+    assert overall.height == 1
+    row = overall.row(0, named=True)
+    assert row["pass_rate"] == pytest.approx(0.5)
+    assert row["ci_low"] < 0.5 < row["ci_high"]
+
+    by_discount = pass_rates(results, population, by=["has_discount"])
+    assert sorted(by_discount["has_discount"].to_list()) == [False, True]
+
+
+def test_pass_rates_cover_unjudged_strata():
+    population = make_population(30)
+    results = stratified_evaluate(population, good_trace_judge, budget=300)
+    # Keep the judged results of a single stratum
+    kept = results.filter(pl.col("stratum") == results["stratum"][0])
+
+    overall = pass_rates(kept, population, by=[]).row(0, named=True)
+    assert overall["unjudged_share"] == pytest.approx(19 / 20)
+    # Nineteen of twenty strata could pass at any rate
+    assert overall["ci_high"] - overall["ci_low"] >= 19 / 20
+
+    empty = pass_rates(results.clear(), population, by=["has_discount"])
+    assert empty.height == 0
+    assert empty.columns[:2] == ["has_discount", "metric"]
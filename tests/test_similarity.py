@@ -0,0 +1,79 @@
+"""Tests for offline trace similarity search."""
+
+import copy
+import json
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from src.similarity import SimilarityIndex, build_index, load_index, spherical_kmeans
+
+TRACES_PATH = Path(__file__).parent.parent / "data" / "traces.json"
+TRACES = json.loads(TRACES_PATH.read_text())
+
+
+def paraphrase(trace: dict, trace_id: str) -> dict:
+    """Same assistant turns with every third word dropped."""
+    copied = copy.deepcopy(trace)
+    copied["trace_id"] = trace_id
+    for turn in copied["turns"]:
+        if turn["role"] == "assistant":
+            words = turn["content"].split()
+            turn["content"] = " ".join(w for i, w in enumerate(words) if i % 3 != 2)
+    return copied
+
+
+def test_finds_reworded_conversation():
+    """A reworded copy of the competitor-misinformation trace is its nearest
+    neighbour, well ahead of unrelated conversations."""
+    traces = [*TRACES, paraphrase(TRACES[18], "trace_019_copy")]
+    with tempfile.TemporaryDirectory() as tmp:
+        build_index(traces, tmp)
+        similar = SimilarityIndex(tmp).similar("trace_019", k=3)
+
+    assert similar["trace_id"][0] == "trace_019_copy"
+    assert similar["similarity"][0] > 0.8
+    assert similar["similarity"][1] < 0.5
+    assert "trace_019" not in similar["trace_id"].to_list()
+
+
+def test_vectors_are_memory_mapped_and_normalized():
+    with tempfile.TemporaryDirectory() as tmp:
+        meta = build_index(TRACES, tmp, dim=64)
+        index = SimilarityIndex(tmp)
+        assert isinstance(index.vectors, np.memmap)
+        assert index.vectors.shape == (20, 64)
+        assert np.linalg.norm(index.vectors, axis=1) == pytest.approx(np.ones(20), abs=1e-5)
+        assert meta["lists"] == 4
+        assert sorted(index.trace_ids) == [t["trace_id"] for t in TRACES]
+
+
+def test_probing_every_list_is_exact():
+    with tempfile.TemporaryDirectory() as tmp:
+        build_index(TRACES, tmp, n_lists=5)
+        index = SimilarityIndex(tmp)
+        vectors = np.asarray(index.vectors)
+        for trace_id in ["trace_001", "trace_011", "trace_019"]:
+            row = index.row(trace_id)
+            exact = [i for i in np.argsort(-(vectors @ vectors[row]), kind="stable") if i != row]
+            found = index.similar(trace_id, k=5, n_probe=5)["trace_id"].to_list()
+            assert found == [index.trace_ids[int(i)] for i in exact[:5]]
+
+
+def test_load_index_rebuilds_when_traces_change():
+    with tempfile.TemporaryDirectory() as tmp:
+        assert len(load_index(TRACES[:10], tmp)) == 10
+        assert len(load_index(TRACES[:10], tmp)) == 10
+        assert len(load_index(TRACES, tmp)) == 20
+
+
+def test_empty_index():
+    with tempfile.TemporaryDirectory() as tmp:
+        assert build_index([], tmp)["traces"] == 0
+        index = SimilarityIndex(tmp)
+        assert len(index) == 0
+        assert index.search(np.ones(index.meta["dim"], dtype=np.float32)) == []
+    with pytest.raises(ValueError, match="0 vectors"):
+        spherical_kmeans(np.zeros((0, 8), dtype=np.float32), 1)
@@ -0,0 +1,130 @@
+"""Tests for judge call telemetry."""
+
+import tempfile
+from pathlib import Path
+
+import polars as pl
+import pytest
+from deepeval.metrics import GEval
+from deepeval.test_case import LLMTestCase, LLMTestCaseParams
+
+from src.judge import JudgeModel, MetricJudge
+from src.runs import assert_test
+from src.telemetry import (
+    CALL_SCHEMA,
+    latency_histogram,
+    price,
+    prometheus_text,
+    scan_calls,
+    scope,
+    summarize,
+    write_calls,
+)
+from tests.fake_judge import FakeJudgeServer
+
+pytestmark = pytest.mark.usefixtures("isolated_telemetry")
+
+
+def test_metric_judges_attribute_calls_per_metric(isolated_telemetry):
+    """Several metrics measured in one deepeval call still get their own
+    calls, under the caller's trace."""
+    with FakeJudgeServer() as server:
+        judge = JudgeModel(model="gpt-4.1", api_key="test", base_url=server.base_url)
+        metrics = [
+            GEval(
+                name=name,
+                criteria=f"Determine if the response is {name.lower()}.",
+                evaluation_params=[LLMTestCaseParams.ACTUAL_OUTPUT],
+                model=MetricJudge(judge, name),
+            )
+            for name in ("Kindness", "Professionalism")
+        ]
+        before = len(isolated_telemetry.calls)
+        assert_test(LLMTestCase(input="Hi", actual_output="Hello!", name="trace_001"), metrics)
+
+    calls = isolated_telemetry.frame().slice(before)
+    assert sorted(calls["metric"].unique().to_list()) == ["Kindness", "Professionalism"]
+    assert calls["trace_id"].unique().to_list() == ["trace_001"]
+
+
+def make_calls() -> pl.DataFrame:
+    return pl.DataFrame(
+        {
+            "metric": ["Kindness", "Kindness", "Kindness", "Accuracy"],
+            "trace_id": ["t1", "t1", "t2", "t1"],
+            "model": ["gpt-4.1"] * 4,
+            "prompt_tokens": [1000, 1000, 1000, 4000],
+            "completion_tokens": [100, 100, 100, 500],
+            "cost": [price("gpt-4.1", 1000, 100)] * 3 + [price("gpt-4.1", 4000, 500)],
+            "latency": [0.2, 0.4, 3.0, 1.0],
+            "retries": [0, 1, 0, 0],
+            "throttled": [0.0] * 4,
+            "cache_hit": [False, False, True, False],
+            "called_at": [None] * 4,
+        },
+        schema=CALL_SCHEMA,
+    )
+
+
+def test_price():
+    assert price("gpt-4.1", 1_000_000, 1_000_000) == pytest.approx(10.0)
+    assert price("unknown-model", 10, 10) is None
+
+
+def test_calls_are_attributed_to_scope(isolated_telemetry):
+    """Judge calls inside ``scope`` carry its metric and trace, including
+    calls GEval makes on deepeval's own event loop."""
+    with FakeJudgeServer(errors=[429]) as server:
+        judge = JudgeModel(
+            model="gpt-4.1", api_key="test", base_url=server.base_url, sleep=lambda _: None
+        )
+        metric = GEval(
+            name="Kindness",
+            criteria="Determine if the response is kind.",
+            evaluation_params=[LLMTestCaseParams.ACTUAL_OUTPUT],
+            model=judge,
+        )
+        before = len(isolated_telemetry.calls)
+        with scope("Kindness", "trace_001"):
+            metric.measure(LLMTestCase(input="Hi", actual_output="Hello!"))
+
+    calls = isolated_telemetry.frame().slice(before)
+    assert calls.height >= 1
+    assert calls["metric"].unique().to_list() == ["Kindness"]
+    assert calls["trace_id"].unique().to_list() == ["trace_001"]
+    assert calls["retries"].sum() == 1
+    assert (calls["prompt_tokens"] > 0).all()
+    assert (calls["cost"] > 0).all()
+
+
+def test_summarize_per_metric():
+    summary = {r["metric"]: r for r in summarize(make_calls()).iter_rows(named=True)}
+
+    kindness = summary["Kindness"]
+    assert (kindness["calls"], kindness["traces"], kindness["retries"]) == (3, 2, 1)
+    assert kindness["cost_per_trace"] == pytest.approx(1.5 * price("gpt-4.1", 1000, 100))
+    assert kindness["cache_hit_rate"] == pytest.approx(1 / 3)
+    # The most expensive metric comes first
+    assert summarize(make_calls())["metric"][0] == "Accuracy"
+
+
+def test_latency_histogram_is_cumulative():
+    histogram = latency_histogram(make_calls(), buckets=[0.5, 1.0])
+    kindness = histogram.filter(metric="Kindness")["count"].to_list()
+    assert kindness == [2, 2, 3]  # ≤0.5s, ≤1s, +Inf
+
+
+def test_prometheus_text():
+    text = prometheus_text(make_calls())
+    assert "# TYPE judge_call_latency_seconds histogram" in text
+    assert 'judge_calls_total{metric="Kindness"} 3' in text
+    assert 'judge_call_latency_seconds_bucket{metric="Kindness",le="+Inf"} 3' in text
+    assert 'judge_tokens_total{metric="Accuracy",kind="completion"} 500' in text
+
+
+def test_parquet_log_per_run():
+    with tempfile.TemporaryDirectory() as tmp:
+        write_calls(make_calls(), "run1", tmp)
+        write_calls(make_calls().head(1), "run2", tmp)
+        counts = dict(scan_calls(Path(tmp)).group_by("run_id").len().collect().iter_rows())
+    assert counts == {"run1": 4, "run2": 1}
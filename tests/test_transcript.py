@@ -0,0 +1,47 @@
+"""Tests for windowed transcript display."""
+
+from src.transcript import clip, window
+
+
+def test_short_conversations_are_shown_whole():
+    first, last, hidden = window(5, head=2, tail=4)
+    assert list(first) == [0, 1, 2, 3, 4]
+    assert list(last) == []
+    assert hidden == 0
+
+
+def test_long_conversations_show_head_and_tail():
+    first, last, hidden = window(300, head=2, tail=4)
+    assert list(first) == [0, 1]
+    assert list(last) == [296, 297, 298, 299]
+    assert hidden == 294
+
+
+def test_expanding_reveals_middle_in_order():
+    first, last, hidden = window(300, expanded=20, head=2, tail=4)
+    assert list(first) == list(range(22))
+    assert hidden == 274
+
+    # Expanding past the middle shows everything exactly once
+    first, last, hidden = window(300, expanded=1000, head=2, tail=4)
+    assert [*first, *last] == list(range(300))
+    assert hidden == 0
+
+
+def test_clip_long_content():
+    content = "line\n" * 2000
+    text, clipped = clip(content, max_chars=100)
+    assert clipped
+    assert text.startswith("line\nline")
+    assert "more characters" in text
+    assert clip("short", max_chars=100) == ("short", False)
+
+
+def test_clip_closes_code_fence():
+    content = "Here is the log:\n```\n" + "error\n" * 1000 + "```\n"
+    text, clipped = clip(content, max_chars=200)
+    assert clipped
+    assert text.count("```") % 2 == 0
+    shown = text.split("\n```\n\n*…")[0]
+    assert content.startswith(shown)
+    assert text.endswith(f"*… {len(content) - len(shown):,} more characters*")
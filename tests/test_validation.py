@@ -0,0 +1,80 @@
+"""Tests for trace schema validation at ingest."""
+
+import copy
+import json
+import tempfile
+from pathlib import Path
+
+from src.validation import load_traces, validate
+
+TRACES_PATH = Path(__file__).parent.parent / "data" / "traces.json"
+TRACES = json.loads(TRACES_PATH.read_text())
+
+
+def errors_for(trace) -> list[tuple[str, str]]:
+    _, errors = validate([trace])
+    return list(errors.select("field", "error").iter_rows())
+
+
+def test_sample_traces_are_valid():
+    valid, errors = validate(TRACES)
+    assert len(valid) == len(TRACES)
+    assert errors.height == 0
+
+
+def test_missing_and_mistyped_fields():
+    trace = copy.deepcopy(TRACES[0])
+    del trace["turns"]
+    trace["scenario"] = 3
+    trace["metadata"]["has_discount"] = "yes"
+    assert sorted(errors_for(trace)) == [
+        ("metadata.has_discount", "expected boolean, got string"),
+        ("scenario", "expected string, got integer"),
+        ("turns", "missing"),
+    ]
+
+
+def test_missing_metadata_is_reported_once():
+    trace = copy.deepcopy(TRACES[0])
+    del trace["metadata"]
+    assert errors_for(trace) == [("metadata", "missing")]
+
+
+def test_turn_errors():
+    trace = copy.deepcopy(TRACES[0])
+    trace["turns"] = [
+        {"role": "system", "content": "You are helpful."},
+        "hello",
+        {"role": "user"},
+    ]
+    assert sorted(errors_for(trace)) == [
+        ("turns[0].role", "unknown role 'system'"),
+        ("turns[1]", "expected object, got string"),
+        ("turns[2].content", "missing"),
+    ]
+    trace["turns"] = []
+    assert errors_for(trace) == [("turns", "no turns")]
+
+
+def test_duplicates_and_non_objects_are_skipped_not_fatal():
+    traces = [TRACES[0], TRACES[1], copy.deepcopy(TRACES[0]), None]
+    valid, errors = validate(traces)
+
+    assert [t["trace_id"] for t in valid] == ["trace_001", "trace_002"]
+    assert errors.select("index", "error").rows() == [
+        (2, "duplicate trace_id"),
+        (3, "expected object, got null"),
+    ]
+
+
+def test_error_report_written_and_cleared():
+    with tempfile.TemporaryDirectory() as tmp:
+        traces, report = Path(tmp) / "traces.json", Path(tmp) / "errors.csv"
+        traces.write_text(json.dumps([TRACES[0], {"trace_id": "broken"}]))
+        valid, _ = load_traces(traces, report)
+        assert len(valid) == 1
+        assert "broken" in report.read_text()
+
+        traces.write_text(json.dumps([TRACES[0]]))
+        load_traces(traces, report)
+        assert not report.exists()